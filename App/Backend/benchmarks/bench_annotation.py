@@ -0,0 +1,72 @@
+"""benchmarks/bench_annotation.py"""
+# Per-image render + JPEG encode cost of the detection annotation on a 640x640 street image,
+# the Detectron2 Visualizer (when installed) against services.annotation.
+# Usage (from App/Backend): python -m benchmarks.bench_annotation [--boxes 3] [--repeats 50]
+
+# Imports
+import argparse
+import glob
+import os
+import time
+import numpy as np
+from PIL import Image
+from services.annotation import draw_instances
+from services.image_codecs import get_image_codec
+
+SAMPLE_IMAGES = os.path.join(os.path.dirname(__file__), "..", "..", "..", "Data", "yolo", "nuScenes", "images", "train", "*.png")
+
+def _milliseconds(function, repeats):
+    """Mean milliseconds per call."""
+    start = time.perf_counter()
+    for _ in range(repeats):
+        function()
+    return (time.perf_counter() - start) / repeats * 1000
+
+def render_visualizer(image, boxes, scores):
+    """Previous hot path: Visualizer on the BGR view, encoded from the canvas."""
+    #pylint: disable=import-outside-toplevel
+    import torch
+    from detectron2.structures import Boxes, Instances
+    from detectron2.data import MetadataCatalog
+    from detectron2.utils.visualizer import Visualizer, ColorMode
+
+    metadata = MetadataCatalog.get("bench_annotation")
+    metadata.thing_classes = [""]
+    instances = Instances(image.shape[:2])
+    instances.pred_boxes = Boxes(torch.as_tensor(boxes))
+    instances.scores = torch.as_tensor(scores)
+    instances.pred_classes = torch.zeros(len(boxes), dtype=torch.int64)
+
+    v = Visualizer(image[:, :, ::-1], metadata=metadata, scale=1.0, instance_mode=ColorMode.IMAGE)
+    out = v.draw_instance_predictions(instances.to("cpu"))
+    return get_image_codec().encode_jpeg(out.get_image(), bgr=True)
+
+def render_opencv(image, boxes, scores):
+    """New hot path: in place drawing on the decoded buffer."""
+    draw_instances(image, boxes, scores, np.zeros(len(boxes), dtype=np.int64), [""])
+    return get_image_codec().encode_jpeg(image)
+
+def main():
+    """Runs the renderer comparison."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--boxes", type=int, default=3)
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+
+    image_path = sorted(glob.glob(SAMPLE_IMAGES))[0]
+    image = np.array(Image.open(image_path).convert("RGB").resize((640, 640)))
+    rng = np.random.default_rng(0)
+    corners = rng.uniform(0, 480, (args.boxes, 2))
+    boxes = np.concatenate([corners, corners + rng.uniform(20, 160, (args.boxes, 2))], axis=1).astype(np.float32)
+    scores = rng.uniform(0.8, 1.0, args.boxes).astype(np.float32)
+
+    encode_ms = _milliseconds(lambda: get_image_codec().encode_jpeg(image), args.repeats)
+    print(f"jpeg encode only     {encode_ms:7.2f} ms")
+    print(f"opencv renderer      {_milliseconds(lambda: render_opencv(image.copy(), boxes, scores), args.repeats):7.2f} ms")
+    try:
+        print(f"detectron2 visualizer{_milliseconds(lambda: render_visualizer(image, boxes, scores), args.repeats):7.2f} ms")
+    except ImportError as e:
+        print(f"detectron2 visualizer skipped ({e})")
+
+if __name__ == "__main__":
+    main()
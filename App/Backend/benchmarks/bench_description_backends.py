@@ -0,0 +1,98 @@
+"""benchmarks/bench_description_backends.py"""
+# Latency, memory and agreement with the fp16 7B baseline of the Qwen2-VL backends on a fixed crop set
+# (centre crops of the nuScenes street images). Needs the weights, run it on a backend machine (from App/Backend):
+#   python -m benchmarks.bench_description_backends --configs fp16:Qwen/Qwen2-VL-7B-Instruct int8-dynamic:Qwen/Qwen2-VL-2B-Instruct
+# The first config is the baseline.
+
+# Imports
+import argparse
+import ast
+import gc
+import json
+import os
+import time
+import torch
+from models.loaders import load_detection_description_model
+from services import states
+from services.image_summary import preprocess_batch, generate_responses
+from benchmarks.bench_description_modes import _crops, INSTRUCTION
+
+def _rss_bytes():
+    """Resident memory of this process."""
+    with open("/proc/self/statm", encoding="utf-8") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+def _objects(text):
+    try:
+        return {str(item).lower() for item in ast.literal_eval(text)}
+    except (ValueError, SyntaxError, TypeError):
+        return set()
+
+def measure(backend, model_id, crops, repeats):
+    """Loads one backend and describes every crop, returns timings, memory and the parsed object sets."""
+    states.DETECTION_DESCRIPTION_MODEL = states.DETECTION_DESCRIPTION_PROCESSOR = None
+    gc.collect()
+    if torch.cuda.is_available():
+        torch.cuda.empty_cache()
+        torch.cuda.reset_peak_memory_stats()
+    rss_before = _rss_bytes()
+
+    start = time.perf_counter()
+    load_detection_description_model(model_id=model_id, backend=backend)
+    load_seconds = time.perf_counter() - start
+    model, processor = states.DETECTION_DESCRIPTION_MODEL, states.DETECTION_DESCRIPTION_PROCESSOR
+
+    timings, outputs = [], []
+    for _ in range(repeats):
+        outputs = []
+        start = time.perf_counter()
+        for crop in crops:
+            outputs.extend(generate_responses(preprocess_batch(INSTRUCTION, [crop], processor), model, processor, states.DEVICE, structured=True))
+        timings.append((time.perf_counter() - start) / len(crops))
+
+    return {
+        "load_seconds": load_seconds,
+        "seconds_per_crop": min(timings),
+        "rss_gb": (_rss_bytes() - rss_before) / 1024 ** 3,
+        "gpu_peak_gb": torch.cuda.max_memory_allocated() / 1024 ** 3 if torch.cuda.is_available() else None,
+        "objects": [sorted(_objects(output)) for output in outputs],
+    }
+
+def agreement(baseline, objects):
+    """Mean recall of the baseline objects and mean Jaccard similarity per crop."""
+    recalls, jaccards = [], []
+    for expected, predicted in zip(baseline, objects):
+        expected, predicted = set(expected), set(predicted)
+        recalls.append(len(expected & predicted) / len(expected) if expected else float(not predicted))
+        jaccards.append(len(expected & predicted) / len(expected | predicted) if expected | predicted else 1.0)
+    return sum(recalls) / len(recalls), sum(jaccards) / len(jaccards)
+
+def main():
+    """Runs the backend comparison."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--configs", nargs="+", default=["fp16:Qwen/Qwen2-VL-7B-Instruct", "bnb-int8:Qwen/Qwen2-VL-7B-Instruct",
+                                                         "bnb-int4:Qwen/Qwen2-VL-7B-Instruct", "fp16:Qwen/Qwen2-VL-2B-Instruct"])
+    parser.add_argument("--repeats", type=int, default=2)
+    parser.add_argument("--output", default=None, help="Optional JSON file for the results.")
+    args = parser.parse_args()
+
+    states.DEVICE = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    crops = _crops()
+    results = {}
+    for config in args.configs:
+        backend, model_id = config.split(":", 1)
+        results[config] = measure(backend, model_id, crops, args.repeats)
+
+    baseline = results[args.configs[0]]["objects"]
+    for config, result in results.items():
+        result["baseline_recall"], result["baseline_jaccard"] = agreement(baseline, result["objects"])
+        gpu = f"{result['gpu_peak_gb']:5.1f} GB gpu" if result["gpu_peak_gb"] is not None else ""
+        print(f"{config:40s} {result['seconds_per_crop'] * 1000:8.0f} ms/crop  {result['rss_gb']:5.1f} GB rss {gpu}"
+              f"  recall {result['baseline_recall']:.2f}  jaccard {result['baseline_jaccard']:.2f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump(results, output_file, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""benchmarks/bench_description_modes.py"""
+# Latency and parse failures of the VLM description modes (free, structured, nouns) on crops of the
+# nuScenes street images. Needs the Qwen2-VL weights, run it on a backend machine (from App/Backend):
+#   python -m benchmarks.bench_description_modes --nouns car truck panda
+
+# Imports
+import argparse
+import ast
+import glob
+import os
+import time
+import numpy as np
+import torch
+from PIL import Image
+from models.loaders import load_detection_description_model
+from services import states
+from services.image_summary import preprocess_batch, generate_responses, preprocess_noun_questions, score_nouns
+
+SAMPLE_IMAGES = os.path.join(os.path.dirname(__file__), "..", "..", "..", "Data", "yolo", "nuScenes", "images", "train", "*.png")
+INSTRUCTION = "Please create a list of objects in this image."
+
+def _crops(size=640, crop=256):
+    """Centre crops of the resized street images, like the first detection box."""
+    crops = []
+    for image_path in sorted(glob.glob(SAMPLE_IMAGES)):
+        image = np.array(Image.open(image_path).convert("RGB").resize((size, size)))
+        offset = (size - crop) // 2
+        crops.append(image[offset:offset + crop, offset:offset + crop])
+    return crops
+
+def _parses(text):
+    try:
+        return isinstance(ast.literal_eval(text), list)
+    except (ValueError, SyntaxError):
+        return False
+
+def main():
+    """Runs the comparison."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--nouns", nargs="+", default=["car", "truck", "panda"])
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    states.DEVICE = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    load_detection_description_model()
+    model, processor = states.DETECTION_DESCRIPTION_MODEL, states.DETECTION_DESCRIPTION_PROCESSOR
+    crops = _crops()
+
+    for mode in ("free", "structured", "nouns"):
+        timings, failures, outputs = [], 0, []
+        for _ in range(args.repeats):
+            start = time.perf_counter()
+            if mode == "nouns":
+                probabilities = score_nouns(preprocess_noun_questions([(crop, args.nouns) for crop in crops], processor), model, processor, states.DEVICE)
+                outputs = [f"{noun}={probability:.2f}" for noun, probability in zip(args.nouns * len(crops), probabilities.tolist())]
+            else:
+                outputs = generate_responses(preprocess_batch(INSTRUCTION, crops, processor), model, processor, states.DEVICE, structured=mode == "structured")
+                failures += sum(not _parses(output) for output in outputs)
+            timings.append(time.perf_counter() - start)
+        print(f"{mode:10s} {min(timings) / len(crops) * 1000:8.1f} ms/crop  parse failures {failures}/{len(crops) * args.repeats}")
+        print("           " + " | ".join(outputs[:4]))
+
+if __name__ == "__main__":
+    main()
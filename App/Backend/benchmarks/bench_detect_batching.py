@@ -0,0 +1,81 @@
+"""benchmarks/bench_detect_batching.py"""
+# Load generator for the /detect micro-batching with mocked models on CPU.
+# The mocked models sleep for a fixed cost per call plus a smaller cost per image,
+# which is roughly how Detectron2 and Qwen2-VL scale on a GPU.
+# Usage (from App/Backend): python -m benchmarks.bench_detect_batching
+
+# Imports
+import argparse
+import asyncio
+import statistics
+import time
+from services.batching import MicroBatcher
+from services.scheduler import ModelScheduler, DETECT_PRIORITY
+
+def mocked_model(call_seconds, image_seconds):
+    """Creates a batch function that costs call_seconds + image_seconds per image."""
+    def batch_function(images):
+        time.sleep(call_seconds + image_seconds * len(images))
+        return [f"result-{image}" for image in images]
+    return batch_function
+
+async def run_load(clients, duration_seconds, max_batch_size, window_seconds):
+    """Runs concurrent clients against the batched detection pipeline."""
+    scheduler = ModelScheduler(queue_sizes={"weird_detection": 1024, "detection_description": 1024})
+    batchers = {
+        model_name: MicroBatcher(
+            mocked_model(call_seconds, image_seconds),
+            run_batch=lambda function, items, model_name=model_name: scheduler.run(model_name, function, items, priority=DETECT_PRIORITY),
+            max_batch_size=max_batch_size,
+            max_wait_seconds=window_seconds
+        )
+        for model_name, call_seconds, image_seconds in (
+            ("weird_detection", 0.030, 0.004),
+            ("detection_description", 0.120, 0.015),
+        )
+    }
+
+    latencies = []
+    deadline = time.perf_counter() + duration_seconds
+
+    async def client(client_id):
+        request_id = 0
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            await batchers["weird_detection"].submit(f"{client_id}-{request_id}")
+            await batchers["detection_description"].submit(f"{client_id}-{request_id}")
+            latencies.append(time.perf_counter() - start)
+            request_id += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(i) for i in range(clients)))
+    elapsed = time.perf_counter() - start
+    scheduler.shutdown()
+
+    batcher = batchers["detection_description"]
+    return {
+        "throughput": len(latencies) / elapsed,
+        "p50": statistics.median(latencies),
+        "p95": statistics.quantiles(latencies, n=20)[-1],
+        "mean_batch": batcher.item_count / max(batcher.batch_count, 1),
+    }
+
+def main():
+    """Compares unbatched and batched detection under load."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--window-ms", type=float, default=20.0)
+    args = parser.parse_args()
+
+    for label, max_batch_size in (("unbatched", 1), ("batched", args.batch_size)):
+        result = asyncio.run(run_load(args.clients, args.duration, max_batch_size, args.window_ms / 1000))
+        print(
+            f"{label:10s} {result['throughput']:7.1f} req/s  "
+            f"p50 {result['p50'] * 1000:7.1f} ms  p95 {result['p95'] * 1000:7.1f} ms  "
+            f"mean batch {result['mean_batch']:.1f}"
+        )
+
+if __name__ == "__main__":
+    main()
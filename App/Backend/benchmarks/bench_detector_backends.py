@@ -0,0 +1,72 @@
+"""benchmarks/bench_detector_backends.py"""
+# CPU latency of the weird object detector, eager DefaultPredictor against the exported graph
+# on ONNX Runtime and TorchScript with several thread counts. Needs the weights and an export
+# (python -m models.detector_export), run it on a CPU node (from App/Backend):
+#   python -m benchmarks.bench_detector_backends [--threads 4 8 16] [--images 20]
+
+# Imports
+import argparse
+import glob
+import os
+import statistics
+import time
+import numpy as np
+import torch
+from PIL import Image
+from models.detector_export import ExportedPredictor, DEFAULT_EXPORT_DIR
+
+SAMPLE_IMAGES = os.path.join(os.path.dirname(__file__), "..", "..", "..", "Data", "yolo", "nuScenes", "images", "train", "*.png")
+
+def measure(predictor, images, warmup=2):
+    """Per image latencies in seconds and the number of detections."""
+    for image in images[:warmup]:
+        predictor(image)
+    latencies, detections = [], 0
+    for image in images:
+        start = time.perf_counter()
+        instances = predictor(image)["instances"]
+        latencies.append(time.perf_counter() - start)
+        detections += len(instances)
+    return latencies, detections
+
+def main():
+    """Runs the backend comparison."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--export-dir", default=DEFAULT_EXPORT_DIR)
+    parser.add_argument("--threads", type=int, nargs="+", default=[os.cpu_count()])
+    parser.add_argument("--images", type=int, default=20)
+    parser.add_argument("--skip-eager", action="store_true")
+    args = parser.parse_args()
+
+    images = [
+        np.array(Image.open(path).convert("RGB").resize((640, 640), Image.BILINEAR))[:, :, ::-1]
+        for path in sorted(glob.glob(SAMPLE_IMAGES))[:args.images]
+    ]
+
+    configs = []
+    for threads in args.threads:
+        if not args.skip_eager:
+            configs.append(("eager", threads))
+        configs.extend((backend, threads) for backend in ("torchscript", "onnxruntime"))
+
+    print(f"{'backend':<12} {'threads':>7} {'p50 ms':>8} {'p95 ms':>8} {'detections':>10}")
+    for backend, threads in configs:
+        torch.set_num_threads(threads)
+        if backend == "eager":
+            from detectron2.engine import DefaultPredictor
+            from models.configurations import detectron_cfg
+            cfg = detectron_cfg.clone()
+            cfg.MODEL.DEVICE = "cpu"
+            predictor = DefaultPredictor(cfg)
+        else:
+            try:
+                predictor = ExportedPredictor(args.export_dir, backend=backend, num_threads=threads)
+            except (ImportError, FileNotFoundError) as e:
+                print(f"{backend:<12} {threads:>7} skipped: {e}")
+                continue
+        latencies, detections = measure(predictor, images)
+        p95 = statistics.quantiles(latencies, n=20)[-1] if len(latencies) > 1 else latencies[0]
+        print(f"{backend:<12} {threads:>7} {statistics.median(latencies) * 1000:>8.1f} {p95 * 1000:>8.1f} {detections:>10}")
+
+if __name__ == "__main__":
+    main()
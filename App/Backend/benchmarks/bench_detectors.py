@@ -0,0 +1,112 @@
+"""benchmarks/bench_detectors.py"""
+# Throughput and score distribution of the weird object detector backends on the same images,
+# to pick the accuracy / latency trade-off per deployment. With --labels (YOLO txt labels of the
+# images, e.g. a split of Pipelines/yolo/datasets) it reports precision and recall at IoU 0.5 as well.
+# Needs the weights of every backend, run it on the target machine (from App/Backend):
+#   python -m benchmarks.bench_detectors --backends eager onnxruntime yolo [--batch-size 4] [--labels DIR]
+
+# Imports
+import argparse
+import glob
+import os
+import time
+import numpy as np
+import torch
+from PIL import Image
+from models.loaders import load_weird_detection_model
+from services import states
+
+SAMPLE_IMAGES = os.path.join(os.path.dirname(__file__), "..", "..", "..", "Data", "yolo", "nuScenes", "images", "train", "*.png")
+IOU_THRESHOLD = 0.5
+
+def _load_labels(label_path, width, height):
+    """XYXY pixel boxes of a YOLO label file, empty if there is none."""
+    if not os.path.exists(label_path):
+        return np.zeros((0, 4), dtype=np.float32)
+    rows = np.loadtxt(label_path, ndmin=2, dtype=np.float32)
+    if rows.size == 0:
+        return np.zeros((0, 4), dtype=np.float32)
+    center_x, center_y, box_width, box_height = rows[:, 1] * width, rows[:, 2] * height, rows[:, 3] * width, rows[:, 4] * height
+    return np.stack([center_x - box_width / 2, center_y - box_height / 2, center_x + box_width / 2, center_y + box_height / 2], axis=1)
+
+def _iou(boxes, other_boxes):
+    """Pairwise IoU of two XYXY box arrays."""
+    top_left = np.maximum(boxes[:, None, :2], other_boxes[None, :, :2])
+    bottom_right = np.minimum(boxes[:, None, 2:], other_boxes[None, :, 2:])
+    intersection = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+    areas = np.prod(boxes[:, 2:] - boxes[:, :2], axis=1)
+    other_areas = np.prod(other_boxes[:, 2:] - other_boxes[:, :2], axis=1)
+    return intersection / np.maximum(areas[:, None] + other_areas[None, :] - intersection, 1e-9)
+
+def _matches(boxes, ground_truth):
+    """Greedy matching in score order, returns the number of true positives."""
+    if len(boxes) == 0 or len(ground_truth) == 0:
+        return 0
+    ious = _iou(boxes, ground_truth)
+    matched = set()
+    for row in ious:
+        candidates = [i for i in np.argsort(-row) if row[i] >= IOU_THRESHOLD and i not in matched]
+        if candidates:
+            matched.add(candidates[0])
+    return len(matched)
+
+def measure(backend, images, ground_truths, batch_size):
+    """Loads one backend and detects all images, returns throughput, score and accuracy statistics."""
+    states.WEIRD_DETECTION_MODEL = None
+    load_weird_detection_model(backend)
+    detector = states.WEIRD_DETECTION_MODEL
+    detector.predict(images[:batch_size])  # Warmup
+
+    start = time.perf_counter()
+    detections = []
+    for i in range(0, len(images), batch_size):
+        detections.extend(detector.predict(images[i:i + batch_size]))
+    elapsed = time.perf_counter() - start
+
+    scores = np.concatenate([scores for _, scores in detections]) if detections else np.zeros(0)
+    result = {
+        "images_per_second": len(images) / elapsed,
+        "with_detection": np.mean([len(boxes) > 0 for boxes, _ in detections]),
+        "detections_per_image": len(scores) / len(images),
+        "score_percentiles": np.percentile(scores, [10, 50, 90]) if len(scores) else None,
+    }
+    if ground_truths is not None:
+        true_positives = sum(_matches(boxes, truth) for (boxes, _), truth in zip(detections, ground_truths))
+        result["precision"] = true_positives / max(len(scores), 1)
+        result["recall"] = true_positives / max(sum(len(truth) for truth in ground_truths), 1)
+    return result
+
+def main():
+    """Runs the detector backend comparison."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backends", nargs="+", default=["eager", "yolo"])
+    parser.add_argument("--images", default=SAMPLE_IMAGES, help="Glob of the images to detect.")
+    parser.add_argument("--labels", default=None, help="Folder with YOLO labels named like the images.")
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--batch-size", type=int, default=4)
+    args = parser.parse_args()
+
+    states.DEVICE = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    image_paths = sorted(glob.glob(args.images))[:args.limit]
+    # Same input as the app, RGB at 640x640
+    images = [np.array(Image.open(path).convert("RGB").resize((640, 640), Image.BILINEAR)) for path in image_paths]
+    ground_truths = None
+    if args.labels:
+        ground_truths = [
+            _load_labels(os.path.join(args.labels, os.path.splitext(os.path.basename(path))[0] + ".txt"), 640, 640)
+            for path in image_paths
+        ]
+    print(f"{len(images)} images on {states.DEVICE}, batch size {args.batch_size}.")
+
+    for backend in args.backends:
+        result = measure(backend, images, ground_truths, args.batch_size)
+        percentiles = result["score_percentiles"]
+        scores = "no detections" if percentiles is None else "scores p10/p50/p90 " + "/".join(f"{p:.2f}" for p in percentiles)
+        line = (f"{backend:<12} {result['images_per_second']:7.1f} images/s, "
+                f"{result['with_detection'] * 100:5.1f}% with detection, {result['detections_per_image']:.2f} per image, {scores}")
+        if ground_truths is not None:
+            line += f", precision {result['precision']:.3f}, recall {result['recall']:.3f}"
+        print(line)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""benchmarks/bench_diffusion_profiles.py"""
+# Seconds per image of every diffusion profile and how close its images come to the "high" profile with the same
+# seeds and masks (PSNR and SSIM of the inpainted region). Needs the SDXL weights (and the LCM-LoRA for "preview"),
+# run it on the GPU machine (from App/Backend):
+#   python -m benchmarks.bench_diffusion_profiles [--limit 4] [--profiles preview standard high]
+
+# Imports
+import argparse
+import glob
+import os
+import time
+import cv2
+import numpy as np
+import torch
+from PIL import Image
+from models.loaders import load_generation_model
+from services import states
+from services.image_inpainting import inpaint_images, DIFFUSION_PROFILES
+
+SAMPLE_IMAGES = os.path.join(os.path.dirname(__file__), "..", "..", "..", "Data", "yolo", "nuScenes", "images", "train", "*.png")
+PROMPT = "a giant rubber duck"
+STRENGTHS = (0.5, 0.6, 0.7, 0.8)
+# Fixed region on the road in front of the camera (fractions of the image size)
+REGION = (0.35, 0.6, 0.65, 0.9)
+
+def psnr(image, reference):
+    """Peak signal-to-noise ratio of two uint8 images in dB."""
+    mse = np.mean((image.astype(np.float64) - reference.astype(np.float64)) ** 2)
+    return float("inf") if mse == 0 else 10 * np.log10(255.0 ** 2 / mse)
+
+def ssim(image, reference):
+    """Mean structural similarity of the grayscale images (Gaussian window of 11 px, sigma 1.5)."""
+    x = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY).astype(np.float64)
+    y = cv2.cvtColor(reference, cv2.COLOR_RGB2GRAY).astype(np.float64)
+    c1, c2 = (0.01 * 255) ** 2, (0.03 * 255) ** 2
+
+    def blur(values):
+        return cv2.GaussianBlur(values, (11, 11), 1.5)
+
+    mu_x, mu_y = blur(x), blur(y)
+    sigma_x = blur(x * x) - mu_x ** 2
+    sigma_y = blur(y * y) - mu_y ** 2
+    sigma_xy = blur(x * y) - mu_x * mu_y
+    ssim_map = ((2 * mu_x * mu_y + c1) * (2 * sigma_xy + c2)) / ((mu_x ** 2 + mu_y ** 2 + c1) * (sigma_x + sigma_y + c2))
+    return float(ssim_map.mean())
+
+def run_profile(profile, street_images):
+    """Inpaints every street image with the profile, returns the seconds per image and the region crops."""
+    if torch.cuda.is_available():
+        torch.cuda.synchronize()
+    start = time.perf_counter()
+    crops = []
+    for street_image in street_images:
+        width, height = street_image.size
+        bbox = tuple(int(v) for v in (REGION[0] * width, REGION[1] * height, REGION[2] * width, REGION[3] * height))
+        images = inpaint_images(street_image, [bbox] * len(STRENGTHS), PROMPT, STRENGTHS, profile=profile)
+        crops.extend(np.array(image.crop(bbox)) for image in images)
+    if torch.cuda.is_available():
+        torch.cuda.synchronize()
+    return (time.perf_counter() - start) / (len(street_images) * len(STRENGTHS)), crops
+
+def main():
+    """Runs the diffusion profile comparison."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--profiles", nargs="+", choices=list(DIFFUSION_PROFILES), default=list(DIFFUSION_PROFILES))
+    parser.add_argument("--images", default=SAMPLE_IMAGES, help="Glob of the street images.")
+    parser.add_argument("--limit", type=int, default=4)
+    args = parser.parse_args()
+
+    states.DEVICE = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    load_generation_model()
+    street_images = [Image.open(path).convert("RGB") for path in sorted(glob.glob(args.images))[:args.limit]]
+    print(f"{len(street_images)} street images x {len(STRENGTHS)} variants on {states.DEVICE}.")
+
+    # Warmup, the first run of a profile creates its scheduler and loads its LoRA
+    for profile in args.profiles:
+        inpaint_images(street_images[0], [(0, 0, 64, 64)], PROMPT, (0.6,), profile=profile)
+
+    results = {profile: run_profile(profile, street_images) for profile in args.profiles}
+    reference = results["high"][1] if "high" in results else None
+    for profile, (seconds, crops) in results.items():
+        settings = DIFFUSION_PROFILES[profile]
+        line = f"{profile:<10} {settings.num_inference_steps:3d} steps {settings.width}x{settings.height:<5} {seconds:6.2f} s/image"
+        if reference is not None and profile != "high":
+            line += (f", PSNR {np.mean([psnr(crop, other) for crop, other in zip(crops, reference)]):5.1f} dB"
+                     f", SSIM {np.mean([ssim(crop, other) for crop, other in zip(crops, reference)]):.3f} vs high")
+        print(line)
+
+if __name__ == "__main__":
+    main()
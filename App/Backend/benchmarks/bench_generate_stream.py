@@ -0,0 +1,49 @@
+"""benchmarks/bench_generate_stream.py"""
+# Compares the time to the first image of /generate and /generate/stream on a running backend.
+# Usage (from App/Backend): python -m benchmarks.bench_generate_stream --url http://127.0.0.1:8000
+
+# Imports
+import argparse
+import json
+import time
+import httpx
+
+def time_generate(client, prompt):
+    """Seconds until /generate returns, all variants arrive at once."""
+    start = time.perf_counter()
+    client.post("/generate", json={"prompt": prompt}).raise_for_status()
+    return time.perf_counter() - start
+
+def time_generate_stream(client, prompt, previews):
+    """Seconds until the first preview, the first image and the last event of /generate/stream."""
+    start = time.perf_counter()
+    first_preview = first_image = None
+    with client.stream("POST", "/generate/stream", params={"previews": previews}, json={"prompt": prompt}) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            event = json.loads(line)
+            if event["type"] == "preview" and first_preview is None:
+                first_preview = time.perf_counter() - start
+            if event["type"] == "image" and first_image is None:
+                first_image = time.perf_counter() - start
+    return first_preview, first_image, time.perf_counter() - start
+
+def main():
+    """Runs the comparison."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--prompt", default="A panda juggles on the middle lane.")
+    parser.add_argument("--previews", action="store_true")
+    args = parser.parse_args()
+
+    with httpx.Client(base_url=args.url, timeout=900) as client:
+        total = time_generate(client, args.prompt)
+        first_preview, first_image, stream_total = time_generate_stream(client, args.prompt, args.previews)
+
+    print(f"/generate         first image {total:7.1f}s  total {total:7.1f}s")
+    print(f"/generate/stream  first image {first_image:7.1f}s  total {stream_total:7.1f}s")
+    if first_preview is not None:
+        print(f"/generate/stream  first preview {first_preview:5.1f}s")
+
+if __name__ == "__main__":
+    main()
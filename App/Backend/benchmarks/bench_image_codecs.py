@@ -0,0 +1,60 @@
+"""benchmarks/bench_image_codecs.py"""
+# Decode (to 640x640) and JPEG encode throughput of the image codecs on the nuScenes street images,
+# both as the PNG files of the dataset and re-encoded as camera-like JPEGs.
+# Usage (from App/Backend): python -m benchmarks.bench_image_codecs [--repeats 20]
+
+# Imports
+import argparse
+import glob
+import io
+import os
+import time
+import numpy as np
+from PIL import Image
+from services.image_codecs import IMAGE_CODECS, create_image_codec
+
+SAMPLE_IMAGES = os.path.join(os.path.dirname(__file__), "..", "..", "..", "Data", "yolo", "nuScenes", "images", "train", "*.png")
+
+def _images_per_second(function, items, repeats):
+    """Throughput of function over all items, best of several rounds."""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for item in items:
+            function(item)
+        best = min(best, time.perf_counter() - start)
+    return len(items) / best
+
+def main():
+    """Runs the codec comparison."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    png_files = []
+    jpeg_files = []
+    arrays = []
+    for image_path in sorted(glob.glob(SAMPLE_IMAGES)):
+        with open(image_path, "rb") as image_file:
+            png_files.append(image_file.read())
+        image = Image.open(image_path).convert("RGB")
+        buffered = io.BytesIO()
+        image.save(buffered, format="JPEG", quality=90)
+        jpeg_files.append(buffered.getvalue())
+        arrays.append(np.array(image.resize((640, 640))))
+
+    print(f"{len(png_files)} images, {Image.open(io.BytesIO(png_files[0])).size}")
+    print(f"{'codec':10s} {'decode jpeg':>12s} {'decode png':>12s} {'encode jpeg':>12s}   images/s")
+    for name in IMAGE_CODECS:
+        try:
+            codec = create_image_codec(name)
+        except ImportError as e:
+            print(f"{name:10s} skipped ({e})")
+            continue
+        decode_jpeg = _images_per_second(lambda data: codec.decode(data, (640, 640)), jpeg_files, args.repeats)
+        decode_png = _images_per_second(lambda data: codec.decode(data, (640, 640)), png_files, max(1, args.repeats // 4))
+        encode_jpeg = _images_per_second(codec.encode_jpeg, arrays, args.repeats)
+        print(f"{name:10s} {decode_jpeg:12.1f} {decode_png:12.1f} {encode_jpeg:12.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""benchmarks/bench_inpaint_region.py"""
+# Times the inscribed rectangle search (exact and coarse-to-fine) on a nuScenes sized road polygon, and the whole region
+# selection from YOLO segmentation results (string round trip against the polygon arrays).
+# Usage (from App/Backend): python -m benchmarks.bench_inpaint_region
+
+# Imports
+import time
+from types import SimpleNamespace
+import numpy as np
+from services import inpaint_region
+from tests import legacy_region
+
+IMAGE_WIDTH = 1600
+IMAGE_HEIGHT = 900
+ROAD_POLYGON = "0.0 0.98 0.38 0.52 0.55 0.5 0.99 0.9 0.99 0.99 0.0 0.99"
+# Tolerance of the approximate search, the service searches exactly by default
+COARSE_TOLERANCE = 4
+# YOLO mask contours have a vertex every few pixels
+VERTICES_PER_POLYGON = 600
+
+def _time(function, repeats):
+    """Returns the best wall time of the given function in seconds."""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+def _dense_polygon(vertices, count):
+    """Resamples a closed polygon to count vertices along its outline, like a YOLO mask contour."""
+    closed = np.vstack([vertices, vertices[:1]]).astype(np.float64)
+    lengths = np.concatenate([[0], np.cumsum(np.linalg.norm(np.diff(closed, axis=0), axis=1))])
+    positions = np.linspace(0, lengths[-1], count, endpoint=False)
+    return np.stack([np.interp(positions, lengths, closed[:, 0]), np.interp(positions, lengths, closed[:, 1])], axis=1).astype(np.float32)
+
+def _segmentation_results():
+    """YOLO-like results with the road, a sidewalk and a small road patch (last, as the string pipeline picks it)."""
+    road = legacy_region._parse_polygon_string(ROAD_POLYGON, IMAGE_WIDTH, IMAGE_HEIGHT)
+    sidewalk = np.array([[0, 700], [500, 560], [520, 600], [0, 780]])
+    patch = np.array([[1200, 800], [1350, 800], [1350, 880], [1200, 880]])
+    polygons = [_dense_polygon(p, VERTICES_PER_POLYGON) for p in (road, sidewalk, patch)]
+    return [SimpleNamespace(masks=SimpleNamespace(xy=polygons))]
+
+def region_selection():
+    """Compares the region selection through polygon strings with the one on the polygon arrays."""
+    results = _segmentation_results()
+    street_image = SimpleNamespace(width=IMAGE_WIDTH, height=IMAGE_HEIGHT)
+
+    def string_round_trip():
+        polygon = legacy_region.extract_street_polygon(results, street_image)
+        vertices = legacy_region._parse_polygon_string(polygon, IMAGE_WIDTH, IMAGE_HEIGHT)
+        bbox = inpaint_region.get_suitable_inpaint_area(vertices, IMAGE_WIDTH, IMAGE_HEIGHT)
+        return bbox, legacy_region.get_height_diff(polygon, bbox, IMAGE_HEIGHT)
+
+    string_seconds, (string_bbox, _) = _time(string_round_trip, repeats=5)
+    print(f"Region selection ({VERTICES_PER_POLYGON} vertices per polygon, 3 polygons)")
+    print(f"{'String round trip (last)':<26}{string_seconds * 1000:7.1f} ms  bbox={string_bbox}")
+    for selection in ("last", "largest", "suitable"):
+        seconds, (_, bbox, _) = _time(lambda selection=selection: inpaint_region.get_suitable_region(results, street_image, selection), repeats=5)
+        print(f"{f'Arrays ({selection})':<26}{seconds * 1000:7.1f} ms  bbox={bbox}")
+
+def main():
+    """Compares the loop based and the vectorized region search."""
+    vertices = legacy_region._parse_polygon_string(ROAD_POLYGON, IMAGE_WIDTH, IMAGE_HEIGHT)
+    mask = inpaint_region._rasterize_polygon(IMAGE_WIDTH, IMAGE_HEIGHT, vertices)
+
+    def legacy():
+        height_map = legacy_region._calculate_height_map(mask)
+        return legacy_region._find_largest_inscribed_rectangle(height_map)[1]
+
+    def vectorized():
+        height_map = inpaint_region._calculate_height_map(mask)
+        return inpaint_region._find_largest_inscribed_rectangle(height_map)[1]
+
+    def coarse_to_fine():
+        return inpaint_region._find_inscribed_rectangle_coarse_to_fine(mask, COARSE_TOLERANCE)[1]
+
+    legacy_seconds, legacy_bbox = _time(legacy, repeats=1)
+    vectorized_seconds, vectorized_bbox = _time(vectorized, repeats=10)
+    coarse_seconds, coarse_bbox = _time(coarse_to_fine, repeats=10)
+    area_ratio = inpaint_region._rectangle_area(coarse_bbox) / inpaint_region._rectangle_area(vectorized_bbox)
+
+    print(f"Image size:  {IMAGE_WIDTH}x{IMAGE_HEIGHT}")
+    print(f"Legacy:      {legacy_seconds * 1000:9.1f} ms  bbox={tuple(int(v) for v in legacy_bbox)}")
+    print(f"Vectorized:  {vectorized_seconds * 1000:9.1f} ms  bbox={vectorized_bbox}")
+    print(f"Speedup:     {legacy_seconds / vectorized_seconds:9.1f}x")
+    print(f"Coarse-to-fine (tolerance {COARSE_TOLERANCE}): {coarse_seconds * 1000:.1f} ms  "
+          f"bbox={coarse_bbox}  area {area_ratio * 100:.1f}% of exact, {vectorized_seconds / coarse_seconds:.1f}x faster than exact")
+    print()
+    region_selection()
+
+if __name__ == "__main__":
+    main()
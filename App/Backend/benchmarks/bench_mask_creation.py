@@ -0,0 +1,47 @@
+"""benchmarks/bench_mask_creation.py"""
+# Mask creation time per /generate request (one feathered mask per variant on a nuScenes sized street image):
+# blurring a drawn rectangle over the whole frame with PIL against the cached edge profile of MaskFactory.
+# Usage (from App/Backend): python -m benchmarks.bench_mask_creation
+
+# Imports
+import time
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter
+from services import image_inpainting
+
+IMAGE_SIZE = (1600, 900)
+BBOXES = [(700, 520, 860, 680), (640, 600, 780, 760), (900, 560, 1000, 660), (560, 640, 820, 899)]
+
+def pil_mask(bbox):
+    """The former create_mask_image: Gaussian blur of the whole frame."""
+    mask = Image.new("L", IMAGE_SIZE, 0)
+    ImageDraw.Draw(mask).rectangle(bbox, fill=255)
+    return mask.filter(ImageFilter.GaussianBlur(image_inpainting.MASK_BLUR_RADIUS))
+
+def _time(function, repeats):
+    """Returns the mean wall time of the given function in seconds."""
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = function()
+    return (time.perf_counter() - start) / repeats, result
+
+def main():
+    """Runs the mask creation comparison."""
+    repeats = 20
+    pil_seconds, pil_masks = _time(lambda: [pil_mask(bbox) for bbox in BBOXES], repeats)
+
+    start = time.perf_counter()
+    image_inpainting.get_mask_factory(IMAGE_SIZE)
+    setup_seconds = time.perf_counter() - start
+    factory_seconds, masks = _time(lambda: [image_inpainting.create_mask(*IMAGE_SIZE, *bbox) for bbox in BBOXES], repeats)
+    image_seconds, _ = _time(lambda: [image_inpainting.create_mask_image(*IMAGE_SIZE, *bbox) for bbox in BBOXES], repeats)
+
+    difference = max(np.abs(mask * 255 - np.asarray(pil, dtype=np.float32)).max() for mask, pil in zip(masks, pil_masks))
+    print(f"{len(BBOXES)} masks of {IMAGE_SIZE[0]}x{IMAGE_SIZE[1]} per request")
+    print(f"{'PIL GaussianBlur':<28}{pil_seconds * 1000:8.2f} ms/request")
+    print(f"{'MaskFactory arrays':<28}{factory_seconds * 1000:8.2f} ms/request (profile setup once {setup_seconds * 1000:.2f} ms)")
+    print(f"{'MaskFactory as PIL images':<28}{image_seconds * 1000:8.2f} ms/request")
+    print(f"Largest difference to the PIL masks: {difference:.1f} / 255")
+
+if __name__ == "__main__":
+    main()
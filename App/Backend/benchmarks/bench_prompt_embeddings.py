@@ -0,0 +1,62 @@
+"""benchmarks/bench_prompt_embeddings.py"""
+# Text encoder time of one /generate request (four variants, one diffusion run each) with and without the
+# prompt embedding cache, for a new prompt and a repeated one. Needs the SDXL weights (from App/Backend):
+#   python -m benchmarks.bench_prompt_embeddings [--repeats 10]
+
+# Imports
+import argparse
+import time
+import torch
+from models.loaders import load_generation_model
+from services import states
+from services.prompt_embedding_cache import PromptEmbeddingCache
+
+VARIANTS = 4
+PROMPT = "a giant rubber duck, street view, scene, photography, detailed, high quality, near the camera"
+NEGATIVE_PROMPT = "blurry, artifacts, distorted, extra limbs, low quality, unrealistic, ugly"
+
+def _synchronized_time(function):
+    if torch.cuda.is_available():
+        torch.cuda.synchronize()
+    start = time.perf_counter()
+    function()
+    if torch.cuda.is_available():
+        torch.cuda.synchronize()
+    return time.perf_counter() - start
+
+def uncached_request(pipeline):
+    """What every diffusion run did before: both prompts through both text encoders."""
+    for _ in range(VARIANTS):
+        with torch.no_grad():
+            pipeline.encode_prompt(PROMPT, negative_prompt=NEGATIVE_PROMPT, do_classifier_free_guidance=True)
+
+def cached_request(pipeline, cache):
+    """Lookups of one request through the cache, as in realvisxl_inpaint_batch()."""
+    for _ in range(VARIANTS):
+        cache.get(pipeline, PROMPT)
+        cache.get(pipeline, NEGATIVE_PROMPT, pinned=True)
+
+def main():
+    """Runs the prompt embedding comparison."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeats", type=int, default=10)
+    args = parser.parse_args()
+
+    states.DEVICE = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    load_generation_model()
+    pipeline = states.GENERATION_MODEL
+    uncached_request(pipeline)  # Warmup
+
+    uncached = min(_synchronized_time(lambda: uncached_request(pipeline)) for _ in range(args.repeats))
+    new_prompt = min(_synchronized_time(lambda: cached_request(pipeline, PromptEmbeddingCache())) for _ in range(args.repeats))
+    cache = PromptEmbeddingCache()
+    cached_request(pipeline, cache)
+    repeated_prompt = min(_synchronized_time(lambda: cached_request(pipeline, cache)) for _ in range(args.repeats))
+
+    print(f"Text encoder time per request ({VARIANTS} variants) on {states.DEVICE}")
+    print(f"{'Without cache':<28}{uncached * 1000:8.2f} ms")
+    print(f"{'Cache, new prompt':<28}{new_prompt * 1000:8.2f} ms")
+    print(f"{'Cache, repeated prompt':<28}{repeated_prompt * 1000:8.2f} ms")
+
+if __name__ == "__main__":
+    main()
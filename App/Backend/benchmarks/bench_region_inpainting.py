@@ -0,0 +1,76 @@
+"""benchmarks/bench_region_inpainting.py"""
+# A/B latency of the full canvas inpainting against the region-focused mode (padded window around the bbox at the
+# SDXL scale) on the same street images, bboxes and seeds, per diffusion profile. Also reports how much of the
+# background each mode keeps (PSNR outside the region window against the street image).
+# Needs the SDXL weights, run it on the GPU machine (from App/Backend):
+#   python -m benchmarks.bench_region_inpainting [--limit 4] [--profiles high preview]
+
+# Imports
+import argparse
+import glob
+import time
+import numpy as np
+import torch
+from PIL import Image
+from benchmarks.bench_diffusion_profiles import SAMPLE_IMAGES, PROMPT, STRENGTHS, psnr
+from models.loaders import load_generation_model
+from services import states
+from services.image_inpainting import inpaint_images, region_window, region_window_size, DIFFUSION_PROFILES, INPAINT_MODES
+
+# Bbox sizes (fractions of the image width and height), generate() picks 40-70%, the small one is for reference
+BBOX_FRACTIONS = (0.15, 0.4, 0.7)
+
+def _bbox(street_image, fraction):
+    """Bbox of the given size on the road in front of the camera."""
+    width, height = street_image.size
+    bbox_width, bbox_height = int(fraction * width), int(fraction * height)
+    x1, y1 = (width - bbox_width) // 2, height - bbox_height - int(0.05 * height)
+    return x1, y1, x1 + bbox_width, y1 + bbox_height
+
+def run(mode, profile, street_images, fraction):
+    """Inpaints every street image, returns the seconds per image and the background PSNR."""
+    if torch.cuda.is_available():
+        torch.cuda.synchronize()
+    start = time.perf_counter()
+    rounds = []
+    for street_image in street_images:
+        bbox = _bbox(street_image, fraction)
+        rounds.append((street_image, bbox, inpaint_images(street_image, [bbox] * len(STRENGTHS), PROMPT, STRENGTHS, profile=profile, mode=mode)))
+    if torch.cuda.is_available():
+        torch.cuda.synchronize()
+    seconds = (time.perf_counter() - start) / (len(street_images) * len(STRENGTHS))
+
+    background_psnr = []
+    for street_image, bbox, images in rounds:
+        left, top, right, bottom = region_window(bbox, street_image.size, region_window_size([bbox], street_image.size))
+        outside = np.ones((street_image.height, street_image.width), dtype=bool)
+        outside[top:bottom, left:right] = False
+        background_psnr.extend(psnr(np.asarray(image)[outside], np.asarray(street_image)[outside]) for image in images)
+    return seconds, np.mean(background_psnr)
+
+def main():
+    """Runs the full canvas / region comparison."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--profiles", nargs="+", choices=list(DIFFUSION_PROFILES), default=["high", "preview"])
+    parser.add_argument("--images", default=SAMPLE_IMAGES, help="Glob of the street images.")
+    parser.add_argument("--limit", type=int, default=4)
+    args = parser.parse_args()
+
+    states.DEVICE = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    load_generation_model()
+    street_images = [Image.open(path).convert("RGB") for path in sorted(glob.glob(args.images))[:args.limit]]
+    print(f"{len(street_images)} street images x {len(STRENGTHS)} variants on {states.DEVICE}.")
+
+    for profile in args.profiles:
+        # Warmup, the first run of a profile creates its scheduler and loads its LoRA
+        for mode in INPAINT_MODES:
+            inpaint_images(street_images[0], [_bbox(street_images[0], BBOX_FRACTIONS[0])], PROMPT, (0.6,), profile=profile, mode=mode)
+        for fraction in BBOX_FRACTIONS:
+            results = {mode: run(mode, profile, street_images, fraction) for mode in INPAINT_MODES}
+            line = f"{profile:<9} bbox {fraction * 100:4.0f}% of the image:"
+            for mode, (seconds, background_psnr) in results.items():
+                line += f"  {mode} {seconds:6.2f} s/image (background PSNR {background_psnr:5.1f} dB)"
+            print(line + f"  speedup {results['full'][0] / results['region'][0]:.2f}x")
+
+if __name__ == "__main__":
+    main()
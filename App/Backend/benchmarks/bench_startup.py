@@ -0,0 +1,54 @@
+"""benchmarks/bench_startup.py"""
+# Measures the cold start per model profile with sequential and parallel loading.
+# Needs the real model weights, run it on a backend machine (from App/Backend):
+#   python -m benchmarks.bench_startup --profiles detect generate full --output startup_times.json
+
+# Imports
+import argparse
+import json
+import time
+import torch
+from models.loaders import MODEL_LOADERS, unload_models
+from services import states
+from services.model_registry import ModelRegistry, MODEL_PROFILES
+
+def measure(profile, max_workers):
+    """Loads all models of a profile and returns the wall time and the per-model times."""
+    unload_models()
+    if torch.cuda.is_available():
+        torch.cuda.empty_cache()
+
+    registry = ModelRegistry(MODEL_LOADERS, profile=profile, lazy=False)
+    start = time.perf_counter()
+    registry.load_all(max_workers=max_workers)
+    return {
+        "seconds": time.perf_counter() - start,
+        "ready": registry.is_ready(),
+        "models": {name: status["load_seconds"] for name, status in registry.status.items()},
+    }
+
+def main():
+    """Records the startup time of every profile."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--profiles", nargs="+", default=list(MODEL_PROFILES))
+    parser.add_argument("--output", default=None, help="Optional JSON file for the results.")
+    args = parser.parse_args()
+
+    states.DEVICE = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    results = {}
+    for profile in args.profiles:
+        results[profile] = {
+            "sequential": measure(profile, max_workers=1),
+            "parallel": measure(profile, max_workers=len(MODEL_PROFILES[profile])),
+        }
+        for mode, result in results[profile].items():
+            print(f"{profile:9s} {mode:10s} {result['seconds']:7.1f}s  " + "  ".join(
+                f"{name}={seconds:.1f}s" for name, seconds in result["models"].items() if seconds is not None
+            ))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump(results, output_file, indent=2)
+
+if __name__ == "__main__":
+    main()
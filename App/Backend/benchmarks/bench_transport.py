@@ -0,0 +1,85 @@
+"""benchmarks/bench_transport.py"""
+# Compares base64 JSON and binary transport for /detect and /generate.
+# Without --url only the serialization path is measured on the nuScenes sample images;
+# with --url the endpoints of a running backend are called end to end.
+# Usage (from App/Backend): python -m benchmarks.bench_transport [--url http://127.0.0.1:8000]
+
+# Imports
+import argparse
+import base64
+import glob
+import json
+import os
+import time
+from PIL import Image
+from services.image_utils import base64_to_image, bytes_to_image, image_to_png_bytes, multipart_body
+
+SAMPLE_IMAGES = os.path.join(os.path.dirname(__file__), "..", "..", "..", "Data", "yolo", "nuScenes", "images", "train", "*.png")
+
+def _best_of(function, repeats=5):
+    """Returns the fastest of several runs in seconds."""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def bench_serialization(image_paths):
+    """Payload size and client + server serialization time per transport."""
+    for image_path in image_paths:
+        with Image.open(image_path) as image:
+            street_image = image.convert("RGB")
+        png = image_to_png_bytes(street_image)
+
+        def detect_json():
+            body = json.dumps({"prompt": "a panda", "imageBase64": base64.b64encode(png).decode("utf-8")})
+            base64_to_image(json.loads(body)["imageBase64"])
+            return body
+
+        def detect_binary():
+            bytes_to_image(png)
+
+        def generate_json():
+            return json.dumps({"images": [{"prompt": "a panda", "imageBase64": base64.b64encode(png).decode("utf-8")}] * 4})
+
+        def generate_binary():
+            return multipart_body([("image/png", {}, png)] * 4, "boundary")
+
+        print(os.path.basename(image_path)[:40])
+        print(f"  /detect    json {len(detect_json()):>10d} B  {_best_of(detect_json) * 1000:7.1f} ms")
+        print(f"  /detect    bin  {len(png):>10d} B  {_best_of(detect_binary) * 1000:7.1f} ms")
+        print(f"  /generate  json {len(generate_json()):>10d} B  {_best_of(generate_json) * 1000:7.1f} ms")
+        print(f"  /generate  bin  {len(generate_binary()):>10d} B  {_best_of(generate_binary) * 1000:7.1f} ms")
+
+def bench_endpoints(url, image_path, repeats):
+    """End to end latency of the JSON and binary /detect endpoints of a running backend."""
+    import httpx
+
+    with open(image_path, "rb") as image_file:
+        image_data = image_file.read()
+    image_base64 = base64.b64encode(image_data).decode("utf-8")
+
+    with httpx.Client(base_url=url, timeout=300) as client:
+        json_seconds = _best_of(lambda: client.post("/detect", json={"prompt": "a panda", "imageBase64": image_base64}).raise_for_status(), repeats)
+        binary_seconds = _best_of(lambda: client.post(
+            "/detect/binary", params={"prompt": "a panda"}, content=image_data, headers={"Content-Type": "image/png"}
+        ).raise_for_status(), repeats)
+
+    print(f"/detect json   {json_seconds * 1000:8.1f} ms")
+    print(f"/detect binary {binary_seconds * 1000:8.1f} ms")
+
+def main():
+    """Runs the transport comparison."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default=None)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    image_paths = sorted(glob.glob(SAMPLE_IMAGES))
+    bench_serialization(image_paths)
+    if args.url:
+        bench_endpoints(args.url, image_paths[0], args.repeats)
+
+if __name__ == "__main__":
+    main()
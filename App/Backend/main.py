@@ -1,68 +1,126 @@
 """main.py"""
-# General Library Imports
-import re
-import os
-
 # Backend Library Imports
 import asyncio
-from contextlib import asynccontextmanager
-from fastapi import FastAPI
+import uuid
+from contextlib import asynccontextmanager, suppress
+from fastapi import FastAPI, Request, HTTPException
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from starlette.datastructures import UploadFile
 
 # AI Related Imports
-from ultralytics import YOLO
-from diffusers import StableDiffusionXLInpaintPipeline, DPMSolverMultistepScheduler
-from detectron2.engine import DefaultPredictor
-import transformers
 import torch
 
 # Schema Imports
 from schemas.images import DetectionRequest, DetectionResponse, ImageGenerationPrompt, GeneratedImages
 
-# Model Config Imports
-from models.configurations import detectron_cfg
+# Model Loader Imports
+from models.loaders import MODEL_LOADERS, unload_models
 
 # Function Imports
 from services import states
-from services.image_detection import detect
-from services.image_generation import generate
-
-
-# Setting Correct Paths
-current_directory = os.getcwd()
-path_to_base_directory = re.search(rf"(.*?){"Weird-Stuff-In-Traffic"}", current_directory).group(1)
-
-# Model Paths
-street_detection_model_path = "Weird-Stuff-In-Traffic/App/Backend/models"
-full_street_detection_detection_model_path = path_to_base_directory + street_detection_model_path + "/streetseg_256_auto.pt"
+from services.image_detection import detect, detect_binary
+from services.image_generation import generate, generate_binary, generate_stream, run_pool_producer
+from services.image_utils import multipart_body
+from services.street_index import load_street_region_index
+from services.scheduler import ModelScheduler, SchedulerBusyError
+from services.sessions import create_session_store
+from services.model_registry import ModelRegistry, ModelUnavailableError
+from services.failed_images import FailedImageSink
+from services.description_cache import DescriptionCache
+from services.generation_pool import GenerationPool, GENERATION_POOL_ENABLED
 
 # Context Manager
 @asynccontextmanager
 async def lifespan(_):
     """App Lifespan."""
-    print("Loading models...")
     states.DEVICE = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-    states.BACKEND_LOCK = asyncio.Lock()
-    states.GENERATION_MODEL = StableDiffusionXLInpaintPipeline.from_pretrained("stabilityai/stable-diffusion-xl-base-1.0",torch_dtype=torch.float16, variant="fp16", safety_checker=None).to(states.DEVICE)
-    states.GENERATION_MODEL.scheduler = DPMSolverMultistepScheduler.from_config(states.GENERATION_MODEL.scheduler.config)
-    states.WEIRD_DETECTION_MODEL = DefaultPredictor(detectron_cfg)
-    states.STREET_DETECTION_MODEL = YOLO(full_street_detection_detection_model_path).to(states.DEVICE)
-    states.DETECTION_DESCRIPTION_PROCESSOR = transformers.Qwen2VLProcessor.from_pretrained("Qwen/Qwen2-VL-7B-Instruct", use_fast=True)
-    states.DETECTION_DESCRIPTION_MODEL = transformers.Qwen2VLForConditionalGeneration.from_pretrained("Qwen/Qwen2-VL-7B-Instruct", torch_dtype=torch.float16).to(states.DEVICE)
+    states.MODEL_SCHEDULER = ModelScheduler()
+    states.SESSION_STORE = create_session_store()
+    states.MODEL_REGISTRY = ModelRegistry(MODEL_LOADERS)
+    states.FAILED_IMAGE_SINK = FailedImageSink()
+    states.DESCRIPTION_CACHE = DescriptionCache()
+    producer_task = None
+    if "generation" in states.MODEL_REGISTRY.model_names:
+        states.STREET_REGION_INDEX = load_street_region_index()
+        if GENERATION_POOL_ENABLED:
+            states.GENERATION_POOL = GenerationPool()
+            producer_task = asyncio.create_task(run_pool_producer())
     print(f"Using {states.DEVICE}.")
-    print("Models loaded.")
+
+    # Models load in the background so that /healthz and /readyz answer during startup
+    loading_task = None
+    if states.MODEL_REGISTRY.lazy:
+        print(f"Models of the '{states.MODEL_REGISTRY.profile}' profile load on first use.")
+    else:
+        print(f"Loading models of the '{states.MODEL_REGISTRY.profile}' profile...")
+        loading_task = asyncio.create_task(asyncio.to_thread(states.MODEL_REGISTRY.load_all))
     yield
+    if producer_task is not None:
+        producer_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await producer_task
+    # A load still running is abandoned, its thread finishes in the background
+    if loading_task is not None:
+        loading_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await loading_task
+    unload_models()
     states.DEVICE = None
-    states.GENERATION_MODEL = None
-    states.WEIRD_DETECTION_MODEL = None
-    states.STREET_DETECTION_MODEL = None
-    states.DETECTION_DESCRIPTION_MODEL = None
-    states.DETECTION_DESCRIPTION_PROCESSOR = None
-    states.BACKEND_LOCK = None
+    states.STREET_REGION_INDEX = None
+    states.SESSION_STORE = None
+    states.MODEL_REGISTRY = None
+    states.DETECTION_BATCHERS = None
+    states.FAILED_IMAGE_SINK.close()
+    states.FAILED_IMAGE_SINK = None
+    states.DESCRIPTION_CACHE.close()
+    states.DESCRIPTION_CACHE = None
+    states.GENERATION_POOL = None
+    states.PROMPT_EMBEDDING_CACHE = None
+    states.MODEL_SCHEDULER.shutdown()
+    states.MODEL_SCHEDULER = None
     print("Models shut down.")
 
 # Defining App
 app = FastAPI(lifespan=lifespan)
 
+# Backpressure
+@app.exception_handler(SchedulerBusyError)
+async def scheduler_busy_handler(_: Request, exc: SchedulerBusyError):
+    """Rejects requests while the queue of a model is full."""
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "5"})
+
+@app.exception_handler(ModelUnavailableError)
+async def model_unavailable_handler(_: Request, exc: ModelUnavailableError):
+    """Rejects requests for models that are not loaded on this replica."""
+    return JSONResponse(status_code=503, content={"detail": str(exc)})
+
+# Health Checks
+@app.get("/healthz")
+async def healthz_endpoint():
+    """Liveness of the server process."""
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz_endpoint():
+    """Readiness with the load state and load time of every model."""
+    report = states.MODEL_REGISTRY.report()
+    return JSONResponse(status_code=200 if report["ready"] else 503, content=report)
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """
+    Queue depths of the models, counters of the failed image writer, the description cache hit rate,
+    the hit rate and size of the generation pool (None if the replica has no pool) and the prompt
+    embedding cache hit rate (None before the first generation).
+    """
+    return {
+        "model_queues": states.MODEL_SCHEDULER.stats(),
+        "failed_images": states.FAILED_IMAGE_SINK.stats(),
+        "description_cache": states.DESCRIPTION_CACHE.stats(),
+        "generation_pool": states.GENERATION_POOL.stats() if states.GENERATION_POOL is not None else None,
+        "prompt_embedding_cache": states.PROMPT_EMBEDDING_CACHE.stats() if states.PROMPT_EMBEDDING_CACHE is not None else None,
+    }
+
 # Routes
 @app.post("/detect", response_model=DetectionResponse)
 async def detect_endpoint(req: DetectionRequest):
@@ -74,6 +132,74 @@ async def generate_endpoint(req: ImageGenerationPrompt):
     """Endpoint for detecting weird objects in an image."""
     return await generate(req)
 
+@app.post("/detect/binary")
+async def detect_binary_endpoint(request: Request, prompt: str | None = None, sessionToken: str | None = None):
+    """
+    Endpoint for detecting weird objects without base64, takes either multipart/form-data
+    (image, prompt, sessionToken) or a raw image body with the prompt as query parameter.
+    Returns the annotated JPEG with the score in the X-Score header.
+    """
+    session_token = sessionToken
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("image")
+        if upload is not None and not isinstance(upload, UploadFile):
+            raise HTTPException(status_code=400, detail="The image field must be a file upload")
+        image_data = await upload.read() if upload is not None else b""
+        image_type = upload.content_type if upload is not None else None
+        prompt = form.get("prompt", prompt)
+        session_token = form.get("sessionToken", session_token)
+    else:
+        image_data = await request.body()
+        image_type = content_type
+
+    if not prompt or not image_data:
+        raise HTTPException(status_code=400, detail="Missing prompt or image")
+
+    annotated_jpeg, score = await detect_binary(prompt, image_data, session_token)
+
+    # Images without detections are sent back unchanged
+    if annotated_jpeg is None:
+        return Response(content=image_data, media_type=image_type or "application/octet-stream", headers={"X-Score": str(score)})
+    return Response(content=annotated_jpeg, media_type="image/jpeg", headers={"X-Score": str(score)})
+
+@app.post("/generate/binary")
+async def generate_binary_endpoint(req: ImageGenerationPrompt):
+    """Endpoint for generating weird images, returns the PNG variants as multipart/mixed."""
+    png_images, session_token = await generate_binary(req)
+
+    boundary = uuid.uuid4().hex
+    body = multipart_body(
+        [("image/png", {"Content-Disposition": f'inline; filename="variant_{i}.png"'}, png) for i, png in enumerate(png_images)],
+        boundary
+    )
+    return Response(
+        content=body,
+        media_type=f"multipart/mixed; boundary={boundary}",
+        headers={"X-Session-Token": session_token}
+    )
+
+@app.post("/generate/stream")
+async def generate_stream_endpoint(req: ImageGenerationPrompt, request: Request, previews: bool = False):
+    """
+    Endpoint for generating weird images that sends every variant as soon as it is done.
+    Streams newline delimited JSON events, or server-sent events for Accept: text/event-stream.
+    """
+    events = await generate_stream(req, previews=previews)
+    server_sent_events = "text/event-stream" in request.headers.get("accept", "")
+
+    async def body():
+        async for event in events:
+            line = event.model_dump_json(exclude_none=True)
+            yield f"data: {line}\n\n" if server_sent_events else f"{line}\n"
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream" if server_sent_events else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache"}
+    )
+
 # Main Running Area
 if __name__ == "__main__":
     import uvicorn
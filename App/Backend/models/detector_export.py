@@ -0,0 +1,198 @@
+"""models/detector_export.py"""
+# Export of the Detectron2 weird object detector to TorchScript / ONNX and a predictor that runs the
+# exported graph with the DefaultPredictor contract. Export once (from App/Backend):
+#   python -m models.detector_export --formats torchscript onnx
+# and serve it with WEIRD_DETECTION_BACKEND=onnxruntime (or torchscript).
+
+# Imports
+import argparse
+import json
+import os
+import numpy as np
+import torch
+
+EXPORT_FORMATS = ("torchscript", "onnx")
+EXPORT_FILENAMES = {"torchscript": "model.ts", "onnx": "model.onnx"}
+METADATA_FILENAME = "export.json"
+DEFAULT_EXPORT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "detectron2_export")
+# The app resizes every image to 640x640 before detection, so the graph is traced at that size
+EXPORT_IMAGE_SIZE = (640, 640)
+
+def _sample_image(cfg, image_path=None):
+    """Preprocessed (C, H, W) float tensor of a street image (or a grey image), as DefaultPredictor builds it."""
+    from detectron2.data import transforms as T
+    from PIL import Image
+
+    if image_path:
+        image = np.array(Image.open(image_path).convert("RGB").resize(EXPORT_IMAGE_SIZE, Image.BILINEAR))
+    else:
+        image = np.full((EXPORT_IMAGE_SIZE[1], EXPORT_IMAGE_SIZE[0], 3), 127, dtype=np.uint8)
+    if cfg.INPUT.FORMAT == "BGR":
+        image = image[:, :, ::-1]
+    aug = T.ResizeShortestEdge([cfg.INPUT.MIN_SIZE_TEST, cfg.INPUT.MIN_SIZE_TEST], cfg.INPUT.MAX_SIZE_TEST)
+    image = aug.get_transform(image).apply_image(image)
+    return torch.as_tensor(image.astype("float32").transpose(2, 0, 1))
+
+def _inference(model, inputs):
+    # Boxes stay in the resized image coordinates, the predictor rescales them like the eager model
+    instances = model.inference(inputs, do_postprocess=False)[0]
+    return [{"instances": instances}]
+
+def export_detector(cfg, export_dir=DEFAULT_EXPORT_DIR, formats=EXPORT_FORMATS, image_path=None):
+    """
+    Traces the detector of cfg (with its MODEL.WEIGHTS) on CPU and writes the TorchScript and/or ONNX graph
+    with the metadata the predictor needs into export_dir. Returns the metadata.
+    """
+    from detectron2.checkpoint import DetectionCheckpointer
+    from detectron2.export import TracingAdapter, STABLE_ONNX_OPSET_VERSION
+    from detectron2.modeling import build_model
+
+    cfg = cfg.clone()
+    cfg.defrost()
+    cfg.MODEL.DEVICE = "cpu"
+    model = build_model(cfg)
+    DetectionCheckpointer(model).load(cfg.MODEL.WEIGHTS)
+    model.eval()
+
+    image = _sample_image(cfg, image_path)
+    inputs = [{"image": image}]
+    traceable_model = TracingAdapter(model, inputs, _inference)
+
+    # The adapter flattens the Instances fields in sorted order, followed by the image size
+    with torch.no_grad():
+        fields = _inference(model, inputs)[0]["instances"].get_fields()
+        output_names = sorted(fields) + ["image_size"]
+        if len(traceable_model(image)) != len(output_names):
+            raise RuntimeError(f"Unexpected traced outputs, expected {output_names}.")
+
+    os.makedirs(export_dir, exist_ok=True)
+    with torch.no_grad():
+        if "torchscript" in formats:
+            traced_model = torch.jit.trace(traceable_model, (image,))
+            traced_model.save(os.path.join(export_dir, EXPORT_FILENAMES["torchscript"]))
+        if "onnx" in formats:
+            torch.onnx.export(
+                traceable_model,
+                (image,),
+                os.path.join(export_dir, EXPORT_FILENAMES["onnx"]),
+                opset_version=STABLE_ONNX_OPSET_VERSION,
+                input_names=["image"],
+                output_names=output_names,
+            )
+
+    metadata = {
+        "formats": [export_format for export_format in EXPORT_FORMATS if export_format in formats],
+        "input_format": cfg.INPUT.FORMAT,
+        "min_size_test": cfg.INPUT.MIN_SIZE_TEST,
+        "max_size_test": cfg.INPUT.MAX_SIZE_TEST,
+        "score_thresh_test": cfg.MODEL.ROI_HEADS.SCORE_THRESH_TEST,
+        "output_names": output_names,
+        "weights": os.path.basename(cfg.MODEL.WEIGHTS),
+    }
+    with open(os.path.join(export_dir, METADATA_FILENAME), "w", encoding="utf-8") as metadata_file:
+        json.dump(metadata, metadata_file, indent=2)
+    print(f"Exported {', '.join(metadata['formats'])} to {export_dir}.")
+    return metadata
+
+def _torchscript_runner(model_path, num_threads):
+    if num_threads:
+        torch.set_num_threads(num_threads)  # TorchScript uses the process wide intra-op pool
+    module = torch.jit.load(model_path, map_location="cpu").eval()
+
+    def run(image):
+        return list(module(image))
+    return run
+
+def _onnxruntime_runner(model_path, num_threads):
+    import onnxruntime
+
+    options = onnxruntime.SessionOptions()
+    options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.execution_mode = onnxruntime.ExecutionMode.ORT_SEQUENTIAL
+    options.inter_op_num_threads = 1
+    if num_threads:
+        options.intra_op_num_threads = num_threads
+    session = onnxruntime.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+    input_name = session.get_inputs()[0].name
+
+    def run(image):
+        return [torch.from_numpy(output) for output in session.run(None, {input_name: image.numpy()})]
+    return run
+
+EXPORT_RUNNERS = {
+    "torchscript": ("torchscript", _torchscript_runner),
+    "onnxruntime": ("onnx", _onnxruntime_runner),
+}
+
+class ExportedModel:
+    """Batch model of the exported graph: list of {"image", "height", "width"} in, list of {"instances"} out."""
+
+    def __init__(self, run, output_names):
+        self.run = run
+        self.output_names = output_names
+
+    def __call__(self, batched_inputs):
+        from detectron2.modeling.postprocessing import detector_postprocess
+        from detectron2.structures import Boxes, Instances
+
+        results = []
+        for inputs in batched_inputs:
+            # The traced graph handles one image per call
+            outputs = dict(zip(self.output_names, self.run(inputs["image"])))
+            image_size = tuple(int(v) for v in outputs.pop("image_size"))
+            instances = Instances(image_size)
+            for name, value in outputs.items():
+                instances.set(name, Boxes(value) if name == "pred_boxes" else value)
+            height = inputs.get("height", image_size[0])
+            width = inputs.get("width", image_size[1])
+            results.append({"instances": detector_postprocess(instances, height, width)})
+        return results
+
+class ExportedPredictor:
+    """
+    Drop-in replacement of DefaultPredictor on CPU that runs the exported detector with ONNX Runtime or TorchScript.
+    Has the input_format, aug and model attributes used by the batched detection as well.
+    """
+
+    def __init__(self, export_dir=DEFAULT_EXPORT_DIR, backend="onnxruntime", num_threads=0):
+        if backend not in EXPORT_RUNNERS:
+            raise ValueError(f"Unknown exported detector backend: {backend}")
+        from detectron2.data import transforms as T
+
+        with open(os.path.join(export_dir, METADATA_FILENAME), encoding="utf-8") as metadata_file:
+            self.metadata = json.load(metadata_file)
+        export_format, create_runner = EXPORT_RUNNERS[backend]
+        model_path = os.path.join(export_dir, EXPORT_FILENAMES[export_format])
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"No {export_format} export in {export_dir}, run python -m models.detector_export first.")
+
+        self.backend = backend
+        self.input_format = self.metadata["input_format"]
+        min_size = self.metadata["min_size_test"]
+        self.aug = T.ResizeShortestEdge([min_size, min_size], self.metadata["max_size_test"])
+        self.model = ExportedModel(create_runner(model_path, num_threads), self.metadata["output_names"])
+
+    def __call__(self, original_image):
+        """Predicts a single image (H, W, C) in the RGB/BGR input format, like DefaultPredictor."""
+        with torch.no_grad():
+            if self.input_format == "RGB":
+                original_image = original_image[:, :, ::-1]
+            height, width = original_image.shape[:2]
+            image = self.aug.get_transform(original_image).apply_image(original_image)
+            image = torch.as_tensor(image.astype("float32").transpose(2, 0, 1))
+            return self.model([{"image": image, "height": height, "width": width}])[0]
+
+# Main Running Area
+if __name__ == "__main__":
+    from models.configurations import detectron_cfg
+
+    parser = argparse.ArgumentParser(description="Exports the Detectron2 weird object detector for CPU inference.")
+    parser.add_argument("--formats", nargs="+", choices=EXPORT_FORMATS, default=list(EXPORT_FORMATS))
+    parser.add_argument("--output", default=DEFAULT_EXPORT_DIR, help="Folder to write the exported model to.")
+    parser.add_argument("--weights", default=detectron_cfg.MODEL.WEIGHTS, help="Detectron2 checkpoint to export.")
+    parser.add_argument("--image", default=None, help="Street image to trace with, a grey image if not given (a real image is more robust).")
+    args = parser.parse_args()
+
+    export_cfg = detectron_cfg.clone()
+    export_cfg.MODEL.WEIGHTS = args.weights
+    export_detector(export_cfg, export_dir=args.output, formats=args.formats, image_path=args.image)
@@ -0,0 +1,133 @@
+"""models/loaders.py"""
+# Loader per served model. The heavy libraries are imported inside the loaders so that
+# a replica only pays for the models of its profile.
+
+# Imports
+import os
+import re
+import torch
+from services import states
+
+# Setting Correct Paths
+current_directory = os.getcwd()
+match = re.search(rf"(.*?){'Weird-Stuff-In-Traffic'}", current_directory)
+path_to_base_directory = match.group(1) if match else current_directory
+
+# Model Paths
+street_detection_model_path = "Weird-Stuff-In-Traffic/App/Backend/models"
+full_street_detection_detection_model_path = path_to_base_directory + street_detection_model_path + "/streetseg_256_auto.pt"
+
+# Detectron2 Deployment Settings
+WEIRD_DETECTION_BACKEND = os.environ.get("WEIRD_DETECTION_BACKEND", "eager")  # "eager", "onnxruntime", "torchscript" or "yolo"
+WEIRD_DETECTION_EXPORT_DIR = os.environ.get("WEIRD_DETECTION_EXPORT_DIR", "")  # Empty uses models/detectron2_export
+WEIRD_DETECTION_THREADS = int(os.environ.get("WEIRD_DETECTION_THREADS", 0))  # 0 keeps the runtime default
+# YOLO11 weights trained with Pipelines/yolo/train.py for the yolo backend
+WEIRD_DETECTION_YOLO_WEIGHTS = os.environ.get("WEIRD_DETECTION_YOLO_WEIGHTS", path_to_base_directory + street_detection_model_path + "/weird_yolo11.pt")
+WEIRD_DETECTION_YOLO_CONFIDENCE = float(os.environ.get("WEIRD_DETECTION_YOLO_CONFIDENCE", 0.4))
+
+# Qwen2-VL Deployment Settings
+DESCRIPTION_MODEL_ID = os.environ.get("DESCRIPTION_MODEL_ID", "Qwen/Qwen2-VL-7B-Instruct")  # "Qwen/Qwen2-VL-2B-Instruct" for small replicas
+DESCRIPTION_MODEL_BACKEND = os.environ.get("DESCRIPTION_MODEL_BACKEND", "auto")  # "auto" or a key of DESCRIPTION_BACKENDS
+
+def load_generation_model():
+    """Loads the SDXL inpainting pipeline."""
+    from diffusers import StableDiffusionXLInpaintPipeline, DPMSolverMultistepScheduler
+    generation_model = StableDiffusionXLInpaintPipeline.from_pretrained("stabilityai/stable-diffusion-xl-base-1.0",torch_dtype=torch.float16, variant="fp16", safety_checker=None).to(states.DEVICE)
+    generation_model.scheduler = DPMSolverMultistepScheduler.from_config(generation_model.scheduler.config)
+    states.GENERATION_MODEL = generation_model
+
+def load_weird_detection_model(backend=None):
+    """
+    Loads the weird object detector of the configured backend: Detectron2 eager, the exported
+    Detectron2 graph (see models/detector_export.py) or a YOLO model.
+    """
+    from services.detectors import Detectron2Detector, YoloDetector
+    backend = backend or WEIRD_DETECTION_BACKEND
+    print(f"Loading the weird object detector with the {backend} backend.")
+    if backend == "yolo":
+        from ultralytics import YOLO
+        model = YOLO(WEIRD_DETECTION_YOLO_WEIGHTS).to(states.DEVICE)
+        states.WEIRD_DETECTION_MODEL = YoloDetector(model, confidence=WEIRD_DETECTION_YOLO_CONFIDENCE, half=torch.device(states.DEVICE or "cpu").type == "cuda")
+    elif backend == "eager":
+        from detectron2.engine import DefaultPredictor
+        from models.configurations import detectron_cfg
+        states.WEIRD_DETECTION_MODEL = Detectron2Detector(DefaultPredictor(detectron_cfg))
+    else:
+        from models.detector_export import ExportedPredictor, DEFAULT_EXPORT_DIR
+        states.WEIRD_DETECTION_MODEL = Detectron2Detector(ExportedPredictor(
+            WEIRD_DETECTION_EXPORT_DIR or DEFAULT_EXPORT_DIR, backend=backend, num_threads=WEIRD_DETECTION_THREADS
+        ))
+
+def load_street_detection_model():
+    """Loads the YOLO street segmentation model."""
+    from ultralytics import YOLO
+    states.STREET_DETECTION_MODEL = YOLO(full_street_detection_detection_model_path).to(states.DEVICE)
+
+def quantize_linear_layers(model):
+    """Dynamic int8 quantization of all linear layers (weights int8, activations quantized on the fly), CPU only."""
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+def _load_description_fp16(model_id, device):
+    import transformers
+    return transformers.Qwen2VLForConditionalGeneration.from_pretrained(model_id, torch_dtype=torch.float16).to(device)
+
+def _load_description_fp32(model_id, device):
+    import transformers
+    return transformers.Qwen2VLForConditionalGeneration.from_pretrained(model_id, torch_dtype=torch.float32).to(device)
+
+def _load_description_int8_dynamic(model_id, device):
+    if device.type != "cpu":
+        raise ValueError("The int8-dynamic backend only runs on CPU, use bnb-int8 on GPUs.")
+    return quantize_linear_layers(_load_description_fp32(model_id, device).eval())
+
+def _load_description_bitsandbytes(model_id, device, bits):
+    import transformers
+    if bits == 4:
+        quantization_config = transformers.BitsAndBytesConfig(load_in_4bit=True, bnb_4bit_quant_type="nf4", bnb_4bit_compute_dtype=torch.float16)
+    else:
+        quantization_config = transformers.BitsAndBytesConfig(load_in_8bit=True)
+    # Quantized weights are placed while loading and can not be moved afterwards
+    return transformers.Qwen2VLForConditionalGeneration.from_pretrained(
+        model_id, quantization_config=quantization_config, torch_dtype=torch.float16, device_map={"": device}
+    )
+
+DESCRIPTION_BACKENDS = {
+    "fp16": _load_description_fp16,
+    "fp32": _load_description_fp32,
+    "int8-dynamic": _load_description_int8_dynamic,
+    "bnb-int8": lambda model_id, device: _load_description_bitsandbytes(model_id, device, bits=8),
+    "bnb-int4": lambda model_id, device: _load_description_bitsandbytes(model_id, device, bits=4),
+}
+
+def resolve_description_backend(backend, device):
+    """Picks the backend for "auto": fp16 on GPUs, dynamic int8 on CPU-only replicas."""
+    if backend == "auto":
+        return "fp16" if device.type == "cuda" else "int8-dynamic"
+    if backend not in DESCRIPTION_BACKENDS:
+        raise ValueError(f"Unknown description model backend: {backend}")
+    return backend
+
+def load_detection_description_model(model_id=None, backend=None):
+    """Loads the Qwen2-VL processor and model with the configured backend."""
+    import transformers
+    model_id = model_id or DESCRIPTION_MODEL_ID
+    device = torch.device(states.DEVICE or "cpu")
+    backend = resolve_description_backend(backend or DESCRIPTION_MODEL_BACKEND, device)
+    print(f"Loading {model_id} with the {backend} backend.")
+    states.DETECTION_DESCRIPTION_PROCESSOR = transformers.Qwen2VLProcessor.from_pretrained(model_id, use_fast=True)
+    states.DETECTION_DESCRIPTION_MODEL = DESCRIPTION_BACKENDS[backend](model_id, device)
+
+def unload_models():
+    """Drops all models."""
+    states.GENERATION_MODEL = None
+    states.WEIRD_DETECTION_MODEL = None
+    states.STREET_DETECTION_MODEL = None
+    states.DETECTION_DESCRIPTION_MODEL = None
+    states.DETECTION_DESCRIPTION_PROCESSOR = None
+
+MODEL_LOADERS = {
+    "generation": load_generation_model,
+    "weird_detection": load_weird_detection_model,
+    "street_detection": load_street_detection_model,
+    "detection_description": load_detection_description_model,
+}
@@ -1,4 +1,5 @@
 """ App/Backend/schemas/images.py"""
+from typing import Literal
 from pydantic import BaseModel
 
 ########################
@@ -8,6 +9,7 @@ from pydantic import BaseModel
 class ImageGenerationPrompt(BaseModel):
     """Request body for image generation request."""
     prompt: str
+    profile: Literal["preview", "standard", "high"] | None = None  # Diffusion profile, the server default if not given
 
 class GeneratedImage(BaseModel):
     """Single image prompted for image generation."""
@@ -17,6 +19,17 @@ class GeneratedImage(BaseModel):
 class GeneratedImages(BaseModel):
     """Response body for image generation."""
     images: list[GeneratedImage]
+    sessionToken: str | None = None
+
+class GenerationEvent(BaseModel):
+    """Single event of a streamed image generation."""
+    type: str  # "session", "preview", "image", "error" or "done"
+    index: int | None = None
+    step: int | None = None
+    prompt: str | None = None
+    imageBase64: str | None = None
+    sessionToken: str | None = None
+    detail: str | None = None
 
 ########################
 ###### Detection  ######
@@ -26,6 +39,7 @@ class DetectionRequest(BaseModel):
     """Request body for image detection."""
     prompt: str
     imageBase64: str
+    sessionToken: str | None = None
 
 class DetectionResponse(BaseModel):
     """Response body for image detection."""
@@ -0,0 +1,114 @@
+"""services/annotation.py"""
+
+# Imports
+import colorsys
+import cv2
+import numpy as np
+
+# First colours of the Detectron2 Visualizer colormap, RGB in [0, 1]
+BOX_COLORS = (
+    (0.000, 0.447, 0.741),
+    (0.850, 0.325, 0.098),
+    (0.929, 0.694, 0.125),
+    (0.494, 0.184, 0.556),
+    (0.466, 0.674, 0.188),
+    (0.301, 0.745, 0.933),
+    (0.635, 0.078, 0.184),
+    (1.000, 0.000, 0.000),
+    (1.000, 0.500, 0.000),
+    (0.000, 1.000, 0.000),
+)
+BOX_ALPHA = 0.5
+LABEL_BACKGROUND_ALPHA = 0.8
+# Boxes smaller than this get their label below the box, like in the Visualizer
+SMALL_OBJECT_AREA = 1000
+# The Visualizer sizes lines and fonts in points on a 100 dpi figure
+POINTS_TO_PIXELS = 100 / 72
+# Pixel height of cv2.FONT_HERSHEY_SIMPLEX at font scale 1
+FONT_HEIGHT = 22
+
+def create_text_labels(classes, scores, class_names=None):
+    """Builds the "<class> <score>%" labels of the Visualizer."""
+    labels = [class_names[i] if class_names else str(i) for i in classes] if classes is not None else [""] * len(scores)
+    return [f"{label} {score * 100:.0f}%" for label, score in zip(labels, scores)]
+
+def _change_color_brightness(color, brightness_factor):
+    """Lightens (>0) or darkens (<0) an RGB colour in HLS space."""
+    hue, lightness, saturation = colorsys.rgb_to_hls(*color)
+    lightness = min(max(lightness + brightness_factor * lightness, 0.0), 1.0)
+    return colorsys.hls_to_rgb(hue, lightness, saturation)
+
+def _text_color(color):
+    """Makes the label colour readable on the dark label background."""
+    color = np.maximum(color, 0.2)
+    color[np.argmax(color)] = max(0.8, np.max(color))
+    return tuple(int(channel * 255) for channel in color)
+
+def _blend(image, mask, color, alpha):
+    """Blends the colour into the masked pixels of the image in place."""
+    pixels = image[mask]
+    image[mask] = (pixels * (1.0 - alpha) + np.asarray(color, dtype=np.float32) * alpha).astype(np.uint8)
+
+def _draw_box(image, box, color, thickness):
+    """Draws a half transparent box outline in place, only the region around the box is touched."""
+    height, width = image.shape[:2]
+    x0, y0, x1, y1 = (int(round(v)) for v in box)
+    pad = thickness
+    left, top = max(x0 - pad, 0), max(y0 - pad, 0)
+    right, bottom = min(x1 + pad + 1, width), min(y1 + pad + 1, height)
+    if left >= right or top >= bottom:
+        return
+
+    mask = np.zeros((bottom - top, right - left), dtype=np.uint8)
+    cv2.rectangle(mask, (x0 - left, y0 - top), (x1 - left, y1 - top), 255, thickness)
+    _blend(image[top:bottom, left:right], mask > 0, tuple(channel * 255 for channel in color), BOX_ALPHA)
+
+def _draw_label(image, text, position, color, font_size):
+    """Draws a label with the dark Visualizer background in place, position is the top corner."""
+    height, width = image.shape[:2]
+    font_scale = font_size * POINTS_TO_PIXELS / FONT_HEIGHT
+    font_thickness = max(int(round(font_scale * 1.5)), 1)
+    (text_width, text_height), baseline = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, font_scale, font_thickness)
+    pad = max(int(round(font_size * 0.4)), 1)
+
+    x, y = int(position[0]), int(position[1])
+    x = min(max(x, 0), max(width - text_width - 2 * pad, 0))
+    y = min(max(y, 0), max(height - text_height - baseline - 2 * pad, 0))
+
+    background = image[y:y + text_height + baseline + 2 * pad, x:x + text_width + 2 * pad]
+    background[:] = (background * (1.0 - LABEL_BACKGROUND_ALPHA)).astype(np.uint8)
+    cv2.putText(image, text, (x + pad, y + pad + text_height), cv2.FONT_HERSHEY_SIMPLEX, font_scale, _text_color(color), font_thickness, cv2.LINE_AA)
+
+def draw_instances(image, boxes, scores, classes=None, class_names=None):
+    """
+    Draws boxes and score labels in place on an RGB image with the look of
+    Visualizer.draw_instance_predictions (ColorMode.IMAGE). boxes are XYXY pixel coordinates.
+    """
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    if len(boxes) == 0:
+        return image
+
+    height, width = image.shape[:2]
+    default_font_size = max(np.sqrt(height * width) // 90, 10)
+    thickness = max(int(round(max(default_font_size / 4, 1) * POINTS_TO_PIXELS)), 1)
+    labels = create_text_labels(classes, scores, class_names)
+    colors = [BOX_COLORS[i % len(BOX_COLORS)] for i in range(len(boxes))]
+
+    # Larger boxes first so that small ones stay visible on top
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    for i in np.argsort(-areas, kind="stable"):
+        x0, y0, x1, y1 = boxes[i]
+        _draw_box(image, boxes[i], colors[i], thickness)
+
+        # Label at the top left corner, below the box for small boxes
+        position = (x0, y0)
+        if areas[i] < SMALL_OBJECT_AREA or y1 - y0 < 40:
+            if y1 >= height - 5:
+                position = (x1, y0)
+            else:
+                position = (x0, y1)
+        height_ratio = (y1 - y0) / np.sqrt(height * width)
+        font_size = np.clip((height_ratio - 0.02) / 0.08 + 1, 1.2, 2) * 0.5 * default_font_size
+        _draw_label(image, labels[i], position, _change_color_brightness(colors[i], 0.7), font_size)
+
+    return image
@@ -0,0 +1,61 @@
+"""services/batching.py"""
+
+# Imports
+import asyncio
+
+class MicroBatcher:
+    """
+    Collects items that arrive within a short window and hands them to the model as one batch.
+    Every caller gets back the result at its own position of the batch.
+    """
+
+    def __init__(self, batch_function, run_batch=None, max_batch_size=8, max_wait_seconds=0.02):
+        self.batch_function = batch_function
+        self.run_batch = run_batch if run_batch is not None else asyncio.to_thread
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_seconds
+        self._pending = []
+        self._timer = None
+        self._tasks = set()
+        self.batch_count = 0
+        self.item_count = 0
+
+    async def submit(self, item):
+        """Adds the item to the next batch and waits for its result."""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((item, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.max_wait_seconds, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending, []
+        task = asyncio.get_running_loop().create_task(self._run(batch))
+        # Keep a reference so the batch is not garbage collected while running
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch):
+        self.batch_count += 1
+        self.item_count += len(batch)
+        try:
+            results = await self.run_batch(self.batch_function, [item for item, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
@@ -0,0 +1,148 @@
+"""services/description_cache.py"""
+
+# Imports
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+import cv2
+import numpy as np
+from services import states
+
+# Description Cache Settings
+DESCRIPTION_CACHE_SIZE = 4096
+DESCRIPTION_CACHE_DB_PATH = os.environ.get("DESCRIPTION_CACHE_DB_PATH", "")  # Empty keeps the cache in memory only
+# Largest Hamming distance between two crop hashes that still counts as the same crop (0 = equal hashes only)
+DESCRIPTION_CACHE_MAX_DISTANCE = int(os.environ.get("DESCRIPTION_CACHE_MAX_DISTANCE", 0))
+HASH_SIZE = 8
+HASH_IMAGE_SIZE = 32
+
+def perceptual_hash(image):
+    """
+    64 bit DCT hash (pHash) of an RGB image: the low frequencies of the 32x32 grayscale image
+    compared against their median. Recompressed or slightly shifted crops keep the same hash.
+    Returns the hash as signed 64 bit integer (the SQLite integer type), None for empty images.
+    """
+    if image.size == 0:
+        return None
+    gray = cv2.cvtColor(np.ascontiguousarray(image), cv2.COLOR_RGB2GRAY)
+    small = cv2.resize(gray, (HASH_IMAGE_SIZE, HASH_IMAGE_SIZE), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low_frequencies = cv2.dct(small)[:HASH_SIZE, :HASH_SIZE].flatten()
+    bits = low_frequencies > np.median(low_frequencies[1:])  # The DC term only holds the brightness
+    return int(np.packbits(bits).view(">i8")[0])
+
+def _instruction_id(instruction):
+    return hashlib.sha1(instruction.encode("utf-8")).hexdigest()[:16]
+
+class DescriptionCache:
+    """
+    LRU cache of VLM descriptions keyed by the perceptual hash of the crop and the instruction,
+    with an optional SQLite tier that is shared between workers and survives restarts.
+    """
+
+    def __init__(self, max_entries=DESCRIPTION_CACHE_SIZE, db_path=DESCRIPTION_CACHE_DB_PATH, max_distance=DESCRIPTION_CACHE_MAX_DISTANCE, clock=time.time):
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "uncacheable": 0}
+
+        self._connection = None
+        if db_path:
+            self._connection = sqlite3.connect(db_path, check_same_thread=False)
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS descriptions ("
+                "instruction TEXT NOT NULL, crop_hash INTEGER NOT NULL, description TEXT NOT NULL, created REAL NOT NULL, "
+                "PRIMARY KEY (instruction, crop_hash))"
+            )
+            self._connection.commit()
+
+    def key(self, image, instruction):
+        """Cache key of a crop and instruction, None if the crop can not be hashed."""
+        crop_hash = perceptual_hash(image)
+        if crop_hash is None:
+            return None
+        return _instruction_id(instruction), crop_hash
+
+    def _find_similar(self, key):
+        instruction, crop_hash = key
+        candidates = [(other_hash, value) for (other_instruction, other_hash), value in self._entries.items() if other_instruction == instruction]
+        if not candidates:
+            return None
+        hashes = np.array([other_hash for other_hash, _ in candidates], dtype=np.int64)
+        distances = np.unpackbits((hashes ^ np.int64(crop_hash)).view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+        best = int(np.argmin(distances))
+        if distances[best] > self.max_distance:
+            return None
+        return (instruction, int(hashes[best])), candidates[best][1]
+
+    def get(self, key):
+        """Returns the cached description, None on a miss."""
+        if key is None:
+            with self._lock:
+                self.counters["uncacheable"] += 1
+            return None
+
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.counters["memory_hits"] += 1
+                return self._entries[key]
+            if self.max_distance > 0:
+                similar = self._find_similar(key)
+                if similar is not None:
+                    self._entries.move_to_end(similar[0])
+                    self.counters["memory_hits"] += 1
+                    return similar[1]
+
+            if self._connection is not None:
+                row = self._connection.execute(
+                    "SELECT description FROM descriptions WHERE instruction = ? AND crop_hash = ?", key
+                ).fetchone()
+                if row is not None:
+                    self._remember(key, row[0])
+                    self.counters["disk_hits"] += 1
+                    return row[0]
+
+            self.counters["misses"] += 1
+            return None
+
+    def _remember(self, key, description):
+        self._entries[key] = description
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def put(self, key, description):
+        """Stores the description of a crop."""
+        if key is None:
+            return
+        with self._lock:
+            self._remember(key, description)
+            if self._connection is not None:
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO descriptions VALUES (?, ?, ?, ?)", (*key, description, self.clock())
+                )
+                self._connection.commit()
+
+    def stats(self):
+        """Hit and miss counters with the hit rate."""
+        with self._lock:
+            lookups = self.counters["memory_hits"] + self.counters["disk_hits"] + self.counters["misses"]
+            hits = self.counters["memory_hits"] + self.counters["disk_hits"]
+            return dict(self.counters, entries=len(self._entries), hit_rate=hits / lookups if lookups else 0.0)
+
+    def close(self):
+        """Closes the database connection."""
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+def get_description_cache():
+    """Returns the shared description cache, creating it if not already set."""
+    if states.DESCRIPTION_CACHE is None:
+        states.DESCRIPTION_CACHE = DescriptionCache()
+    return states.DESCRIPTION_CACHE
@@ -0,0 +1,86 @@
+"""services/detectors.py"""
+# Weird object detectors behind one interface: predict(images) returns (boxes, scores) per image,
+# boxes as XYXY pixel coordinates of the input image sorted by descending score.
+
+# Imports
+from typing import NamedTuple
+import numpy as np
+import torch
+
+# YOLO Settings (same as Pipelines/yolo/inference.py)
+YOLO_IMAGE_SIZE = 640
+YOLO_CONFIDENCE = 0.4
+YOLO_IOU = 0.7
+YOLO_MAX_DETECTIONS = 100
+
+class Detections(NamedTuple):
+    """Detections of a single image."""
+    boxes: np.ndarray
+    scores: np.ndarray
+
+def _sorted_detections(boxes, scores):
+    """Float32 detections sorted by descending score, the pipeline crops the first box."""
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    scores = np.asarray(scores, dtype=np.float32).reshape(-1)
+    order = np.argsort(-scores, kind="stable")
+    return Detections(boxes[order], scores[order])
+
+class Detectron2Detector:
+    """
+    Faster R-CNN through a DefaultPredictor or the ExportedPredictor of models/detector_export.py.
+    Runs several images in one forward pass with the preprocessing of DefaultPredictor.
+    """
+    name = "detectron2"
+
+    def __init__(self, predictor):
+        self.predictor = predictor
+
+    def predict(self, images):
+        """Detects the weird objects of several images, each handled like DefaultPredictor handles one."""
+        predictor = self.predictor
+        with torch.no_grad():
+            inputs = []
+            for original_image in images:
+                if predictor.input_format == "RGB":
+                    original_image = original_image[:, :, ::-1]
+                height, width = original_image.shape[:2]
+                image = predictor.aug.get_transform(original_image).apply_image(original_image)
+                image = torch.as_tensor(image.astype("float32").transpose(2, 0, 1))
+                inputs.append({"image": image, "height": height, "width": width})
+            outputs = predictor.model(inputs)
+
+        detections = []
+        for output in outputs:
+            instances = output["instances"].to("cpu")
+            if not instances.has("pred_boxes") or len(instances) == 0:
+                detections.append(_sorted_detections([], []))
+                continue
+            detections.append(_sorted_detections(instances.pred_boxes.tensor.numpy(), instances.scores.numpy()))
+        return detections
+
+class YoloDetector:
+    """Ultralytics YOLO detector trained with Pipelines/yolo/train.py, predicts the whole batch in one call."""
+    name = "yolo"
+
+    def __init__(self, model, image_size=YOLO_IMAGE_SIZE, confidence=YOLO_CONFIDENCE, iou=YOLO_IOU,
+                 max_detections=YOLO_MAX_DETECTIONS, half=False):
+        self.model = model
+        self.image_size = image_size
+        self.confidence = confidence
+        self.iou = iou
+        self.max_detections = max_detections
+        self.half = half
+
+    def predict(self, images):
+        """Detects the weird objects of several RGB images."""
+        # Ultralytics expects numpy images in BGR order
+        results = self.model.predict(
+            [np.ascontiguousarray(image[:, :, ::-1]) for image in images],
+            imgsz=self.image_size,
+            conf=self.confidence,
+            iou=self.iou,
+            max_det=self.max_detections,
+            half=self.half,
+            verbose=False,
+        )
+        return [_sorted_detections(result.boxes.xyxy.cpu().numpy(), result.boxes.conf.cpu().numpy()) for result in results]
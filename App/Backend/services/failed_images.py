@@ -0,0 +1,128 @@
+"""services/failed_images.py"""
+
+# Imports
+import datetime
+import os
+import queue
+import random
+import threading
+import uuid
+from services import states
+from services.image_codecs import get_image_codec
+
+# Failed Image Settings
+FAILED_IMAGE_DIR = os.environ.get("FAILED_IMAGE_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), "failed_images"))
+FAILED_IMAGE_MAX_BYTES = int(os.environ.get("FAILED_IMAGE_MAX_BYTES", 2 * 1024 ** 3))
+FAILED_IMAGE_SAMPLE_RATE = float(os.environ.get("FAILED_IMAGE_SAMPLE_RATE", 1.0))
+FAILED_IMAGE_QUEUE_SIZE = 64
+
+def _directory_size(directory):
+    total = 0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+class FailedImageSink:
+    """
+    Collects the images without detections for retraining on a background thread.
+    Images are queued without blocking and written into one directory per day;
+    images are dropped (and counted) when the queue is full or the disk budget is used up.
+    """
+
+    def __init__(self, directory=FAILED_IMAGE_DIR, max_bytes=FAILED_IMAGE_MAX_BYTES, sample_rate=FAILED_IMAGE_SAMPLE_RATE,
+                 max_queue_size=FAILED_IMAGE_QUEUE_SIZE, clock=datetime.datetime.utcnow, sampler=random.random):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.sample_rate = sample_rate
+        self.clock = clock
+        self.sampler = sampler
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._bytes_on_disk = None
+        self.counters = {"submitted": 0, "sampled_out": 0, "written": 0, "dropped_queue_full": 0, "dropped_disk_full": 0, "errors": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="failed-image-writer", daemon=True)
+                self._thread.start()
+
+    def submit(self, image):
+        """Queues an RGB image for saving, returns False if it was sampled out or dropped."""
+        self._count("submitted")
+        if self.sampler() >= self.sample_rate:
+            self._count("sampled_out")
+            return False
+
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((self.clock(), image))
+        except queue.Full:
+            self._count("dropped_queue_full")
+            return False
+        return True
+
+    def _write(self, timestamp, image):
+        if self._bytes_on_disk is None:
+            self._bytes_on_disk = _directory_size(self.directory)
+
+        jpeg = get_image_codec().encode_jpeg(image)
+        if self._bytes_on_disk + len(jpeg) > self.max_bytes:
+            self._count("dropped_disk_full")
+            return
+
+        shard = os.path.join(self.directory, timestamp.strftime("%Y-%m-%d"))
+        os.makedirs(shard, exist_ok=True)
+        filename = f"no_detection_{timestamp.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}.jpeg"
+        with open(os.path.join(shard, filename), "wb") as image_file:
+            image_file.write(jpeg)
+
+        self._bytes_on_disk += len(jpeg)
+        self._count("written")
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                try:
+                    self._write(*item)
+                except Exception as e:
+                    print(f"Failed to save image without detections: {e}")
+                    self._count("errors")
+            finally:
+                self._queue.task_done()
+
+    def flush(self):
+        """Waits until all queued images are written."""
+        if self._thread is not None:
+            self._queue.join()
+
+    def stats(self):
+        """Counters, queue depth and used disk space."""
+        with self._lock:
+            return dict(self.counters, queued=self._queue.qsize(), bytes_on_disk=self._bytes_on_disk)
+
+    def close(self):
+        """Writes the queued images and stops the writer thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+
+def get_failed_image_sink():
+    """Returns the shared failed image sink, creating it if not already set."""
+    if states.FAILED_IMAGE_SINK is None:
+        states.FAILED_IMAGE_SINK = FailedImageSink()
+    return states.FAILED_IMAGE_SINK
@@ -0,0 +1,207 @@
+"""services/generation_pool.py"""
+
+# Imports
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from typing import NamedTuple
+
+# Generation Pool Settings, opt-in since the producer uses the idle GPU and writes rounds to GENERATION_POOL_DIR
+GENERATION_POOL_ENABLED = os.environ.get("GENERATION_POOL_ENABLED", "0") == "1"
+GENERATION_POOL_DIR = os.environ.get("GENERATION_POOL_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), "generation_pool"))
+GENERATION_POOL_MAX_BYTES = int(os.environ.get("GENERATION_POOL_MAX_BYTES", 2 * 1024 ** 3))
+GENERATION_POOL_TTL_SECONDS = int(os.environ.get("GENERATION_POOL_TTL_SECONDS", 24 * 60 * 60))
+# Pre-generated rounds kept per noun set, and how many of the most requested noun sets are stocked
+POOL_ROUNDS_PER_KEY = 2
+POOL_TOP_KEYS = 32
+# Requests (decayed) before a noun set is worth pre-generating
+POOL_MIN_REQUESTS = 3
+POPULARITY_HALF_LIFE_SECONDS = 6 * 60 * 60
+MAX_TRACKED_KEYS = 1024
+# Seconds without live /generate requests before the producer uses the GPU
+POOL_IDLE_SECONDS = 30
+METADATA_FILENAME = "round.json"
+
+def pool_key(nouns):
+    """Normalized noun set of a prompt (lowercase, sorted, with repetitions), None without nouns."""
+    if not nouns:
+        return None
+    return ",".join(sorted(noun.lower() for noun in nouns))
+
+class PoolEntry(NamedTuple):
+    """One pre-generated round on disk."""
+    entry_id: str
+    key: str
+    prompt: str
+    created: float
+    filenames: tuple
+    size: int
+
+class GenerationPool:
+    """
+    Bounded on-disk pool of pre-generated inpainting rounds keyed by the normalized noun set of the prompt.
+    Tracks how often every noun set is requested (with exponential decay) so the producer knows what to
+    pre-generate. Every round is served once, expired rounds are dropped and the rounds of the least
+    recently requested noun sets are evicted first when the disk budget is used up.
+    """
+
+    def __init__(self, directory=GENERATION_POOL_DIR, max_bytes=GENERATION_POOL_MAX_BYTES, ttl_seconds=GENERATION_POOL_TTL_SECONDS,
+                 rounds_per_key=POOL_ROUNDS_PER_KEY, top_keys=POOL_TOP_KEYS, min_requests=POOL_MIN_REQUESTS,
+                 half_life_seconds=POPULARITY_HALF_LIFE_SECONDS, idle_seconds=POOL_IDLE_SECONDS, clock=time.time):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.rounds_per_key = rounds_per_key
+        self.top_keys = top_keys
+        self.min_requests = min_requests
+        self.half_life_seconds = half_life_seconds
+        self.idle_seconds = idle_seconds
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._entries = {}
+        # key -> (decayed request count, time of the last request, latest prompt)
+        self._popularity = {}
+        self._last_request = None
+        self.counters = {"hits": 0, "misses": 0, "produced": 0, "evicted_ttl": 0, "evicted_lru": 0}
+        self._load()
+
+    def _load(self):
+        """Picks up the rounds of a previous run."""
+        if not os.path.isdir(self.directory):
+            return
+        for entry_id in os.listdir(self.directory):
+            entry_directory = os.path.join(self.directory, entry_id)
+            try:
+                with open(os.path.join(entry_directory, METADATA_FILENAME), encoding="utf-8") as metadata_file:
+                    metadata = json.load(metadata_file)
+                size = sum(os.path.getsize(os.path.join(entry_directory, name)) for name in metadata["filenames"])
+            except (OSError, ValueError, KeyError):
+                # Half written round of a crashed producer
+                shutil.rmtree(entry_directory, ignore_errors=True)
+                continue
+            self._entries[entry_id] = PoolEntry(entry_id, metadata["key"], metadata["prompt"], metadata["created"], tuple(metadata["filenames"]), size)
+
+    def _decayed(self, key, now):
+        count, last, _ = self._popularity[key]
+        return count * 0.5 ** ((now - last) / self.half_life_seconds)
+
+    def _record_request(self, key, prompt, now):
+        self._last_request = now
+        if key is None:
+            return
+        count = self._decayed(key, now) if key in self._popularity else 0.0
+        self._popularity[key] = (count + 1.0, now, prompt)
+        if len(self._popularity) > MAX_TRACKED_KEYS:
+            del self._popularity[min(self._popularity, key=lambda other: self._decayed(other, now))]
+
+    def _remove(self, entry):
+        del self._entries[entry.entry_id]
+        shutil.rmtree(os.path.join(self.directory, entry.entry_id), ignore_errors=True)
+
+    def _expire(self, now):
+        for entry in [entry for entry in self._entries.values() if now - entry.created > self.ttl_seconds]:
+            self._remove(entry)
+            self.counters["evicted_ttl"] += 1
+
+    def _stock(self, key):
+        return sum(entry.key == key for entry in self._entries.values())
+
+    def take(self, nouns, prompt):
+        """
+        Records the request and returns the encoded images of a pre-generated round for the nouns,
+        None on a miss. The round is removed from the pool.
+        """
+        key = pool_key(nouns)
+        now = self.clock()
+        with self._lock:
+            self._record_request(key, prompt, now)
+            self._expire(now)
+            entries = sorted((entry for entry in self._entries.values() if entry.key == key), key=lambda entry: entry.created)
+            if key is None or not entries:
+                self.counters["misses"] += 1
+                return None
+            entry = entries[0]
+            del self._entries[entry.entry_id]
+            self.counters["hits"] += 1
+
+        entry_directory = os.path.join(self.directory, entry.entry_id)
+        try:
+            images = []
+            for name in entry.filenames:
+                with open(os.path.join(entry_directory, name), "rb") as image_file:
+                    images.append(image_file.read())
+        except OSError as e:
+            print(f"Failed to read pooled round {entry.entry_id}: {e}")
+            images = None
+        shutil.rmtree(entry_directory, ignore_errors=True)
+        return images
+
+    def put(self, key, prompt, images, extension="png"):
+        """Stores the encoded images of a pre-generated round, evicting older rounds when over budget."""
+        entry_id = uuid.uuid4().hex
+        entry_directory = os.path.join(self.directory, entry_id)
+        os.makedirs(entry_directory, exist_ok=True)
+        filenames = tuple(f"variant_{i}.{extension}" for i in range(len(images)))
+        for name, image in zip(filenames, images):
+            with open(os.path.join(entry_directory, name), "wb") as image_file:
+                image_file.write(image)
+
+        now = self.clock()
+        # The metadata is written last, a round without it is incomplete
+        with open(os.path.join(entry_directory, METADATA_FILENAME), "w", encoding="utf-8") as metadata_file:
+            json.dump({"key": key, "prompt": prompt, "created": now, "filenames": list(filenames)}, metadata_file)
+
+        with self._lock:
+            self._entries[entry_id] = PoolEntry(entry_id, key, prompt, now, filenames, sum(len(image) for image in images))
+            self.counters["produced"] += 1
+            self._expire(now)
+            self._evict()
+
+    def _evict(self):
+        """Drops the oldest rounds of the least recently requested noun sets until the pool fits its budget."""
+        def last_requested(entry):
+            popularity = self._popularity.get(entry.key)
+            return (popularity[1] if popularity else float("-inf"), entry.created)
+
+        size = sum(entry.size for entry in self._entries.values())
+        for entry in sorted(self._entries.values(), key=last_requested):
+            if size <= self.max_bytes:
+                break
+            self._remove(entry)
+            size -= entry.size
+            self.counters["evicted_lru"] += 1
+
+    def is_idle(self):
+        """True if no live request came in for idle_seconds."""
+        with self._lock:
+            return self._last_request is None or self.clock() - self._last_request >= self.idle_seconds
+
+    def next_candidate(self):
+        """(key, prompt) of the most requested noun set that is not fully stocked, None if all are."""
+        now = self.clock()
+        with self._lock:
+            self._expire(now)
+            ranked = sorted(self._popularity, key=lambda key: -self._decayed(key, now))[:self.top_keys]
+            for key in ranked:
+                # Rounded, requests in quick succession already decay a tiny bit
+                if round(self._decayed(key, now)) < self.min_requests:
+                    break
+                if self._stock(key) < self.rounds_per_key:
+                    return key, self._popularity[key][2]
+        return None
+
+    def stats(self):
+        """Hit rate, pool size and producer counters."""
+        with self._lock:
+            lookups = self.counters["hits"] + self.counters["misses"]
+            return dict(
+                self.counters,
+                hit_rate=self.counters["hits"] / lookups if lookups else 0.0,
+                rounds=len(self._entries),
+                keys=len({entry.key for entry in self._entries.values()}),
+                bytes=sum(entry.size for entry in self._entries.values()),
+                tracked_keys=len(self._popularity),
+            )
@@ -0,0 +1,146 @@
+"""services/image_codecs.py"""
+
+# Imports
+import io
+import os
+import threading
+import cv2
+import numpy as np
+from PIL import Image
+from services import states
+
+try:
+    import simplejpeg
+except ImportError:
+    simplejpeg = None
+
+# Codec used by the endpoints: "auto", "turbojpeg", "opencv" or "pillow"
+IMAGE_CODEC = os.environ.get("IMAGE_CODEC", "auto")
+JPEG_QUALITY = 95
+JPEG_MAGIC = b"\xff\xd8"
+# libjpeg only decodes fast at power of two DCT scales, the rest of the downscale is a cheap linear resize
+DCT_SCALE_FACTORS = (8, 4, 2)
+# Shrinking averages the covered pixels like PIL's antialiased BILINEAR, plain bilinear sampling would alias
+DOWNSCALE_INTERPOLATION = cv2.INTER_AREA
+UPSCALE_INTERPOLATION = cv2.INTER_LINEAR
+
+def dct_scale_factor(width, height, size):
+    """Largest power of two JPEG scale that still decodes at least to size (width, height)."""
+    if not size:
+        return 1
+    for factor in DCT_SCALE_FACTORS:
+        if width // factor >= size[0] and height // factor >= size[1]:
+            return factor
+    return 1
+
+def _resize(image, size):
+    """Resizes an array to size (width, height), area averaging along the axes that shrink."""
+    shrinks = size[0] < image.shape[1] or size[1] < image.shape[0]
+    return cv2.resize(image, tuple(size), interpolation=DOWNSCALE_INTERPOLATION if shrinks else UPSCALE_INTERPOLATION)
+
+class PillowCodec:
+    """Reference codec, decodes with PIL and resizes with BILINEAR."""
+    name = "pillow"
+
+    def decode(self, image_data, size=None):
+        """Decodes image bytes to an RGB array, resized to size (width, height) if given."""
+        image = Image.open(io.BytesIO(image_data)).convert("RGB")
+        if size:
+            image = image.resize(size, Image.BILINEAR)
+        return np.array(image)
+
+    def encode_jpeg(self, image, quality=JPEG_QUALITY, bgr=False):
+        """Encodes an RGB (or BGR) array to JPEG bytes."""
+        buffered = io.BytesIO()
+        Image.fromarray(image[:, :, ::-1] if bgr else image).save(buffered, format="JPEG", quality=quality)
+        return buffered.getvalue()
+
+class OpenCVCodec:
+    """
+    Decodes JPEGs at 1/2, 1/4 or 1/8 scale in the DCT domain when the target size allows it,
+    and swaps the channels in place instead of converting through extra copies.
+    """
+    name = "opencv"
+    REDUCED_FLAGS = {1: cv2.IMREAD_COLOR, 2: cv2.IMREAD_REDUCED_COLOR_2, 4: cv2.IMREAD_REDUCED_COLOR_4, 8: cv2.IMREAD_REDUCED_COLOR_8}
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def _scratch(self, purpose, shape):
+        """Reusable per-thread buffer for intermediate images."""
+        buffers = self._local.__dict__.setdefault("buffers", {})
+        if purpose not in buffers or buffers[purpose].shape != shape:
+            buffers[purpose] = np.empty(shape, dtype=np.uint8)
+        return buffers[purpose]
+
+    def _read_flag(self, image_data, size):
+        # EXIF orientation is ignored like in the Pillow and libjpeg-turbo decoders
+        if not size or not image_data.startswith(JPEG_MAGIC):
+            return cv2.IMREAD_COLOR | cv2.IMREAD_IGNORE_ORIENTATION
+        width, height = Image.open(io.BytesIO(image_data)).size  # Only parses the header
+        return self.REDUCED_FLAGS[dct_scale_factor(width, height, size)] | cv2.IMREAD_IGNORE_ORIENTATION
+
+    def decode(self, image_data, size=None):
+        """Decodes image bytes to an RGB array, resized to size (width, height) if given."""
+        image = cv2.imdecode(np.frombuffer(image_data, dtype=np.uint8), self._read_flag(image_data, size))
+        if image is None:
+            raise ValueError("Failed to decode image.")
+        if size and (image.shape[1], image.shape[0]) != tuple(size):
+            image = _resize(image, size)
+        return cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=image)
+
+    def encode_jpeg(self, image, quality=JPEG_QUALITY, bgr=False):
+        """Encodes an RGB (or BGR) array to JPEG bytes."""
+        if not bgr:
+            image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR, dst=self._scratch("encode", image.shape))
+        success, buffer = cv2.imencode(".jpeg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if not success:
+            raise ValueError("Failed to encode image.")
+        return buffer.tobytes()
+
+class TurboJPEGCodec(OpenCVCodec):
+    """
+    libjpeg-turbo through simplejpeg, decodes JPEGs with DCT scaling straight into a reusable
+    per-thread buffer and encodes RGB or BGR without converting. Other formats go through OpenCV.
+    """
+    name = "turbojpeg"
+
+    def decode(self, image_data, size=None):
+        """Decodes image bytes to an RGB array, resized to size (width, height) if given."""
+        if not image_data.startswith(JPEG_MAGIC):
+            return super().decode(image_data, size)
+
+        height, width, _, _ = simplejpeg.decode_jpeg_header(image_data)
+        factor = dct_scale_factor(width, height, size)
+        height, width, _, _ = simplejpeg.decode_jpeg_header(image_data, min_factor=factor)
+        image = simplejpeg.decode_jpeg(
+            image_data, colorspace="RGB", min_factor=factor, buffer=self._scratch("decode", (height, width, 3))
+        )
+        if size and (width, height) != tuple(size):
+            return _resize(image, size)
+        return image.copy()
+
+    def encode_jpeg(self, image, quality=JPEG_QUALITY, bgr=False):
+        """Encodes an RGB (or BGR) array to JPEG bytes."""
+        return simplejpeg.encode_jpeg(np.ascontiguousarray(image), quality=quality, colorspace="BGR" if bgr else "RGB")
+
+IMAGE_CODECS = {
+    "pillow": PillowCodec,
+    "opencv": OpenCVCodec,
+    "turbojpeg": TurboJPEGCodec,
+}
+
+def create_image_codec(name=None):
+    """Creates the configured codec, "auto" prefers libjpeg-turbo and falls back to OpenCV."""
+    name = name or IMAGE_CODEC
+    if name == "auto":
+        name = "turbojpeg" if simplejpeg is not None else "opencv"
+    if name == "turbojpeg" and simplejpeg is None:
+        raise ImportError("The turbojpeg codec needs the simplejpeg package.")
+    return IMAGE_CODECS[name]()
+
+def get_image_codec():
+    """Returns the shared image codec, creating it if not already set."""
+    if states.IMAGE_CODEC is None:
+        states.IMAGE_CODEC = create_image_codec()
+    return states.IMAGE_CODEC
@@ -3,132 +3,203 @@
 # Standard library
 import asyncio
 import base64
-import re
-import os
-import datetime
-import uuid
 import ast
-
-# Third-party
-import cv2
-from detectron2.utils.visualizer import Visualizer, ColorMode
-from detectron2.data import MetadataCatalog
+import os
 
 # Local application
 from schemas.images import DetectionRequest, DetectionResponse
-from models.configurations import test_metadata
 from services import states
-from services.image_summary import preprocess, generate_response
-from services.image_utils import base64_to_image
-
-### Full Image Detection Pipeline ###
-
-async def detect(req: DetectionRequest) -> DetectionResponse:
-    """Function used for detecting weird objects."""
-    # Set lock if not already set
-    if states.BACKEND_LOCK is None:
-        states.BACKEND_LOCK = asyncio.Lock()
-
-    async with states.BACKEND_LOCK:
-        # Decode base64 input to NumPy image array
-        detect_image = base64_to_image(req.imageBase64)
-
-        # Run Detectron2 Prediction
-        print("Running Prediction")
-        outputs = states.WEIRD_DETECTION_MODEL(detect_image)
-
-        print("Prediction Outputs:", outputs)
-
-        instances = outputs["instances"].to("cpu")
-        boxes = instances.pred_boxes if instances.has("pred_boxes") else None
-
-        if boxes is None or len(boxes) == 0:
-            print("No objects detected. Saving image.")
-            image_bgr = cv2.cvtColor(detect_image, cv2.COLOR_RGB2BGR)
-
-            current_directory = os.getcwd()
-            match = re.search(rf"(.*?){'Weird-Stuff-In-Traffic'}", current_directory)
-            path_to_base_directory = match.group(1) if match else current_directory
-
-            filename = f"no_detection_{datetime.datetime.utcnow().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}.jpeg"
-            save_path = os.path.join(path_to_base_directory, "Weird-Stuff-In-Traffic/App/Backend/failed_images", filename)
+from services.image_summary import preprocess_batch, generate_responses, preprocess_noun_questions, score_nouns
+from services.image_utils import base64_to_image, bytes_to_image
+from services.image_codecs import get_image_codec
+from services.annotation import draw_instances
+from services.failed_images import get_failed_image_sink
+from services.description_cache import get_description_cache
+from services.scheduler import get_model_scheduler, DETECT_PRIORITY
+from services.batching import MicroBatcher
+from services.model_registry import ensure_models_loaded
+from services.sessions import get_session_store
+from services.prompt_summary import extract_nouns_with_counts
+
+# Micro-Batching of concurrent detect requests
+DETECTION_BATCH_SIZE = 8
+DETECTION_BATCH_WINDOW_SECONDS = 0.02
+DESCRIPTION_INSTRUCTION = "Please create a list of objects in this image."
+# How the VLM compares the crop with the prompt:
+# "free" generates the object list, "structured" constrains it to a list of strings,
+# "nouns" only asks for the nouns of the prompt with one yes/no forward pass each
+DESCRIPTION_MODE = os.environ.get("DESCRIPTION_MODE", "free")
+DESCRIPTION_MODES = ("free", "structured", "nouns")
+if DESCRIPTION_MODE not in DESCRIPTION_MODES:
+    raise ValueError(f"Unknown description mode: {DESCRIPTION_MODE}")
+NOUN_PRESENT_THRESHOLD = 0.5
+
+def _predict_batch(images):
+    """Runs the configured weird object detector on several images in one call, (boxes, scores) per image."""
+    return states.WEIRD_DETECTION_MODEL.predict(images)
+
+def _describe_objects_batch(cropped_images):
+    """Lets the VLM list the objects of several cropped images in one padded batch."""
+    processed_prompts = preprocess_batch(
+        instruction=DESCRIPTION_INSTRUCTION,
+        images_np=cropped_images,
+        processor=states.DETECTION_DESCRIPTION_PROCESSOR
+    )
+
+    return generate_responses(
+        processed_prompts,
+        states.DETECTION_DESCRIPTION_MODEL,
+        states.DETECTION_DESCRIPTION_PROCESSOR,
+        device=states.DEVICE,
+        structured=DESCRIPTION_MODE == "structured"
+    )
+
+def _score_nouns_batch(crops_and_nouns):
+    """Lets the VLM answer for every (crop, nouns) item which nouns are visible, returned as list strings."""
+    probabilities = []
+    if any(nouns for _, nouns in crops_and_nouns):
+        processed_questions = preprocess_noun_questions(
+            [(crop, nouns) for crop, nouns in crops_and_nouns if nouns],
+            processor=states.DETECTION_DESCRIPTION_PROCESSOR
+        )
+        probabilities = score_nouns(
+            processed_questions,
+            states.DETECTION_DESCRIPTION_MODEL,
+            states.DETECTION_DESCRIPTION_PROCESSOR,
+            device=states.DEVICE
+        ).tolist()
+
+    summaries, offset = [], 0
+    for _, nouns in crops_and_nouns:
+        answers = probabilities[offset:offset + len(nouns)]
+        summaries.append(repr([noun for noun, probability in zip(nouns, answers) if probability >= NOUN_PRESENT_THRESHOLD]))
+        offset += len(nouns)
+    return summaries
+
+def _get_detection_batchers():
+    """Returns the micro-batchers of the detection models, creating them if not already set."""
+    if states.DETECTION_BATCHERS is None:
+        scheduler = get_model_scheduler()
+        states.DETECTION_BATCHERS = {
+            name: MicroBatcher(
+                batch_function,
+                run_batch=lambda function, items, model_name=model_name: scheduler.run(model_name, function, items, priority=DETECT_PRIORITY),
+                max_batch_size=DETECTION_BATCH_SIZE,
+                max_wait_seconds=DETECTION_BATCH_WINDOW_SECONDS
+            )
+            for name, model_name, batch_function in (
+                ("weird_detection", "weird_detection", _predict_batch),
+                ("detection_description", "detection_description", _describe_objects_batch),
+                ("noun_scoring", "detection_description", _score_nouns_batch),
+            )
+        }
+    return states.DETECTION_BATCHERS
 
-            os.makedirs(os.path.dirname(save_path), exist_ok=True)
-            cv2.imwrite(save_path, image_bgr)
+def _annotate_image(detect_image, boxes, scores):
+    """Draws the predictions onto the image in place and encodes it to JPEG."""
+    draw_instances(detect_image, boxes, scores)
+    return get_image_codec().encode_jpeg(detect_image)
 
-            return DetectionResponse(
-                prompt=req.prompt,
-                imageBase64=req.imageBase64,
-                score=0.0
-            )
+### Full Image Detection Pipeline ###
 
-        # Annotate image
-        v = Visualizer(
-            detect_image[:, :, ::-1],  # Convert RGB to BGR for Detectron2
-            metadata=test_metadata,   # should contain .thing_classes
-            scale=1.0,
-            instance_mode=ColorMode.IMAGE
+async def detect_image_array(prompt: str, detect_image, session_token: str | None = None) -> tuple[bytes | None, float]:
+    """
+    Runs the detection pipeline on a decoded RGB image.
+    Returns the annotated image as JPEG (None if nothing was detected) and the score.
+    """
+    batchers = _get_detection_batchers()
+
+    # Run Weird Object Prediction
+    print("Running Prediction")
+    await ensure_models_loaded("weird_detection")
+    boxes, scores = await batchers["weird_detection"].submit(detect_image)
+
+    print("Prediction Outputs:", boxes, scores)
+
+    if len(boxes) == 0:
+        print("No objects detected. Saving image.")
+        get_failed_image_sink().submit(detect_image)
+        return None, 0.0
+
+    # Crop the first detected object before the boxes are drawn onto the image
+    x1, y1, x2, y2 = map(int, boxes[0])
+    cropped_image = detect_image[y1:y2, x1:x2].copy()
+
+    # Nouns of the round, falling back to the prompt if the session is unknown or expired
+    prompt_summary = get_session_store().get(session_token) if session_token else None
+    if prompt_summary is None:
+        prompt_summary = extract_nouns_with_counts(prompt)
+    user_requested_set = set(item.lower() for item in prompt_summary)
+    predicted_set = set()
+
+    # What the VLM is asked for, the nouns mode only checks the requested nouns
+    if DESCRIPTION_MODE == "nouns":
+        requested_nouns = sorted(user_requested_set)
+        batcher, description_request = batchers["noun_scoring"], (cropped_image, requested_nouns)
+        cache_instruction = "nouns:" + ",".join(requested_nouns)
+    else:
+        batcher, description_request = batchers["detection_description"], cropped_image
+        cache_instruction = f"{DESCRIPTION_MODE}:{DESCRIPTION_INSTRUCTION}"
+
+    # Annotate the image while the VLM describes the crop, resubmitted crops come from the cache
+    description_cache = get_description_cache()
+    crop_key = description_cache.key(cropped_image, cache_instruction)
+    detection_summary = description_cache.get(crop_key)
+    if detection_summary is None:
+        await ensure_models_loaded("detection_description")
+        annotated_jpeg, detection_summary = await asyncio.gather(
+            asyncio.to_thread(_annotate_image, detect_image, boxes, scores),
+            batcher.submit(description_request)
         )
-        out = v.draw_instance_predictions(outputs["instances"].to("cpu"))
-        annotated_image = out.get_image()[:, :, ::-1]  # Convert back to RGB
+        description_cache.put(crop_key, detection_summary)
+    else:
+        annotated_jpeg = await asyncio.to_thread(_annotate_image, detect_image, boxes, scores)
+
+    try:
+        eval_detection_summary = ast.literal_eval(detection_summary)
+        predicted_set = set(item.lower() for item in eval_detection_summary)
+        matches = user_requested_set & predicted_set
+        recall = len(matches) / len(user_requested_set) if user_requested_set else 0.0
+    except:
+        recall = 0.0
+
+    # Scoring
+    if len(boxes) > 0:
+        if recall != 0.0:
+            score = 50.0 + round(50 * recall, 2)
+        else:
+            score = 50.0
+    else:
+        score = 0.0
 
-        # Extract boxes
-        boxes = outputs["instances"].pred_boxes if outputs["instances"].has("pred_boxes") else []
+    print("User Requested Set:", user_requested_set)
+    print("Predicted Set:", predicted_set)
+    print("Score:", score)
+    print("Recall:", recall)
 
-        # Crop the first detected object
-        cropped_image = detect_image
-        if len(boxes) > 0:
-            x1, y1, x2, y2 = map(int, boxes.tensor[0])
-            cropped_image = detect_image[y1:y2, x1:x2]
+    return annotated_jpeg, score
 
-        # Encode annotated image to base64 JPEG
-        annotated_image_bgr = cv2.cvtColor(annotated_image, cv2.COLOR_RGB2BGR)
-        success, buffer = cv2.imencode('.jpeg', annotated_image_bgr)
-        if not success:
-            raise ValueError("Failed to encode image.")
+async def detect(req: DetectionRequest) -> DetectionResponse:
+    """Function used for detecting weird objects."""
+    # Decode base64 input to NumPy image array
+    detect_image = await asyncio.to_thread(base64_to_image, req.imageBase64)
 
-        encoded_image = base64.b64encode(buffer).decode('utf-8')
-        image_base64_with_header = f"data:image/jpeg;base64,{encoded_image}"
+    annotated_jpeg, score = await detect_image_array(req.prompt, detect_image, req.sessionToken)
 
-        # Prompt preprocessing and generation (unchanged)
-        processed_prompt = preprocess(
-            instruction="Please create a list of objects in this image.",
-            image_np=cropped_image,
-            processor=states.DETECTION_DESCRIPTION_PROCESSOR
-        )
-
-        detection_summary = generate_response(
-            processed_prompt,
-            states.DETECTION_DESCRIPTION_MODEL,
-            states.DETECTION_DESCRIPTION_PROCESSOR,
-            device=states.DEVICE
-        )
+    # Images without detections are sent back unchanged
+    image_base64_with_header = req.imageBase64
+    if annotated_jpeg is not None:
+        encoded_image = base64.b64encode(annotated_jpeg).decode('utf-8')
+        image_base64_with_header = f"data:image/jpeg;base64,{encoded_image}"
 
-        try:
-            eval_detection_summary = ast.literal_eval(detection_summary)
-            user_requested_set = set(item.lower() for item in  states.USER_PROMPT_SUMMARY)
-            predicted_set = set(item.lower() for item in eval_detection_summary)
-            matches = user_requested_set & predicted_set
-            recall = len(matches) / len(user_requested_set) if user_requested_set else 0.0
-        except:
-            recall = 0.0
-
-        # Scoring
-        if boxes:
-            if recall != 0.0:
-                score = 50.0 + round(50 * recall, 2)
-            else:
-                score = 50.0
-        else:
-            score = 0.0
+    return DetectionResponse(
+        prompt=req.prompt,
+        imageBase64=image_base64_with_header,
+        score=score
+    )
 
-        print("User Requested Set:", user_requested_set)
-        print("Predicted Set:", predicted_set)
-        print("Score:", score)
-        print("Recall:", recall)
+async def detect_binary(prompt: str, image_data: bytes, session_token: str | None = None) -> tuple[bytes | None, float]:
+    """Binary variant of detect(), takes the encoded image bytes and returns the annotated JPEG (None without detections)."""
+    detect_image = await asyncio.to_thread(bytes_to_image, image_data)
 
-        return DetectionResponse(
-            prompt=req.prompt,
-            imageBase64=image_base64_with_header,
-            score=score
-        )
+    return await detect_image_array(prompt, detect_image, session_token)
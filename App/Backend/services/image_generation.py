@@ -2,81 +2,276 @@
 
 # Standard library
 import asyncio
-from io import BytesIO
 import base64
-import os
 import random
 
 # Third-party
 from PIL import Image
 
 # Local application
-from schemas.images import ImageGenerationPrompt, GeneratedImage, GeneratedImages
+from schemas.images import ImageGenerationPrompt, GeneratedImage, GeneratedImages, GenerationEvent
 from services import states
 from services.prompt_summary import extract_nouns_with_counts
-from services.image_inpainting import get_suitable_region, get_random_bbox_within_bbox, inpaint_image
+from services.image_inpainting import inpaint_images, DIFFUSION_PROFILE
+from services.inpaint_region import get_suitable_region, get_random_bbox_within_bbox
+from services.street_index import list_street_images
+from services.image_utils import image_to_png_bytes, image_to_jpeg_bytes
+from services.scheduler import get_model_scheduler, SchedulerBusyError, GENERATE_PRIORITY, BACKGROUND_PRIORITY
+from services.sessions import get_session_store
+from services.model_registry import ensure_models_loaded
+from services.generation_pool import pool_key
 
-async def generate(req: ImageGenerationPrompt) -> GeneratedImages:
-    """Function used for generating weird images."""
-    # Set lock if not already set
-    if states.BACKEND_LOCK is None:
-        states.BACKEND_LOCK = asyncio.Lock()
+# Inpainting strength of each generated variant
+VARIANT_STRENGTHS = (0.5, 0.6, 0.7, 0.8)
+# How often the pool producer checks for idle time
+POOL_POLL_SECONDS = 5
+# Streamed rounds run every variant on its own so the first image arrives after a quarter of the work
+STREAM_BATCHED = False
+
+def _find_street_region(street_image):
+    """Runs the street segmentation and finds the suitable inpainting region."""
+    polygons_results = states.STREET_DETECTION_MODEL.predict(
+        source=street_image,
+        task='segment',
+        verbose=False,
+        conf=0.25
+    )
+    return get_suitable_region(polygons_results, street_image)
 
-    async with states.BACKEND_LOCK:
-        # Extracting the main nouns from the user's prompt
-        states.USER_PROMPT_SUMMARY = extract_nouns_with_counts(req.prompt)
+async def _pick_street_round(priority: int = GENERATE_PRIORITY) -> tuple[Image.Image, list]:
+    """Picks the street image and one random inpainting bbox per variant."""
+    scheduler = get_model_scheduler()
 
+    if states.STREET_REGION_INDEX is not None:
+        # Randomly select precomputed street region
+        street_region = states.STREET_REGION_INDEX.sample()
+        street_image = await asyncio.to_thread(lambda: Image.open(street_region.image_path).convert("RGB"))
+        suitable_inpaint_region_bbox = street_region.bbox
+        height_diff = street_region.height_diff
+    else:
         # Randomly select street image from dataset
-        street_image_folder_path = "/home/ai-team2/Weird-Stuff-In-Traffic/Data/yolo/nuScenes/images/train"
-        all_street_image_paths = [
-            os.path.join(street_image_folder_path, f)
-            for f in os.listdir(street_image_folder_path)
-            if f.lower().endswith((".png", ".jpg", ".jpeg"))
-        ]
-        image_path = random.choice(all_street_image_paths)
-        street_image = Image.open(image_path).convert("RGB")
+        image_path = random.choice(list_street_images())
+        street_image = await asyncio.to_thread(lambda: Image.open(image_path).convert("RGB"))
 
         # Gathering Suitable Region for Inpainting
-        polygons_results = states.STREET_DETECTION_MODEL.predict(
-            source=street_image,
-            task='segment',
-            verbose=False,
-            conf=0.25
+        await ensure_models_loaded("street_detection")
+        street_image, suitable_inpaint_region_bbox, height_diff = await scheduler.run(
+            "street_detection", _find_street_region, street_image, priority=priority
+        )
+
+    # Random fitting bboxes for inpainting, one per variant
+    inpaint_bboxes = [
+        get_random_bbox_within_bbox(
+                    bbox=suitable_inpaint_region_bbox,
+                    min_width=street_image.width*0.4,
+                    max_width=street_image.width*0.7,
+                    min_height=street_image.height*0.4,
+                    max_height=street_image.height*0.7,
+                    height_diff=height_diff,
+                    image_size=street_image.size
+            )
+        for _ in VARIANT_STRENGTHS
+    ]
+
+    return street_image, inpaint_bboxes
+
+async def _prepare_round(prompt: str) -> tuple[Image.Image, list, str]:
+    """Picks the street image and the inpainting bboxes of a round, returns them with the session token."""
+    await ensure_models_loaded("generation")
+
+    # Extracting the main nouns from the user's prompt for the scoring of this round
+    session_token = get_session_store().create(extract_nouns_with_counts(prompt))
+
+    street_image, inpaint_bboxes = await _pick_street_round()
+    return street_image, inpaint_bboxes, session_token
+
+async def _take_pooled_round(prompt: str, profile: str | None = None) -> tuple[list, str] | None:
+    """Serves a pre-generated round of the prompt's noun set, returns its PNG images and a session token, None on a miss."""
+    pool = states.GENERATION_POOL
+    # The producer only pre-generates with the default diffusion profile
+    if pool is None or (profile or DIFFUSION_PROFILE) != DIFFUSION_PROFILE:
+        return None
+    nouns = extract_nouns_with_counts(prompt)
+    png_images = await asyncio.to_thread(pool.take, nouns, prompt)
+    if not png_images:
+        return None
+    print(f"Serving a pre-generated round for '{pool_key(nouns)}'")
+    return png_images, get_session_store().create(nouns)
+
+async def generate_images(prompt: str, profile: str | None = None) -> tuple[list, str]:
+    """
+    Generates the inpainted variants for a prompt with the named diffusion profile,
+    returns the PIL images and the session token of the round.
+    """
+    street_image, inpaint_bboxes, session_token = await _prepare_round(prompt)
+
+    # Inpainting the images in batched diffusion runs
+    print("Attempting Inpainting")
+    inpainted_images = await get_model_scheduler().run(
+        "generation",
+        inpaint_images,
+        street_image,
+        inpaint_bboxes,
+        prompt,
+        VARIANT_STRENGTHS,
+        profile=profile,
+        priority=GENERATE_PRIORITY
+    )
+
+    print(f"\nAll {len(inpainted_images)} pictures successfully processed ")
+
+    return inpainted_images, session_token
+
+async def generate(req: ImageGenerationPrompt) -> GeneratedImages:
+    """Function used for generating weird images."""
+    png_images, session_token = await generate_binary(req)
+
+    # Creating GeneratedImage objects
+    generated_images = []
+    for png_bytes in png_images:
+        inpainted_image_base64 = base64.b64encode(png_bytes).decode("utf-8")
+        generated_images.append(GeneratedImage(prompt=req.prompt,imageBase64=inpainted_image_base64))
+
+    return GeneratedImages(images=generated_images, sessionToken=session_token)
+
+async def generate_binary(req: ImageGenerationPrompt) -> tuple[list[bytes], str]:
+    """Binary variant of generate(), returns the PNG bytes of every variant and the session token."""
+    pooled_round = await _take_pooled_round(req.prompt, req.profile)
+    if pooled_round is not None:
+        return pooled_round
+
+    inpainted_images, session_token = await generate_images(req.prompt, req.profile)
+
+    png_images = [await asyncio.to_thread(image_to_png_bytes, inpainted_image) for inpainted_image in inpainted_images]
+
+    return png_images, session_token
+
+async def _stream_round(prompt, street_image, inpaint_bboxes, session_token, previews, profile=None):
+    """Runs the inpainting of a prepared round and yields its GenerationEvents."""
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue()
+
+    # Called on the generation worker thread, encoding happens on the event loop side
+    def on_group_done(indices, images):
+        for i, image in zip(indices, images):
+            loop.call_soon_threadsafe(events.put_nowait, ("image", i, None, image))
+
+    def on_preview(indices, step, images):
+        for i, image in zip(indices, images):
+            loop.call_soon_threadsafe(events.put_nowait, ("preview", i, step, image))
+
+    async def run_inpainting():
+        return await get_model_scheduler().run(
+            "generation",
+            inpaint_images,
+            street_image,
+            inpaint_bboxes,
+            prompt,
+            VARIANT_STRENGTHS,
+            batched=STREAM_BATCHED,
+            on_group_done=on_group_done,
+            on_preview=on_preview if previews else None,
+            profile=profile,
+            priority=GENERATE_PRIORITY
+        )
+
+    inpainting_task = asyncio.create_task(run_inpainting())
+    inpainting_task.add_done_callback(lambda _: events.put_nowait(None))
+
+    try:
+        yield GenerationEvent(type="session", sessionToken=session_token)
+
+        while (event := await events.get()) is not None:
+            kind, index, step, image = event
+            encode = image_to_png_bytes if kind == "image" else image_to_jpeg_bytes
+            image_bytes = await asyncio.to_thread(encode, image)
+            yield GenerationEvent(
+                type=kind,
+                index=index,
+                step=step,
+                prompt=prompt,
+                imageBase64=base64.b64encode(image_bytes).decode("utf-8")
+            )
+
+        try:
+            await inpainting_task
+        except Exception as e:
+            yield GenerationEvent(type="error", detail=str(e))
+        else:
+            yield GenerationEvent(type="done", sessionToken=session_token)
+    finally:
+        # The client went away, the running diffusion job finishes on its own
+        if not inpainting_task.done():
+            inpainting_task.cancel()
+
+async def _stream_pooled_round(prompt, png_images, session_token):
+    """Yields the GenerationEvents of a pre-generated round."""
+    yield GenerationEvent(type="session", sessionToken=session_token)
+    for index, png_bytes in enumerate(png_images):
+        yield GenerationEvent(type="image", index=index, prompt=prompt, imageBase64=base64.b64encode(png_bytes).decode("utf-8"))
+    yield GenerationEvent(type="done", sessionToken=session_token)
+
+async def generate_stream(req: ImageGenerationPrompt, previews: bool = False):
+    """
+    Streaming variant of generate(), returns an async iterator of GenerationEvents: the session token first,
+    then every variant as soon as its diffusion run is done (and optional step previews), then "done".
+    The round is prepared before streaming starts so that missing models or a full street queue still raise.
+    """
+    pooled_round = await _take_pooled_round(req.prompt, req.profile)
+    if pooled_round is not None:
+        return _stream_pooled_round(req.prompt, *pooled_round)
+
+    street_image, inpaint_bboxes, session_token = await _prepare_round(req.prompt)
+    return _stream_round(req.prompt, street_image, inpaint_bboxes, session_token, previews, req.profile)
+
+### Generation Pool Producer ###
+
+async def _produce_round(prompt: str) -> list | None:
+    """
+    Inpaints a round for the pool at background priority, one variant per job so that live requests
+    only wait for a single diffusion run. Returns None when live traffic came in meanwhile.
+    """
+    scheduler = get_model_scheduler()
+    street_image, inpaint_bboxes = await _pick_street_round(priority=BACKGROUND_PRIORITY)
+
+    png_images = []
+    for bbox, strength in zip(inpaint_bboxes, VARIANT_STRENGTHS):
+        if not states.GENERATION_POOL.is_idle():
+            return None
+        inpainted_images = await scheduler.run(
+            "generation", inpaint_images, street_image, [bbox], prompt, (strength,), priority=BACKGROUND_PRIORITY
         )
-        street_image, suitable_inpaint_region_bbox, height_diff = get_suitable_region(polygons_results, street_image)
-
-        # Generation of images
-        generated_images = []
-        strength = 0.5
-
-        for i in range(4):
-            # Clamp the strength
-            strength = max(0.0, min(strength, 1.0))
-
-            # get random fitting bbox for inpainting
-            inpaint_bbox = get_random_bbox_within_bbox(
-                        bbox=suitable_inpaint_region_bbox,
-                        min_width=street_image.width*0.4,
-                        max_width=street_image.width*0.7,
-                        min_height=street_image.height*0.4,
-                        max_height=street_image.height*0.7,
-                        height_diff=height_diff,
-                        image_size=street_image.size
-                )
-
-            # Inpainting the image
-            print("Attempting Inpainting")
-            inpainted_image = inpaint_image(street_image.copy(), inpaint_bbox, req.prompt, strength)
-            buffered = BytesIO()
-            inpainted_image.save(buffered, format="PNG")
-
-            # Encoding and Creating GeneratedImage object
-            inpainted_image_base64 = base64.b64encode(buffered.getvalue()).decode("utf-8")
-            generated_images.append(GeneratedImage(prompt=req.prompt,imageBase64=inpainted_image_base64))
-
-            # Strength Increase
-            strength += 0.1
-
-        print(f"\nAll {len(generated_images)} pictures successfully processed ")
-
-        return GeneratedImages(images=generated_images)
+        png_images.append(await asyncio.to_thread(image_to_png_bytes, inpainted_images[0]))
+    return png_images
+
+async def run_pool_producer(poll_seconds: float = POOL_POLL_SECONDS):
+    """
+    Background task that pre-generates rounds for the most requested noun sets while the replica is idle.
+    Only runs once the generation model and the street regions (index or segmentation model) are available,
+    it never loads models on its own.
+    """
+    while True:
+        await asyncio.sleep(poll_seconds)
+        pool = states.GENERATION_POOL
+        if pool is None or states.GENERATION_MODEL is None or not pool.is_idle():
+            continue
+        # Without the precomputed regions the street segmentation has to be loaded already
+        if states.STREET_REGION_INDEX is None and states.STREET_DETECTION_MODEL is None:
+            continue
+        if get_model_scheduler().worker("generation").queue_depth() > 0:
+            continue
+        candidate = pool.next_candidate()
+        if candidate is None:
+            continue
+
+        key, prompt = candidate
+        try:
+            png_images = await _produce_round(prompt)
+        except SchedulerBusyError:
+            continue
+        except Exception as e:
+            print(f"Failed to pre-generate a round for '{key}': {e}")
+            continue
+        if png_images is not None:
+            await asyncio.to_thread(pool.put, key, prompt, png_images)
+            print(f"Pre-generated a round for '{key}'")
@@ -1,284 +1,348 @@
 """services/image_inpainting.py"""
 
 # Imports
-import numpy as np
+import math
+import os
+from typing import NamedTuple
 import cv2
-import random
-from diffusers import DPMSolverMultistepScheduler
+import numpy as np
 import torch
-from PIL import Image, ImageDraw, ImageFilter
+from PIL import Image
 from services import states
+from services.prompt_embedding_cache import get_prompt_embedding_cache
+
+# Linear projection of the SDXL latent channels to RGB, used for cheap step previews
+SDXL_LATENT_RGB_FACTORS = (
+    (0.3651, 0.4232, 0.4341),
+    (-0.2533, -0.0042, 0.1068),
+    (0.1076, 0.1111, -0.0362),
+    (-0.3165, -0.2492, -0.2188),
+)
+SDXL_LATENT_RGB_BIAS = (0.1084, -0.0175, -0.0011)
+# Number of denoising steps between two previews
+PREVIEW_EVERY_STEPS = 10
+
+class DiffusionProfile(NamedTuple):
+    """Quality / latency settings of the SDXL inpainting."""
+    num_inference_steps: int
+    guidance_scale: float
+    width: int
+    height: int
+    scheduler: str = "dpmsolver"
+    lora: str | None = None  # LoRA adapter on the Hugging Face Hub, loaded on first use
+
+LCM_LORA_ID = "latent-consistency/lcm-lora-sdxl"
+# "preview" uses the LCM-LoRA distillation, a handful of steps with low guidance at 0.64 of the resolution
+DIFFUSION_PROFILES = {
+    "preview": DiffusionProfile(num_inference_steps=8, guidance_scale=1.5, width=1024, height=576, scheduler="lcm", lora=LCM_LORA_ID),
+    "standard": DiffusionProfile(num_inference_steps=25, guidance_scale=7.0, width=1600, height=896),
+    "high": DiffusionProfile(num_inference_steps=40, guidance_scale=7.0, width=1600, height=896),
+}
+# Profile of requests that do not name one
+DIFFUSION_PROFILE = os.environ.get("DIFFUSION_PROFILE", "high")
+
+# "full" diffuses the whole street image, "region" only a padded window around every bbox
+INPAINT_MODE = os.environ.get("INPAINT_MODE", "full")
+INPAINT_MODES = ("full", "region")
+# Context around the bbox, covers the feather of the 50 px Gaussian blur of the mask (below 1/255 beyond it)
+REGION_PADDING = 128
+# Long side the window is diffused at, the native SDXL scale
+REGION_SIZE = 1024
+# Feather of the inpainting mask, standard deviation in pixels of the Gaussian blur
+MASK_BLUR_RADIUS = 50
+MASK_VISIBLE_LEVEL = 0.5 / 255
+
+def get_diffusion_profile(name=None):
+    """Returns the named profile, the default profile for None."""
+    name = name or DIFFUSION_PROFILE
+    if name not in DIFFUSION_PROFILES:
+        raise ValueError(f"Unknown diffusion profile: {name}")
+    return DIFFUSION_PROFILES[name]
+
+def _create_scheduler(name, config):
+    from diffusers import DPMSolverMultistepScheduler, LCMScheduler
+    schedulers = {"dpmsolver": DPMSolverMultistepScheduler, "lcm": LCMScheduler}
+    return schedulers[name].from_config(config)
+
+class ProfileSwitcher:
+    """
+    Switches the scheduler and LoRA adapter of the shared pipeline between profiles.
+    Every scheduler is created once and LoRA weights are loaded once, later switches only swap references.
+    """
 
-def _parse_polygon_string(polygon_data_string, image_width, image_height):
-    '''
-    Parses the polygon coordinates from a string, converts them and returns them
-    them as a NumPy array.
-    '''
-    try:
-        if not polygon_data_string:
-            # print("Error: Empty polygon data string received")
-            return None
-
-        parts = polygon_data_string.strip().split()
-        if len(parts) < 7:
-            # print(f"Error: Invalid format in the string. Too few coordinates.")
-            return None
-
-        # Ignore the first number (class ID) and take the rest
-        coords_normalized = [float(p) for p in parts[:]]
-
-        if len(coords_normalized) % 2 != 0:
-            # print(f"Error: Odd number of coordinates in the string")
-            return None
-
-        vertices = []
-        for i in range(0, len(coords_normalized), 2):
-            nx = coords_normalized[i]
-            ny = coords_normalized[i+1]
-            # Convert normalized coordinates to pixel coordinates
-            x = int(nx * image_width)
-            y = int(ny * image_height)
-            # Ensure that points remain in the image
-            x = max(0, min(image_width - 1, x))
-            y = max(0, min(image_height - 1, y))
-            vertices.append([x, y])
-
-        return np.array(vertices, dtype=np.int32)
-
-    except ValueError:
-        # print(f"Error: The polygon string contains invalid numbers")
-        return None
-    except Exception as e:
-        print(f"An unexpected error occurred while parsing the string: {e}") 
-        return None
-
-def _rasterize_polygon(width, height, polygon_vertices):
-    """Creates a binary mask of the polygon."""
-    mask = np.zeros((height, width), dtype=np.uint8)
-    # cv2.fillPoly requires a list of polygons
-    cv2.fillPoly(mask, [polygon_vertices], 1) # 1 for pixels within
-    return mask
-
-def _calculate_height_map(polygon_mask):
-    """Calculates the height of the continuous '1's above each pixel."""
-    height, width = polygon_mask.shape
-    height_map = np.zeros((height, width), dtype=np.int32)
-
-    for x in range(width):
-        # Treat first line directly
-        if polygon_mask[0, x] == 1:
-            height_map[0, x] = 1
-
-        # Remaining lines
-        for y in range(1, height):
-            if polygon_mask[y, x] == 1:
-                height_map[y, x] = height_map[y - 1, x] + 1
-            # else: height_map[y, x] # remains 0 (default value)
-
-    return height_map
-
-def _largest_rectangle_in_histogram(heights):
-    """Finds the largest rectangle in a histogram (O(N) algorithm with stack)."""
-    stack = [] # Stack stores indices of the bars
-    max_area = 0
-    # (height, left index in the original histogram, width)
-    max_rect_details = (0, 0, 0)
-
-    # Add virtual bars at the beginning/end to handle edge cases
-    extended_heights = np.concatenate(([0], heights, [0]))
-
-    for i, h in enumerate(extended_heights):
-        while stack and extended_heights[stack[-1]] > h:
-            height = extended_heights[stack.pop()]
-
-            width = i - stack[-1] - 1 if stack else i
-            if width <= 0: 
-                continue
-
-            area = height * width
-            if area > max_area:
-                max_area = area
-               
-                original_left_idx = stack[-1] if stack else 0
-                max_rect_details = (height, original_left_idx, width)
-
-        if not stack or h > extended_heights[stack[-1]]:
-            stack.append(i)
-        elif stack and h == extended_heights[stack[-1]]:
-            stack[-1] = i
-
-    return max_area, max_rect_details
-
-
-def _find_largest_inscribed_rectangle(height_map):
-    """Iterates through the rows of the height map and finds the largest rectangle."""
-    height, width = height_map.shape
-    max_area_global = 0
-    # Saves (x_min, y_min, x_max, y_max) of the best rectangle
-    best_bbox = (0, 0, 0, 0)
-
-
-    for y in range(height):
-        # Histogram for the current line y (represents possible rectangle heights that end at y)
-        histogram = height_map[y, :]
-        # area: Area of the largest rectangle in the histogram of this line
-        # rect_h: Height of this rectangle (corresponds to the value in the histogram)
-        # rect_left_idx: Left column (x-coordinate) of the rectangle in the histogram
-        # rect_w: Width of this rectangle
-        area, (rect_h, rect_left_idx, rect_w) = _largest_rectangle_in_histogram(histogram)
-
-        if area > max_area_global:
-            max_area_global = area
-            # Conversion of the histogram coordinates into image coordinates
-            x_min = rect_left_idx
-            x_max = rect_left_idx + rect_w - 1
-            y_max = y
-            y_min = y - rect_h + 1
-
-            # Validity check (within image boundaries and positive dimension)
-            if x_min >= 0 and y_min >= 0 and x_max < width and y_max < height and rect_w > 0 and rect_h > 0:
-                best_bbox = (x_min, y_min, x_max, y_max)
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+        # models/loaders.py loads the pipeline with DPM-Solver++
+        self.scheduler_name = "dpmsolver"
+        self.schedulers = {}
+        self.loaded_adapters = set()
+        self.active_adapter = None
+
+    def apply(self, profile):
+        """Prepares the pipeline for a diffusion run with the profile."""
+        pipeline = self.pipeline
+        if profile.scheduler != self.scheduler_name:
+            self.schedulers.setdefault(self.scheduler_name, pipeline.scheduler)
+            if profile.scheduler not in self.schedulers:
+                self.schedulers[profile.scheduler] = _create_scheduler(profile.scheduler, pipeline.scheduler.config)
+            pipeline.scheduler = self.schedulers[profile.scheduler]
+            self.scheduler_name = profile.scheduler
+
+        if profile.lora != self.active_adapter:
+            if profile.lora is None:
+                pipeline.disable_lora()
             else:
-                max_area_global = 0
-                best_bbox = (0, 0, 0, 0)
-
-    return max_area_global, best_bbox
-
-
-def get_suitable_inpaint_area(polygon_data_string, image_width, image_height):
+                adapter_name = profile.lora.rsplit("/", 1)[-1]
+                if profile.lora not in self.loaded_adapters:
+                    pipeline.load_lora_weights(profile.lora, adapter_name=adapter_name)
+                    self.loaded_adapters.add(profile.lora)
+                pipeline.enable_lora()
+                pipeline.set_adapters([adapter_name])
+            self.active_adapter = profile.lora
+
+_profile_switcher = None
+
+def _get_profile_switcher():
+    """Switcher of the current generation model, recreated when the model was reloaded."""
+    global _profile_switcher
+    if _profile_switcher is None or _profile_switcher.pipeline is not states.GENERATION_MODEL:
+        _profile_switcher = ProfileSwitcher(states.GENERATION_MODEL)
+    return _profile_switcher
+
+def create_generators(seeds):
+    """One seeded generator per variant on the generation device (CPU when no device is set)."""
+    generator_device = states.DEVICE if states.DEVICE is not None else "cpu"
+    return [torch.Generator(generator_device).manual_seed(seed) for seed in seeds]
+
+class MaskFactory:
     """
-    Calculates the largest inscribed rectangle for a polygon that is passed as a string
-    with normalized coordinates.
+    Feathered rectangle masks of one image size without blurring the frame. The blurred rectangle is the
+    outer product of two blurred 1-D steps, looked up in a Gaussian edge profile computed once.
+    Matches the former GaussianBlur of a drawn rectangle up to PIL's box blur approximation (a few levels of 255),
+    next to the image border it is the exact Gaussian of the border repeated outwards.
     """
-    # Parse polygon string and convert to pixel coordinates
-    poly_verts = _parse_polygon_string(polygon_data_string, image_width, image_height)
-    if poly_verts is None or len(poly_verts) < 3:
-        print("Fehler: Ungültiges Polygon erhalten.") 
-        return None # Ungültiges Polygon
-
-    # Rasterize polygon (creates a mask)
-    try:
-        poly_mask = _rasterize_polygon(image_width, image_height, poly_verts)
-    except Exception as e:
-        print(f"Fehler beim Rasterisieren: {e}")
-        return None
-
-    # Calculate height map from the mask
-    try:
-        h_map = _calculate_height_map(poly_mask)
-    except Exception as e:
-        print(f"Fehler bei der Höhen-Map-Berechnung: {e}") 
-        return None
-
-    # Find the largest BBox in the height map
-    try:
-        max_area, bbox = _find_largest_inscribed_rectangle(h_map)
-    except Exception as e:
-        print(f"Fehler beim Finden des Rechtecks: {e}") 
-        return None
-
-    if max_area > 0:
-        x_min, y_min, x_max, y_max = bbox
-        if x_max >= x_min and y_max >= y_min and (x_max - x_min) >= 0 and (y_max - y_min) >= 0:
-            return bbox
-        else:
-            print("Warnung: Gefundenes Rechteck hat ungültige Dimensionen.")
-            return None # Invalid BBox found
-    else:
-        print("Kein eingeschriebenes Rechteck gefunden.") 
-        return None # no rectangle found
-
-
-def get_suitable_region(polygons_results, street_image):
-
-    # extract polygon out of yolo output
-    for result in polygons_results:
-        for polygon in result.masks.xy:
-            scaled_polygon = []
-            for point in polygon:
-                normalized_point = (point[0] / street_image.width, point[1] / street_image.height)
-                scaled_polygon.append(f"{normalized_point[0]} {normalized_point[1]}")          
-            final_polygon = " ".join(scaled_polygon)
-
-    # and get biggest bounding box inside polygon
-    suitable_inpaint_region_bbox = get_suitable_inpaint_area(final_polygon, street_image.width, street_image.height)
-
-    # and compute height difference for better inpaint bbox placement
-    height_diff=get_height_diff(final_polygon, suitable_inpaint_region_bbox, street_image.height)
-
-    return street_image, suitable_inpaint_region_bbox, height_diff
-
-def get_height_diff(polygon, bbox, image_height):
-    # compute height difference between suitable inpaint region and polygon
-    coords = list(map(float, polygon.strip().split()))
-    y_coords = coords[1::2] 
-    min_y_normalized = min(y_coords)
-    min_y = int(min_y_normalized * image_height)
-    return bbox[1] - min_y
-
-def get_random_bbox_within_bbox(bbox, min_width, max_width, min_height, max_height, height_diff, image_size):
-
-    x1, y1, x2, y2 = bbox
-
-    # random center point inside bbox
-    xc = random.uniform(x1+0.2*(x2-x1), x2-0.2*(x2-x1))
-    yc = random.uniform(y1, y2)
-
-    # random with and height
-    width = random.uniform(min_width, max_width)
-    height = random.uniform(min_height, max_height)
-
-    # clip bbox size to image size to prevent a bigger bbox than image
-    new_x1 = int(max(xc - width / 2, 0))
-    new_y1 = int(max(yc - height / 2 - height_diff*1.5, 0))
-    new_x2 = int(min(xc + width / 2, image_size[0]))
-    new_y2 = int(min(yc + height / 2 + height_diff*1.5, image_size[1]))
-
-    return (new_x1, new_y1, new_x2, new_y2)
-
 
+    def __init__(self, image_size, radius=MASK_BLUR_RADIUS):
+        self.width, self.height = image_size
+        self.radius = radius
+        self._offset = max(image_size)
+        # Blurred step at every pixel centre, by offset from the first covered pixel
+        offsets = np.arange(-self._offset, self._offset + 1) + 0.5
+        self._edge = (0.5 * (1.0 + np.vectorize(math.erf)(offsets / (radius * math.sqrt(2))))).astype(np.float32)
+
+    def _profile(self, length, start, end):
+        """Blurred 1-D indicator of the pixels start..end, the border pixels repeat outside the image like in PIL."""
+        positions = np.arange(length)
+        rising = self._edge[positions - start + self._offset] if start > 0 else np.ones(length, dtype=np.float32)
+        falling = self._edge[positions - end - 1 + self._offset] if end < length - 1 else np.zeros(length, dtype=np.float32)
+        return rising - falling
+
+    def mask(self, bbox):
+        """Float32 (height, width) mask in [0, 1] of the bbox, corners included like in ImageDraw.rectangle."""
+        x1, y1, x2, y2 = (int(round(v)) for v in bbox)
+        x1, y1, x2, y2 = max(x1, 0), max(y1, 0), min(x2, self.width - 1), min(y2, self.height - 1)
+        if x1 > x2 or y1 > y2:
+            return np.zeros((self.height, self.width), dtype=np.float32)
+        mask = np.zeros((self.height, self.width), dtype=np.float32)
+        # Only the band where both profiles are visible (at least half a level of 255) is filled in
+        rows, columns = self._profile(self.height, y1, y2), self._profile(self.width, x1, x2)
+        top, bottom = _visible_range(rows)
+        left, right = _visible_range(columns)
+        mask[top:bottom, left:right] = np.outer(rows[top:bottom], columns[left:right])
+        return mask
+
+def _visible_range(profile):
+    visible = np.flatnonzero(profile >= MASK_VISIBLE_LEVEL)
+    return (visible[0], visible[-1] + 1) if len(visible) else (0, 0)
+
+_MASK_FACTORIES = {}
+
+def get_mask_factory(image_size, radius=MASK_BLUR_RADIUS):
+    """Mask factory of an image size and blur radius, created once."""
+    key = (tuple(image_size), radius)
+    if key not in _MASK_FACTORIES:
+        _MASK_FACTORIES[key] = MaskFactory(image_size, radius)
+    return _MASK_FACTORIES[key]
+
+def create_mask(img_w, img_h, x1, y1, x2, y2):
+    """Feathered float32 mask in [0, 1] of the bbox, the pipeline takes it as it is."""
+    return get_mask_factory((img_w, img_h)).mask((x1, y1, x2, y2))
 
 def create_mask_image(img_w, img_h, x1, y1, x2, y2):
-    mask = Image.new("L", (img_w, img_h), 0)
-    draw = ImageDraw.Draw(mask)
-    draw.rectangle([x1, y1, x2, y2], fill=255)
-    mask = mask.filter(ImageFilter.GaussianBlur(50))
-    return mask
-
+    """PIL "L" version of create_mask()."""
+    return Image.fromarray(np.round(create_mask(img_w, img_h, x1, y1, x2, y2) * 255).astype(np.uint8))
+
+def latents_to_previews(latents):
+    """Approximates the RGB images of a latent batch without the VAE, at 1/8 of the resolution."""
+    factors = torch.tensor(SDXL_LATENT_RGB_FACTORS, dtype=torch.float32)
+    bias = torch.tensor(SDXL_LATENT_RGB_BIAS, dtype=torch.float32)
+    rgb = torch.einsum("bchw,cr->bhwr", latents.detach().float().cpu(), factors) + bias
+    rgb = ((rgb + 1.0) * 127.5).clamp(0, 255).to(torch.uint8).numpy()
+    return [Image.fromarray(image) for image in rgb]
+
+def variant_start_steps(strengths, num_inference_steps):
+    """
+    First denoising step of every variant in a run at the highest strength. The pipeline runs
+    int(num_inference_steps * strength) steps, so a weaker variant joins that many steps before the end.
+    """
+    steps = [min(int(num_inference_steps * strength), num_inference_steps) for strength in strengths]
+    return [max(steps) - variant_steps for variant_steps in steps]
 
-def realvisxl_inpaint(x1, y1, x2, y2, image, user_prompt, strength):
+def _step_callback(on_preview, preview_every, start_steps):
+    """
+    Diffusers step-end callback of a batch with several strengths, handing the intermediate previews to
+    on_preview(step, images). Until its first step a weaker variant gets a zero mask, so the pipeline keeps
+    replacing its latents by the noised input image, exactly what a run at its own strength starts from.
+    """
+    original_mask = None
+
+    def callback(_pipeline, step, _timestep, callback_kwargs):
+        nonlocal original_mask
+        if any(start_steps):
+            mask = callback_kwargs["mask"]
+            if original_mask is None:
+                original_mask = mask.clone()
+            # The mask holds the batch twice with classifier free guidance
+            waiting = torch.tensor([step + 1 < start for start in start_steps], device=mask.device).repeat(mask.shape[0] // len(start_steps))
+            callback_kwargs["mask"] = torch.where(waiting[:, None, None, None], torch.zeros_like(original_mask), original_mask)
+        if on_preview is not None and (step + 1) % preview_every == 0:
+            on_preview(step + 1, latents_to_previews(callback_kwargs["latents"]))
+        return callback_kwargs
+    return callback
+
+def realvisxl_inpaint_batch(images, mask_images, user_prompt, strengths, seeds, on_preview=None, preview_every=PREVIEW_EVERY_STEPS, profile=None, size=None):
+    """
+    Inpaints a batch of images sharing one prompt, each at its own strength, in a single diffusion run with the
+    named diffusion profile, at size (width, height) instead of the profile resolution if given. The run goes
+    at the highest strength and every weaker variant starts at its own step (see group_variants_by_strength()).
+    The images come back in their input size whatever the diffusion resolution is.
+    """
+    diffusion_profile = get_diffusion_profile(profile)
+    width, height = size or (diffusion_profile.width, diffusion_profile.height)
     negative_prompt = "blurry, artifacts, distorted, mutated, extra limbs, extra objects, low quality, bad composition, background change, duplicated, cloned"
     styling_prompt = ", realistically integrated into a real-world Street scene, preserving the original background, lighting, camera angle and perspective"
     negative_prompt = "blurry, artifacts, distorted, extra limbs, low quality, unrealistic, ugly"
     styling_prompt = ", street view, scene, photography, detailed, high quality, near the camera"
 
-    mask_image = create_mask_image(image.size[0], image.size[1], x1, y1, x2, y2)
-
     # visualize mask for inpainting
     # draw = ImageDraw.Draw(mask_image)
     # draw.rectangle((x1, y1, x2, y2), outline='green', width=5)
     # mask_image.save("G:/weirdstuffintraffic/mask_image.png")
 
-    torch.cuda.empty_cache()
-    torch.cuda.ipc_collect()
+    if torch.cuda.is_available():
+        torch.cuda.empty_cache()
+        torch.cuda.ipc_collect()
+
+    # One generator per variant so every image keeps its own seed inside the batch
+    generators = create_generators(seeds)
+    profile_switcher = _get_profile_switcher()
+    profile_switcher.apply(diffusion_profile)
+
+    # The text encoders run once per prompt, the negative prompt once per process
+    embedding_cache = get_prompt_embedding_cache()
+    prompt_embeds, pooled_prompt_embeds = embedding_cache.get(states.GENERATION_MODEL, user_prompt + styling_prompt, profile_switcher.active_adapter)
+    negative_prompt_embeds, negative_pooled_prompt_embeds = embedding_cache.get(
+        states.GENERATION_MODEL, negative_prompt, profile_switcher.active_adapter, pinned=True
+    )
+
+    # Weaker variants are held at their noised input until their first step, optional low resolution previews
+    start_steps = variant_start_steps(strengths, diffusion_profile.num_inference_steps)
+    if 1 in start_steps:
+        raise ValueError("A variant one step behind the strongest one can not join its batch.")
+    callback_kwargs = {}
+    if on_preview is not None or any(start_steps):
+        callback_kwargs = {
+            "callback_on_step_end": _step_callback(on_preview, preview_every, start_steps),
+            "callback_on_step_end_tensor_inputs": ["latents", "mask"] if any(start_steps) else ["latents"],
+        }
 
     #pylint: disable=not-callable
     result = states.GENERATION_MODEL(
-        prompt=user_prompt + styling_prompt,
-        negative_prompt=negative_prompt,
-        image=image,
-        mask_image=mask_image,
-        strength=strength,
-        num_inference_steps=40,
-        guidance_scale=7.0,
-        height=896,
-        width=1600,
+        prompt_embeds=prompt_embeds.repeat(len(images), 1, 1),
+        pooled_prompt_embeds=pooled_prompt_embeds.repeat(len(images), 1),
+        negative_prompt_embeds=negative_prompt_embeds.repeat(len(images), 1, 1),
+        negative_pooled_prompt_embeds=negative_pooled_prompt_embeds.repeat(len(images), 1),
+        image=images,
+        mask_image=mask_images,
+        strength=max(strengths),
+        num_inference_steps=diffusion_profile.num_inference_steps,
+        guidance_scale=diffusion_profile.guidance_scale,
+        height=height,
+        width=width,
         inpaint_full_res=True,
         inpaint_full_res_padding=32,
-        generator=torch.Generator("cuda").manual_seed(42)
+        generator=generators,
+        **callback_kwargs
+    )
+
+    return [
+        inpainted_image if inpainted_image.size == image.size else inpainted_image.resize(image.size, Image.LANCZOS)
+        for inpainted_image, image in zip(result.images, images)
+    ]
+
+def region_window_size(bboxes, image_size, padding=REGION_PADDING):
+    """Size of the windows of a batch: the largest bbox of the batch padded on every side, at most the image."""
+    image_width, image_height = image_size
+    width = max(x2 - x1 for x1, _, x2, _ in bboxes) + 2 * padding
+    height = max(y2 - y1 for _, y1, _, y2 in bboxes) + 2 * padding
+    return min(int(round(width)), image_width), min(int(round(height)), image_height)
+
+def region_window(bbox, image_size, window_size):
+    """Window (left, top, right, bottom) of window_size centred on the bbox, shifted inside the image."""
+    x1, y1, x2, y2 = bbox
+    image_width, image_height = image_size
+    window_width, window_height = window_size
+    left = int(round(min(max((x1 + x2 - window_width) / 2, 0), image_width - window_width)))
+    top = int(round(min(max((y1 + y2 - window_height) / 2, 0), image_height - window_height)))
+    return left, top, left + window_width, top + window_height
+
+def region_size(profile):
+    """Long side of the diffused window: the native SDXL scale, or less for profiles with fewer pixels."""
+    side = min(REGION_SIZE, int((profile.width * profile.height) ** 0.5))
+    return side - side % 8
+
+def region_diffusion_size(window_size, profile):
+    """Diffusion resolution of a window: the long side at region_size(), the aspect ratio kept up to multiples of 8."""
+    scale = region_size(profile) / max(window_size)
+    return tuple(max(8, int(round(length * scale / 8)) * 8) for length in window_size)
+
+def region_inpaint_batch(images, mask_images, bboxes, user_prompt, strengths, seeds, on_preview=None, preview_every=PREVIEW_EVERY_STEPS, profile=None):
+    """
+    Region-focused variant of realvisxl_inpaint_batch(): crops a padded window around every bbox, diffuses
+    the windows at the SDXL scale and blends them back into the images with the feathered masks (create_mask() arrays).
+    All windows of the batch share one size so that they run in one batch without changing their aspect ratio.
+    Pixels outside the windows stay untouched and the previews only show the windows.
+    """
+    window_size = region_window_size(bboxes, images[0].size)
+    size = region_diffusion_size(window_size, get_diffusion_profile(profile))
+    windows = [region_window(bbox, image.size, window_size) for bbox, image in zip(bboxes, images)]
+    inpainted_windows = realvisxl_inpaint_batch(
+        [image.crop(window).resize(size, Image.LANCZOS) for image, window in zip(images, windows)],
+        [cv2.resize(mask[top:bottom, left:right], size, interpolation=cv2.INTER_LINEAR) for mask, (left, top, right, bottom) in zip(mask_images, windows)],
+        user_prompt,
+        strengths,
+        seeds,
+        on_preview=on_preview,
+        preview_every=preview_every,
+        profile=profile,
+        size=size,
     )
 
-    return result.images[0]
+    inpainted_images = []
+    for image, mask, window, inpainted_window in zip(images, mask_images, windows, inpainted_windows):
+        left, top, right, bottom = window
+        original_window = np.asarray(image.crop(window), dtype=np.float32)
+        inpainted_window = np.asarray(inpainted_window.resize((right - left, bottom - top), Image.LANCZOS), dtype=np.float32)
+        alpha = mask[top:bottom, left:right, None]
+        blended_window = original_window + alpha * (inpainted_window - original_window)
+        inpainted_image = image.copy()
+        inpainted_image.paste(Image.fromarray(np.round(blended_window).astype(np.uint8)), (left, top))
+        inpainted_images.append(inpainted_image)
+    return inpainted_images
+
+def realvisxl_inpaint(x1, y1, x2, y2, image, user_prompt, strength):
+    mask = create_mask(image.size[0], image.size[1], x1, y1, x2, y2)
+    return realvisxl_inpaint_batch([image], [mask], user_prompt, [strength], seeds=[42])[0]
 
 def inpaint_image(street_image, bbox, user_prompt, strength=0.6):
 
@@ -286,4 +350,61 @@ def inpaint_image(street_image, bbox, user_prompt, strength=0.6):
 
     inpainted_image = realvisxl_inpaint(x1, y1, x2, y2, street_image, user_prompt, strength)
 
-    return inpainted_image
\ No newline at end of file
+    return inpainted_image
+
+def group_variants_by_strength(strengths, num_inference_steps):
+    """
+    Groups variant indices into batched diffusion runs, strongest variants first. A run goes at the highest
+    strength of its group and the weaker variants join it at their own step, except a variant exactly one
+    step behind: its mask is applied before the first step callback, so it starts the next run.
+    """
+    groups = []
+    for i in sorted(range(len(strengths)), key=lambda i: -strengths[i]):
+        for group in groups:
+            if variant_start_steps([strengths[group[0]], strengths[i]], num_inference_steps)[1] != 1:
+                group.append(i)
+                break
+        else:
+            groups.append([i])
+    return groups
+
+def inpaint_images(street_image, bboxes, user_prompt, strengths, seeds=None, batched=True, on_group_done=None, on_preview=None, profile=None, mode=None):
+    """
+    Inpaints one variant per bbox at its own strength with batched diffusion runs of the named diffusion profile,
+    on the whole image or only around the bbox (mode "full" or "region", INPAINT_MODE if None).
+    All variants usually share one run, batched=False runs every variant on its own.
+    on_group_done(indices, images) is called after every run, on_preview(indices, step, images) during it.
+    """
+    mode = mode or INPAINT_MODE
+    if mode not in INPAINT_MODES:
+        raise ValueError(f"Unknown inpainting mode: {mode}")
+    seeds = seeds if seeds is not None else [42 + i for i in range(len(bboxes))]
+    strengths = [max(0.0, min(strength, 1.0)) for strength in strengths]
+    inpainted_images = [None] * len(bboxes)
+
+    if batched:
+        groups = group_variants_by_strength(strengths, get_diffusion_profile(profile).num_inference_steps)
+    else:
+        groups = [[i] for i in range(len(bboxes))]
+    for group in groups:
+        mask_images = [create_mask(street_image.size[0], street_image.size[1], *bboxes[i]) for i in group]
+
+        group_kwargs = {
+            "seeds": [seeds[i] for i in group],
+            "on_preview": (lambda step, previews, group=group: on_preview(group, step, previews)) if on_preview is not None else None,
+            "profile": profile,
+        }
+        group_strengths = [strengths[i] for i in group]
+        if mode == "region":
+            group_images = region_inpaint_batch(
+                [street_image] * len(group), mask_images, [bboxes[i] for i in group], user_prompt, group_strengths, **group_kwargs
+            )
+        else:
+            group_images = realvisxl_inpaint_batch([street_image.copy() for _ in group], mask_images, user_prompt, group_strengths, **group_kwargs)
+
+        for i, inpainted_image in zip(group, group_images):
+            inpainted_images[i] = inpainted_image
+        if on_group_done is not None:
+            on_group_done(group, group_images)
+
+    return inpainted_images
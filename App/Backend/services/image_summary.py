@@ -1,16 +1,22 @@
 """ services/image_summary """
 
 # Imports
+import inspect
+import os
 from PIL import Image
 import torch
 import numpy as np
 import transformers
+from services.structured_decoding import constrained_generation_kwargs, close_list
 
 MIN_SIZE = 28  # From the error
+# Grammar constrained lists close early, a list cut off at the limit is closed after its last complete string
+STRUCTURED_MAX_NEW_TOKENS = int(os.environ.get("STRUCTURED_MAX_NEW_TOKENS", 256))
+NOUN_QUESTION = "Is there a {} in this image? Answer yes or no."
 
-def preprocess(instruction: str, image_np: np.ndarray,
-               processor: transformers.AutoProcessor) -> transformers.BatchEncoding:
-    """Preprocesses the image and prompt into the correct format for the VLM."""
+def _build_chat(instruction: str, image_np: np.ndarray, processor: transformers.AutoProcessor,
+                system_instruction: str | None = None):
+    """Formats the chat for a single image and returns the prompt text and the image."""
 
     # Opening Image
     image = Image.fromarray(image_np)
@@ -22,7 +28,8 @@ def preprocess(instruction: str, image_np: np.ndarray,
         image = image.resize((new_width, new_height))
 
     # System Instructions
-    system_instruction = "You are an assistant that returns a list of objects as strings in the image. Example: ['x', 'y', 'z']"
+    if system_instruction is None:
+        system_instruction = "You are an assistant that returns a list of objects as strings in the image. Example: ['x', 'y', 'z']"
 
     # Formatting the Chat
     chat = [
@@ -42,24 +49,57 @@ def preprocess(instruction: str, image_np: np.ndarray,
     # Applying the Chat template
     text_prompt = processor.apply_chat_template(chat, add_generation_prompt=True)
 
+    return text_prompt, image
+
+def preprocess(instruction: str, image_np: np.ndarray,
+               processor: transformers.AutoProcessor) -> transformers.BatchEncoding:
+    """Preprocesses the image and prompt into the correct format for the VLM."""
+    return preprocess_batch(instruction, [image_np], processor)
+
+def preprocess_batch(instruction: str | list[str], images_np: list[np.ndarray],
+                     processor: transformers.AutoProcessor, system_instruction: str | None = None) -> transformers.BatchEncoding:
+    """Preprocesses several images with the same (or one instruction per image) into one padded batch."""
+    instructions = [instruction] * len(images_np) if isinstance(instruction, str) else instruction
+    text_prompts, images = zip(*(
+        _build_chat(image_instruction, image_np, processor, system_instruction)
+        for image_instruction, image_np in zip(instructions, images_np)
+    ))
+
+    # Left padding so that generation continues directly after every prompt
+    processor.tokenizer.padding_side = "left"
+
     # Final Processing to be fed into Model
     model_inputs = processor(
-        text=[text_prompt], images=[image], padding=True, return_tensors="pt" 
+        text=list(text_prompts), images=list(images), padding=True, return_tensors="pt"
     )
 
     return model_inputs
 
 def generate_response(model_inputs, base_model: transformers.Qwen2VLForConditionalGeneration,
                       processor: transformers.AutoProcessor, device:torch.device,
-                      max_new_tokens=256):
+                      max_new_tokens=256, structured=False):
     """ Generates the desired text from the given image and prompt."""
+    return generate_responses(model_inputs, base_model, processor, device, max_new_tokens, structured)[0]
+
+def generate_responses(model_inputs, base_model: transformers.Qwen2VLForConditionalGeneration,
+                       processor: transformers.AutoProcessor, device:torch.device,
+                       max_new_tokens=256, structured=False) -> list[str]:
+    """
+    Generates the desired text for every prompt of a batch.
+    With structured=True the output is constrained to a list of strings and stops once the list is closed.
+    """
     # Preparing device and setting inputs
     base_model.eval()
     model_inputs = model_inputs.to(device)
 
+    generation_kwargs = {}
+    if structured:
+        generation_kwargs = constrained_generation_kwargs(processor.tokenizer, model_inputs.input_ids.shape[1])
+        max_new_tokens = min(max_new_tokens, STRUCTURED_MAX_NEW_TOKENS)
+
     # Performing generation and clipping
     with torch.no_grad():
-        generated_ids = base_model.generate(**model_inputs, max_new_tokens=max_new_tokens)
+        generated_ids = base_model.generate(**model_inputs, max_new_tokens=max_new_tokens, **generation_kwargs)
         generated_ids_trimmed = [
             out_ids[len(in_ids) :] for in_ids, out_ids in zip(model_inputs.input_ids, generated_ids)
         ]
@@ -67,4 +107,40 @@ def generate_response(model_inputs, base_model: transformers.Qwen2VLForCondition
             generated_ids_trimmed, skip_special_tokens=True, clean_up_tokenization_spaces=False
         )
 
-    return output_texts[0]
+    if structured:
+        output_texts = [close_list(text) for text in output_texts]
+    return output_texts
+
+def _answer_token_ids(tokenizer, answers):
+    """First token ids of the spellings of an answer."""
+    return sorted({tokenizer.encode(answer, add_special_tokens=False)[0] for answer in answers})
+
+def preprocess_noun_questions(crops_and_nouns: list[tuple[np.ndarray, list[str]]],
+                              processor: transformers.AutoProcessor) -> transformers.BatchEncoding:
+    """One yes/no question per (crop, noun) pair, all in one padded batch."""
+    questions = [(crop, NOUN_QUESTION.format(noun)) for crop, nouns in crops_and_nouns for noun in nouns]
+    return preprocess_batch(
+        [question for _, question in questions],
+        [crop for crop, _ in questions],
+        processor,
+        system_instruction="You are an assistant that answers questions about an image with yes or no."
+    )
+
+def score_nouns(model_inputs, base_model: transformers.Qwen2VLForConditionalGeneration,
+                processor: transformers.AutoProcessor, device: torch.device) -> torch.Tensor:
+    """Probability of "yes" for every question of the batch from a single forward pass, no generation."""
+    base_model.eval()
+    model_inputs = model_inputs.to(device)
+    yes_ids = _answer_token_ids(processor.tokenizer, ["Yes", "yes", " Yes", " yes"])
+    no_ids = _answer_token_ids(processor.tokenizer, ["No", "no", " No", " no"])
+
+    # Only the logits of the last position are needed
+    forward_kwargs = {"logits_to_keep": 1} if "logits_to_keep" in inspect.signature(base_model.forward).parameters else {}
+
+    with torch.no_grad():
+        # Left padding puts the next-token logits of every question at the last position
+        logits = base_model(**model_inputs, **forward_kwargs).logits[:, -1, :].float()
+
+    yes_logits = torch.logsumexp(logits[:, yes_ids], dim=-1)
+    no_logits = torch.logsumexp(logits[:, no_ids], dim=-1)
+    return torch.sigmoid(yes_logits - no_logits).cpu()
@@ -1,8 +1,11 @@
 """services/image_utils.py"""
 import base64
 import io
-from PIL import Image
-import numpy as np
+from services.image_codecs import get_image_codec
+
+def bytes_to_image(image_data, size=(640, 640)):
+    """Decode encoded image bytes to resized NumPy array image (RGB)."""
+    return get_image_codec().decode(image_data, size)
 
 def base64_to_image(base64_str, size=(640, 640)):
     """Decode base64 string to resized NumPy array image (RGB)."""
@@ -10,11 +13,29 @@ def base64_to_image(base64_str, size=(640, 640)):
     if base64_str.startswith("data:image"):
         base64_str = base64_str.split(",", 1)[1]
 
-    image_data = base64.b64decode(base64_str)
-    image = Image.open(io.BytesIO(image_data)).convert("RGB")
+    return bytes_to_image(base64.b64decode(base64_str), size)
 
-    if size:
-        image = image.resize(size, Image.BILINEAR)
+def image_to_png_bytes(image):
+    """Encode a PIL image as PNG bytes."""
+    buffered = io.BytesIO()
+    image.save(buffered, format="PNG")
+    return buffered.getvalue()
 
-    return np.array(image) 
+def image_to_jpeg_bytes(image, quality=75):
+    """Encode a PIL image as JPEG bytes."""
+    buffered = io.BytesIO()
+    image.save(buffered, format="JPEG", quality=quality)
+    return buffered.getvalue()
 
+def multipart_body(parts, boundary):
+    """Builds a multipart body from (content type, extra headers, payload bytes) parts."""
+    chunks = []
+    for content_type, headers, payload in parts:
+        chunks.append(f"--{boundary}\r\nContent-Type: {content_type}\r\n".encode())
+        for name, value in headers.items():
+            chunks.append(f"{name}: {value}\r\n".encode())
+        chunks.append(f"Content-Length: {len(payload)}\r\n\r\n".encode())
+        chunks.append(payload)
+        chunks.append(b"\r\n")
+    chunks.append(f"--{boundary}--\r\n".encode())
+    return b"".join(chunks)
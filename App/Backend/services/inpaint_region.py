@@ -0,0 +1,262 @@
+"""services/inpaint_region.py"""
+
+# Imports
+import os
+import random
+import numpy as np
+import cv2
+
+# Which street polygon of the segmentation is used: "largest", "suitable" or "last"
+STREET_POLYGON_SELECTION = os.environ.get("STREET_POLYGON_SELECTION", "largest")
+# 0 finds the exact inscribed rectangle. Above 0 the search runs at 1 / (2 * tolerance) scale and grows the
+# rectangle at full resolution, several times faster but it can lose a large part of the area on thin or concave polygons.
+REGION_SEARCH_TOLERANCE = int(os.environ.get("REGION_SEARCH_TOLERANCE", 0))
+
+def _rasterize_polygon(width, height, polygon_vertices):
+    """Creates a binary mask of the polygon."""
+    mask = np.zeros((height, width), dtype=np.uint8)
+    # cv2.fillPoly requires a list of polygons
+    cv2.fillPoly(mask, [polygon_vertices], 1) # 1 for pixels within
+    return mask
+
+def _calculate_height_map(polygon_mask):
+    """Calculates the height of the continuous '1's above each pixel."""
+    filled = polygon_mask == 1
+
+    # Number of '1's seen so far in each column
+    running_count = np.cumsum(filled, axis=0, dtype=np.int32)
+
+    # Running count at the last '0' above each pixel, carried downwards
+    reset_count = np.maximum.accumulate(np.where(filled, 0, running_count), axis=0)
+
+    return running_count - reset_count
+
+def _find_largest_inscribed_rectangle(height_map):
+    """
+    Iterates through the rows of the height map and finds the largest rectangle.
+
+    Every row is treated as a histogram. Instead of a stack per row, the left and right
+    extent of the rectangle of height height_map[y, x] is carried over from the row above
+    and narrowed by the nearest empty column in the current row, so each row is a handful
+    of vectorized operations. Ties are resolved like the stack algorithm: first row, then
+    smallest right edge, then tallest rectangle.
+    """
+    height, width = height_map.shape
+    max_area_global = 0
+    # Saves (x_min, y_min, x_max, y_max) of the best rectangle
+    best_bbox = (0, 0, 0, 0)
+
+    columns = np.arange(width, dtype=np.int32)
+    # Left edge (inclusive) and right edge (exclusive) of the rectangle above each column
+    left = np.zeros(width, dtype=np.int32)
+    right = np.full(width, width, dtype=np.int32)
+
+    for y in range(height):
+        heights = height_map[y, :]
+        filled = heights > 0
+
+        # Nearest empty column to the left / right within this row
+        row_left = np.maximum.accumulate(np.where(filled, 0, columns + 1))
+        row_right = np.minimum.accumulate(np.where(filled, width, columns)[::-1])[::-1]
+
+        left = np.where(filled, np.maximum(left, row_left), 0)
+        right = np.where(filled, np.minimum(right, row_right), width)
+
+        areas = heights * (right - left)
+        area = int(areas.max()) if width else 0
+
+        if area > max_area_global:
+            max_area_global = area
+            candidates = np.flatnonzero(areas == area)
+            candidates = candidates[right[candidates] == right[candidates].min()]
+            best = candidates[np.argmax(heights[candidates])]
+
+            # Conversion of the histogram coordinates into image coordinates
+            rect_h = int(heights[best])
+            x_min = int(left[best])
+            x_max = int(right[best]) - 1
+            best_bbox = (x_min, y - rect_h + 1, x_max, y)
+
+    return max_area_global, best_bbox
+
+def _downscale_mask(polygon_mask, factor):
+    """Coarse mask where a cell is only filled if all of its pixels are, so coarse rectangles stay inside the polygon."""
+    height, width = polygon_mask.shape[0] // factor, polygon_mask.shape[1] // factor
+    cells = polygon_mask[:height * factor, :width * factor].reshape(height, factor, width, factor)
+    return cells.min(axis=(1, 3))
+
+def _grow_rectangle(polygon_mask, bbox):
+    """Moves every edge of the rectangle outwards for as long as the added row or column is completely filled."""
+    height, width = polygon_mask.shape
+    integral = cv2.integral(polygon_mask)
+
+    def filled(x_min, y_min, x_max, y_max):
+        total = integral[y_max + 1, x_max + 1] - integral[y_min, x_max + 1] - integral[y_max + 1, x_min] + integral[y_min, x_min]
+        return total == (x_max - x_min + 1) * (y_max - y_min + 1)
+
+    x_min, y_min, x_max, y_max = bbox
+    grown = True
+    while grown:
+        grown = False
+        while y_min > 0 and filled(x_min, y_min - 1, x_max, y_min - 1):
+            y_min, grown = y_min - 1, True
+        while y_max < height - 1 and filled(x_min, y_max + 1, x_max, y_max + 1):
+            y_max, grown = y_max + 1, True
+        while x_min > 0 and filled(x_min - 1, y_min, x_min - 1, y_max):
+            x_min, grown = x_min - 1, True
+        while x_max < width - 1 and filled(x_max + 1, y_min, x_max + 1, y_max):
+            x_max, grown = x_max + 1, True
+    return (x_min, y_min, x_max, y_max)
+
+def _find_inscribed_rectangle_coarse_to_fine(polygon_mask, tolerance):
+    """
+    Approximate search: finds the largest rectangle on the mask downscaled by 2 * tolerance and grows it
+    at full resolution. The result contains the upscaled coarse rectangle but is not bounded against the
+    exact one. Falls back to the exact search when the polygon is too small for the coarse mask.
+    """
+    factor = 2 * tolerance
+    coarse_area, coarse_bbox = _find_largest_inscribed_rectangle(_calculate_height_map(_downscale_mask(polygon_mask, factor)))
+    if coarse_area == 0:
+        return _find_largest_inscribed_rectangle(_calculate_height_map(polygon_mask))
+
+    x_min, y_min, x_max, y_max = coarse_bbox
+    bbox = _grow_rectangle(polygon_mask, (x_min * factor, y_min * factor, (x_max + 1) * factor - 1, (y_max + 1) * factor - 1))
+    return _rectangle_area(bbox), bbox
+
+def get_suitable_inpaint_area(polygon_vertices, image_width, image_height, tolerance=None):
+    """
+    Calculates the largest inscribed rectangle for a polygon that is passed as (N, 2) array
+    of pixel coordinates, exact for tolerance 0 and approximate above (REGION_SEARCH_TOLERANCE by default).
+    """
+    tolerance = REGION_SEARCH_TOLERANCE if tolerance is None else tolerance
+    if polygon_vertices is None or len(polygon_vertices) < 3:
+        print("Fehler: Ungültiges Polygon erhalten.")
+        return None # Ungültiges Polygon
+
+    # Rasterize polygon (creates a mask)
+    try:
+        poly_mask = _rasterize_polygon(image_width, image_height, polygon_vertices)
+    except Exception as e:
+        print(f"Fehler beim Rasterisieren: {e}")
+        return None
+
+    # Coarse search on the downscaled mask with refined edges
+    if tolerance > 0:
+        try:
+            max_area, bbox = _find_inscribed_rectangle_coarse_to_fine(poly_mask, tolerance)
+        except Exception as e:
+            print(f"Fehler beim Finden des Rechtecks: {e}")
+            return None
+    else:
+        # Calculate height map from the mask
+        try:
+            h_map = _calculate_height_map(poly_mask)
+        except Exception as e:
+            print(f"Fehler bei der Höhen-Map-Berechnung: {e}")
+            return None
+
+        # Find the largest BBox in the height map
+        try:
+            max_area, bbox = _find_largest_inscribed_rectangle(h_map)
+        except Exception as e:
+            print(f"Fehler beim Finden des Rechtecks: {e}")
+            return None
+
+    if max_area > 0:
+        x_min, y_min, x_max, y_max = bbox
+        if x_max >= x_min and y_max >= y_min and (x_max - x_min) >= 0 and (y_max - y_min) >= 0:
+            return bbox
+        else:
+            print("Warnung: Gefundenes Rechteck hat ungültige Dimensionen.")
+            return None # Invalid BBox found
+    else:
+        print("Kein eingeschriebenes Rechteck gefunden.")
+        return None # no rectangle found
+
+
+def extract_street_polygons(polygons_results, image_width, image_height):
+    """Collects the street polygons of all YOLO results as int32 (N, 2) pixel arrays inside the image."""
+    polygons = []
+    for result in polygons_results:
+        if result.masks is None:
+            continue
+        for polygon in result.masks.xy:
+            if len(polygon) < 3:
+                continue
+            vertices = np.floor(np.asarray(polygon, dtype=np.float64)).astype(np.int32)
+            # Ensure that points remain in the image
+            np.clip(vertices[:, 0], 0, image_width - 1, out=vertices[:, 0])
+            np.clip(vertices[:, 1], 0, image_height - 1, out=vertices[:, 1])
+            polygons.append(vertices)
+    return polygons
+
+def _rectangle_area(bbox):
+    x_min, y_min, x_max, y_max = bbox
+    return (x_max - x_min + 1) * (y_max - y_min + 1)
+
+def select_street_polygon(polygons, image_width, image_height, selection=None, tolerance=None):
+    """
+    Picks the polygon to inpaint into and its inscribed rectangle, (None, None) if there is none.
+    "largest" takes the polygon with the largest area, "suitable" the one with the largest
+    inscribed rectangle and "last" the last polygon (the behaviour of the string pipeline).
+    """
+    selection = selection or STREET_POLYGON_SELECTION
+    if not polygons:
+        return None, None
+    if selection == "last":
+        return polygons[-1], get_suitable_inpaint_area(polygons[-1], image_width, image_height, tolerance)
+
+    # Largest polygons first, the inscribed rectangle of a polygon is never larger than the polygon
+    areas = [cv2.contourArea(polygon) for polygon in polygons]
+    # Pixels of the rasterized polygon, its area plus at most one pixel along the border
+    pixel_bounds = [area + cv2.arcLength(polygon, True) + 4 for area, polygon in zip(areas, polygons)]
+    order = sorted(range(len(polygons)), key=lambda i: -areas[i])
+    if selection == "largest":
+        return polygons[order[0]], get_suitable_inpaint_area(polygons[order[0]], image_width, image_height, tolerance)
+    if selection != "suitable":
+        raise ValueError(f"Unknown street polygon selection: {selection}")
+
+    best_polygon, best_bbox, best_area = polygons[order[0]], None, 0
+    for i in order:
+        if pixel_bounds[i] <= best_area:
+            continue
+        bbox = get_suitable_inpaint_area(polygons[i], image_width, image_height, tolerance)
+        if bbox is not None and _rectangle_area(bbox) > best_area:
+            best_polygon, best_bbox, best_area = polygons[i], bbox, _rectangle_area(bbox)
+    return best_polygon, best_bbox
+
+def get_suitable_region(polygons_results, street_image, selection=None, tolerance=None):
+    """Finds the inpainting region and its height difference from the YOLO street segmentation of the image."""
+
+    # extract polygons out of yolo output and get biggest bounding box inside the selected one
+    polygons = extract_street_polygons(polygons_results, street_image.width, street_image.height)
+    polygon, suitable_inpaint_region_bbox = select_street_polygon(polygons, street_image.width, street_image.height, selection, tolerance)
+
+    # and compute height difference for better inpaint bbox placement
+    height_diff = get_height_diff(polygon, suitable_inpaint_region_bbox) if suitable_inpaint_region_bbox else None
+
+    return street_image, suitable_inpaint_region_bbox, height_diff
+
+def get_height_diff(polygon_vertices, bbox):
+    """Height difference between the top of the suitable inpaint region and the top of the polygon."""
+    return bbox[1] - int(polygon_vertices[:, 1].min())
+
+def get_random_bbox_within_bbox(bbox, min_width, max_width, min_height, max_height, height_diff, image_size):
+
+    x1, y1, x2, y2 = bbox
+
+    # random center point inside bbox
+    xc = random.uniform(x1+0.2*(x2-x1), x2-0.2*(x2-x1))
+    yc = random.uniform(y1, y2)
+
+    # random with and height
+    width = random.uniform(min_width, max_width)
+    height = random.uniform(min_height, max_height)
+
+    # clip bbox size to image size to prevent a bigger bbox than image
+    new_x1 = int(max(xc - width / 2, 0))
+    new_y1 = int(max(yc - height / 2 - height_diff*1.5, 0))
+    new_x2 = int(min(xc + width / 2, image_size[0]))
+    new_y2 = int(min(yc + height / 2 + height_diff*1.5, image_size[1]))
+
+    return (new_x1, new_y1, new_x2, new_y2)
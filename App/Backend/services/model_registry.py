@@ -0,0 +1,101 @@
+"""services/model_registry.py"""
+
+# Imports
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from services import states
+
+# Models served per deployment profile
+MODEL_PROFILES = {
+    "full": ("generation", "street_detection", "weird_detection", "detection_description"),
+    "detect": ("weird_detection", "detection_description"),
+    "generate": ("generation", "street_detection"),
+}
+
+# Deployment Settings
+MODEL_PROFILE = os.environ.get("MODEL_PROFILE", "full")
+LAZY_MODEL_LOADING = os.environ.get("LAZY_MODEL_LOADING", "0") == "1"
+MODEL_LOAD_WORKERS = int(os.environ.get("MODEL_LOAD_WORKERS", "4"))
+
+class ModelUnavailableError(Exception):
+    """Raised when a request needs a model that this replica does not serve."""
+    def __init__(self, model_name, reason):
+        super().__init__(f"The {model_name} model is not available: {reason}")
+        self.model_name = model_name
+
+class ModelRegistry:
+    """Loads the models of a profile, eagerly in parallel or lazily on first use, and tracks their state."""
+
+    def __init__(self, loaders, profile=MODEL_PROFILE, lazy=LAZY_MODEL_LOADING, clock=time.perf_counter):
+        if profile not in MODEL_PROFILES:
+            raise ValueError(f"Unknown model profile: {profile}")
+        self.loaders = loaders
+        self.profile = profile
+        self.lazy = lazy
+        self.clock = clock
+        self.model_names = MODEL_PROFILES[profile]
+        self.status = {name: {"state": "pending", "load_seconds": None, "error": None} for name in self.model_names}
+        self._locks = {name: threading.Lock() for name in self.model_names}
+
+    def load(self, model_name):
+        """Loads a single model once, other callers wait for the running load."""
+        if model_name not in self.status:
+            raise ModelUnavailableError(model_name, f"not part of the '{self.profile}' profile")
+
+        with self._locks[model_name]:
+            status = self.status[model_name]
+            if status["state"] == "ready":
+                return
+
+            status.update(state="loading", error=None)
+            start = self.clock()
+            try:
+                self.loaders[model_name]()
+            except Exception as e:
+                status.update(state="failed", error=str(e), load_seconds=self.clock() - start)
+                raise
+            status.update(state="ready", load_seconds=self.clock() - start)
+            print(f"Loaded {model_name} in {status['load_seconds']:.1f}s.")
+
+    def load_all(self, max_workers=MODEL_LOAD_WORKERS):
+        """Loads all models of the profile concurrently on a thread pool."""
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="model-loader") as executor:
+            futures = {name: executor.submit(self.load, name) for name in self.model_names}
+        for name, future in futures.items():
+            if future.exception() is not None:
+                print(f"Loading {name} failed: {future.exception()}")
+
+    async def ensure_loaded(self, *model_names):
+        """Makes sure the given models are loaded, loading them off the event loop if needed."""
+        for model_name in model_names:
+            if model_name not in self.status:
+                raise ModelUnavailableError(model_name, f"not part of the '{self.profile}' profile")
+            if self.status[model_name]["state"] != "ready":
+                try:
+                    await asyncio.to_thread(self.load, model_name)
+                except Exception as e:
+                    raise ModelUnavailableError(model_name, str(e)) from e
+
+    def is_ready(self):
+        """Eager replicas are ready once every model loaded, lazy ones as long as nothing failed."""
+        states_of_models = [status["state"] for status in self.status.values()]
+        if self.lazy:
+            return "failed" not in states_of_models
+        return all(state == "ready" for state in states_of_models)
+
+    def report(self):
+        """Load state and load time per model."""
+        return {
+            "profile": self.profile,
+            "lazy": self.lazy,
+            "ready": self.is_ready(),
+            "models": {name: dict(status) for name, status in self.status.items()},
+        }
+
+async def ensure_models_loaded(*model_names):
+    """Loads the given models on first use if a registry is set."""
+    if states.MODEL_REGISTRY is not None:
+        await states.MODEL_REGISTRY.ensure_loaded(*model_names)
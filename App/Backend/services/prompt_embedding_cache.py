@@ -0,0 +1,69 @@
+"""services/prompt_embedding_cache.py"""
+
+# Imports
+import threading
+from collections import OrderedDict
+import torch
+from services import states
+
+# Prompt Embedding Cache Settings
+PROMPT_EMBEDDING_CACHE_SIZE = 64
+
+class PromptEmbeddingCache:
+    """
+    LRU cache of the SDXL text encoder outputs (prompt_embeds, pooled_prompt_embeds) per text, kept on the
+    device of the pipeline. Pinned texts (the constant negative prompt) stay for the whole process.
+    The entries belong to one pipeline and LoRA adapter, a reloaded pipeline starts empty.
+    """
+
+    def __init__(self, max_entries=PROMPT_EMBEDDING_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._pinned = {}
+        self._pipeline = None
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0}
+
+    def _encode(self, pipeline, text):
+        with torch.no_grad():
+            # Encoded on the execution device of the pipeline
+            prompt_embeds, _, pooled_prompt_embeds, _ = pipeline.encode_prompt(text, num_images_per_prompt=1, do_classifier_free_guidance=False)
+        return prompt_embeds, pooled_prompt_embeds
+
+    def get(self, pipeline, text, adapter=None, pinned=False):
+        """Returns (prompt_embeds, pooled_prompt_embeds) of the text with a batch size of one, encodes it on a miss."""
+        key = (text, adapter)
+        with self._lock:
+            if pipeline is not self._pipeline:
+                self._entries.clear()
+                self._pinned.clear()
+                self._pipeline = pipeline
+            if key in self._pinned:
+                self.counters["hits"] += 1
+                return self._pinned[key]
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.counters["hits"] += 1
+                return self._entries[key]
+
+            self.counters["misses"] += 1
+            embeddings = self._encode(pipeline, text)
+            if pinned:
+                self._pinned[key] = embeddings
+            else:
+                self._entries[key] = embeddings
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            return embeddings
+
+    def stats(self):
+        """Hit and miss counters with the hit rate."""
+        with self._lock:
+            lookups = self.counters["hits"] + self.counters["misses"]
+            return dict(self.counters, entries=len(self._entries), pinned=len(self._pinned), hit_rate=self.counters["hits"] / lookups if lookups else 0.0)
+
+def get_prompt_embedding_cache():
+    """Returns the shared prompt embedding cache, creating it if not already set."""
+    if states.PROMPT_EMBEDDING_CACHE is None:
+        states.PROMPT_EMBEDDING_CACHE = PromptEmbeddingCache()
+    return states.PROMPT_EMBEDDING_CACHE
@@ -1,14 +1,22 @@
 """services/prompt_summary.py"""
 
 # Imports
+from functools import lru_cache
 import spacy
 from word2number import w2n
 
-nlp = spacy.load("en_core_web_sm")
+# Only the components needed for POS tags, lemmas and the dependency tree
+nlp = spacy.load("en_core_web_sm", exclude=["ner"])
 
-def extract_nouns_with_counts(user_prompt: str) -> list:
-    """Extracts the nouns from the user prompt"""
-    doc = nlp(user_prompt)
+# Number of distinct prompts kept in the noun cache
+PROMPT_CACHE_SIZE = 4096
+
+def normalize_prompt(user_prompt: str) -> str:
+    """Normalizes the whitespace of a prompt so that trivial variations share a cache entry."""
+    return " ".join(user_prompt.split())
+
+def _nouns_from_doc(doc) -> list:
+    """Extracts the nouns with their counts from a parsed prompt"""
     results = []
 
     # Parsing through the document
@@ -30,3 +38,28 @@ def extract_nouns_with_counts(user_prompt: str) -> list:
             results.extend([token.lemma_] * count)
 
     return results
+
+@lru_cache(maxsize=PROMPT_CACHE_SIZE)
+def _extract_nouns_cached(normalized_prompt: str) -> tuple:
+    return tuple(_nouns_from_doc(nlp(normalized_prompt)))
+
+def extract_nouns_with_counts(user_prompt: str) -> list:
+    """Extracts the nouns from the user prompt"""
+    return list(_extract_nouns_cached(normalize_prompt(user_prompt)))
+
+def extract_nouns_with_counts_batch(user_prompts: list[str], batch_size: int = 256, n_process: int = 1) -> list[list]:
+    """Extracts the nouns from many prompts at once using nlp.pipe (e.g. for offline dataset prompts)."""
+    normalized_prompts = [normalize_prompt(user_prompt) for user_prompt in user_prompts]
+    unique_prompts = list(dict.fromkeys(normalized_prompts))
+
+    nouns_per_prompt = {
+        prompt: _nouns_from_doc(doc)
+        for prompt, doc in zip(unique_prompts, nlp.pipe(unique_prompts, batch_size=batch_size, n_process=n_process))
+    }
+
+    return [list(nouns_per_prompt[prompt]) for prompt in normalized_prompts]
+
+def prompt_cache_stats() -> dict:
+    """Hit and miss counters of the noun cache."""
+    info = _extract_nouns_cached.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "size": info.currsize, "max_size": info.maxsize}
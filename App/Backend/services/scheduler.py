@@ -0,0 +1,118 @@
+"""services/scheduler.py"""
+
+# Imports
+import asyncio
+import functools
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from services import states
+
+# Request Priorities (lower runs first)
+DETECT_PRIORITY = 0
+GENERATE_PRIORITY = 1
+# Pre-generation for the generation pool, only runs when nothing else waits
+BACKGROUND_PRIORITY = 2
+
+# Maximum number of waiting jobs per model before requests are rejected
+MODEL_QUEUE_SIZES = {
+    "weird_detection": 32,
+    "detection_description": 32,
+    "street_detection": 8,
+    "generation": 4,
+}
+DEFAULT_QUEUE_SIZE = 8
+
+class SchedulerBusyError(Exception):
+    """Raised when the queue of a model is full."""
+    def __init__(self, model_name):
+        super().__init__(f"The {model_name} queue is full, please try again later.")
+        self.model_name = model_name
+
+class ModelWorker:
+    """Runs the jobs of a single model one at a time on its own executor thread."""
+
+    def __init__(self, model_name, max_queue_size):
+        self.model_name = model_name
+        self.max_queue_size = max_queue_size
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"{model_name}-worker")
+        self._sequence = itertools.count()
+        self._queue = None
+        self._task = None
+
+    def _ensure_started(self):
+        if self._task is None or self._task.done():
+            self._queue = asyncio.PriorityQueue(maxsize=self.max_queue_size)
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, function, *args, priority=GENERATE_PRIORITY, **kwargs):
+        """Queues a call of the function and waits for its result."""
+        self._ensure_started()
+        if self._queue.full():
+            raise SchedulerBusyError(self.model_name)
+
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((priority, next(self._sequence), functools.partial(function, *args, **kwargs), future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            _, _, job, future = await self._queue.get()
+            try:
+                # Skip jobs whose request was already cancelled
+                if future.cancelled():
+                    continue
+                try:
+                    result = await loop.run_in_executor(self._executor, job)
+                except Exception as e:
+                    if not future.done():
+                        future.set_exception(e)
+                else:
+                    if not future.done():
+                        future.set_result(result)
+            finally:
+                self._queue.task_done()
+
+    def queue_depth(self):
+        """Number of jobs waiting for this model."""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def shutdown(self):
+        """Stops the worker task and its executor."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+class ModelScheduler:
+    """One worker with a bounded priority queue per model."""
+
+    def __init__(self, queue_sizes=None):
+        self.queue_sizes = dict(MODEL_QUEUE_SIZES, **(queue_sizes or {}))
+        self.workers = {}
+
+    def worker(self, model_name):
+        """Returns the worker of a model, creating it on first use."""
+        if model_name not in self.workers:
+            self.workers[model_name] = ModelWorker(model_name, self.queue_sizes.get(model_name, DEFAULT_QUEUE_SIZE))
+        return self.workers[model_name]
+
+    async def run(self, model_name, function, *args, priority=GENERATE_PRIORITY, **kwargs):
+        """Runs the function on the worker of the given model."""
+        return await self.worker(model_name).submit(function, *args, priority=priority, **kwargs)
+
+    def stats(self):
+        """Queue depth per model."""
+        return {name: worker.queue_depth() for name, worker in self.workers.items()}
+
+    def shutdown(self):
+        """Stops all workers."""
+        for worker in self.workers.values():
+            worker.shutdown()
+        self.workers = {}
+
+def get_model_scheduler():
+    """Returns the shared scheduler, creating it if not already set."""
+    if states.MODEL_SCHEDULER is None:
+        states.MODEL_SCHEDULER = ModelScheduler()
+    return states.MODEL_SCHEDULER
@@ -0,0 +1,126 @@
+"""services/sessions.py"""
+
+# Imports
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from services import states
+
+# Session Settings
+SESSION_BACKEND = os.environ.get("SESSION_BACKEND", "memory")  # "memory" or "sqlite"
+SESSION_DB_PATH = os.environ.get("SESSION_DB_PATH", "sessions.sqlite3")
+MAX_SESSIONS = 10000
+SESSION_TTL_SECONDS = 60 * 60
+
+def _new_token():
+    return secrets.token_urlsafe(16)
+
+class SessionStore:
+    """In-memory LRU store with TTL mapping a round token to the prompt summary of that round."""
+
+    def __init__(self, max_sessions=MAX_SESSIONS, ttl_seconds=SESSION_TTL_SECONDS, clock=time.monotonic):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, prompt_summary):
+        """Stores the prompt summary and returns the token of the new session."""
+        token = _new_token()
+        with self._lock:
+            self._sessions[token] = (self.clock(), list(prompt_summary))
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        return token
+
+    def get(self, token):
+        """Returns the prompt summary of the session, None if unknown or expired."""
+        with self._lock:
+            session = self._sessions.get(token)
+            if session is None:
+                return None
+            created, prompt_summary = session
+            if self.clock() - created > self.ttl_seconds:
+                del self._sessions[token]
+                return None
+            self._sessions.move_to_end(token)
+            return list(prompt_summary)
+
+    def __len__(self):
+        return len(self._sessions)
+
+class SQLiteSessionStore:
+    """SQLite backed session store, shared between workers and kept across restarts."""
+
+    def __init__(self, path=SESSION_DB_PATH, max_sessions=MAX_SESSIONS, ttl_seconds=SESSION_TTL_SECONDS, clock=time.time):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "token TEXT PRIMARY KEY, prompt_summary TEXT NOT NULL, created REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS sessions_last_used ON sessions (last_used)")
+        self._connection.commit()
+
+    def create(self, prompt_summary):
+        """Stores the prompt summary and returns the token of the new session."""
+        token = _new_token()
+        now = self.clock()
+        with self._lock:
+            self._connection.execute(
+                "INSERT INTO sessions VALUES (?, ?, ?, ?)", (token, json.dumps(list(prompt_summary)), now, now)
+            )
+            self._connection.execute("DELETE FROM sessions WHERE created < ?", (now - self.ttl_seconds,))
+            self._connection.execute(
+                "DELETE FROM sessions WHERE token IN ("
+                "SELECT token FROM sessions ORDER BY last_used DESC LIMIT -1 OFFSET ?)", (self.max_sessions,)
+            )
+            self._connection.commit()
+        return token
+
+    def get(self, token):
+        """Returns the prompt summary of the session, None if unknown or expired."""
+        now = self.clock()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT prompt_summary, created FROM sessions WHERE token = ?", (token,)
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl_seconds:
+                self._connection.execute("DELETE FROM sessions WHERE token = ?", (token,))
+                self._connection.commit()
+                return None
+            self._connection.execute("UPDATE sessions SET last_used = ? WHERE token = ?", (now, token))
+            self._connection.commit()
+        return json.loads(row[0])
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def close(self):
+        """Closes the database connection."""
+        self._connection.close()
+
+def create_session_store(backend=SESSION_BACKEND):
+    """Creates the configured session store."""
+    if backend == "sqlite":
+        return SQLiteSessionStore()
+    if backend == "memory":
+        return SessionStore()
+    raise ValueError(f"Unknown session backend: {backend}")
+
+def get_session_store():
+    """Returns the shared session store, creating it if not already set."""
+    if states.SESSION_STORE is None:
+        states.SESSION_STORE = create_session_store()
+    return states.SESSION_STORE
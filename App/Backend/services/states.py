@@ -9,11 +9,35 @@ STREET_DETECTION_MODEL = None
 DETECTION_DESCRIPTION_MODEL = None
 DETECTION_DESCRIPTION_PROCESSOR = None
 
-# Model Process Lock
-BACKEND_LOCK = None
+# Model Load States
+MODEL_REGISTRY = None
+
+# Precomputed Street Regions
+STREET_REGION_INDEX = None
+
+# Per-Model Request Scheduler
+MODEL_SCHEDULER = None
+
+# Micro-Batchers in front of the detection models
+DETECTION_BATCHERS = None
 
 # Device
 DEVICE = None
 
-# Scoring Related Variable
-USER_PROMPT_SUMMARY = None
+# Prompt Summaries per Round
+SESSION_STORE = None
+
+# Image Decoder/Encoder
+IMAGE_CODEC = None
+
+# Background Writer for Images without Detections
+FAILED_IMAGE_SINK = None
+
+# VLM Descriptions of previously seen Crops
+DESCRIPTION_CACHE = None
+
+# Pre-generated Inpainting Rounds (None disables the pool)
+GENERATION_POOL = None
+
+# SDXL Text Encoder Outputs per Prompt
+PROMPT_EMBEDDING_CACHE = None
@@ -0,0 +1,119 @@
+"""services/street_index.py"""
+# Offline index of the street image pool used by /generate.
+# Build it once with (from App/Backend):
+#   python -m services.street_index --images <street image folder> --model models/streetseg_256_auto.pt
+
+# Imports
+import argparse
+import os
+import random
+from typing import NamedTuple
+import numpy as np
+from PIL import Image
+
+from services.inpaint_region import extract_street_polygons, select_street_polygon, get_height_diff
+
+STREET_IMAGE_FOLDER = "/home/ai-team2/Weird-Stuff-In-Traffic/Data/yolo/nuScenes/images/train"
+DEFAULT_INDEX_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "models", "street_region_index")
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg")
+
+class StreetRegion(NamedTuple):
+    """Precomputed inpainting region of a single street image."""
+    image_path: str
+    bbox: tuple
+    height_diff: int
+    polygon: np.ndarray
+
+class StreetRegionIndex:
+    """Memory-mapped table of street images with their suitable inpainting region."""
+
+    def __init__(self, index_path):
+        self.image_paths = np.load(os.path.join(index_path, "image_paths.npy"), mmap_mode="r")
+        self.bboxes = np.load(os.path.join(index_path, "bboxes.npy"), mmap_mode="r")
+        self.height_diffs = np.load(os.path.join(index_path, "height_diffs.npy"), mmap_mode="r")
+        self.polygon_offsets = np.load(os.path.join(index_path, "polygon_offsets.npy"), mmap_mode="r")
+        self.polygon_vertices = np.load(os.path.join(index_path, "polygon_vertices.npy"), mmap_mode="r")
+
+    def __len__(self):
+        return len(self.image_paths)
+
+    def __getitem__(self, i):
+        start, end = self.polygon_offsets[i], self.polygon_offsets[i + 1]
+        return StreetRegion(
+            image_path=str(self.image_paths[i]),
+            bbox=tuple(int(v) for v in self.bboxes[i]),
+            height_diff=int(self.height_diffs[i]),
+            polygon=np.asarray(self.polygon_vertices[start:end])
+        )
+
+    def sample(self):
+        """Returns a random street region."""
+        return self[random.randrange(len(self))]
+
+def load_street_region_index(index_path=DEFAULT_INDEX_PATH):
+    """Loads the street region index, returns None if it was not built yet."""
+    if not os.path.isfile(os.path.join(index_path, "image_paths.npy")):
+        print(f"No street region index found at {index_path}.")
+        return None
+    index = StreetRegionIndex(index_path)
+    if len(index) == 0:
+        return None
+    print(f"Loaded street region index with {len(index)} images.")
+    return index
+
+def list_street_images(image_folder=STREET_IMAGE_FOLDER):
+    """Lists all street images in the given folder."""
+    return sorted(
+        os.path.join(image_folder, f)
+        for f in os.listdir(image_folder)
+        if f.lower().endswith(IMAGE_EXTENSIONS)
+    )
+
+def build_street_region_index(street_detection_model, image_folder=STREET_IMAGE_FOLDER, index_path=DEFAULT_INDEX_PATH):
+    """Runs the street segmentation once per image and stores the suitable regions."""
+    image_paths, bboxes, height_diffs, selected_polygons = [], [], [], []
+
+    for image_path in list_street_images(image_folder):
+        street_image = Image.open(image_path).convert("RGB")
+        polygons_results = street_detection_model.predict(
+            source=street_image,
+            task='segment',
+            verbose=False,
+            conf=0.25
+        )
+
+        polygons = extract_street_polygons(polygons_results, street_image.width, street_image.height)
+        polygon, bbox = select_street_polygon(polygons, street_image.width, street_image.height)
+        if bbox is None:
+            print(f"Skipping {image_path}: no suitable region.")
+            continue
+
+        image_paths.append(image_path)
+        bboxes.append(bbox)
+        height_diffs.append(get_height_diff(polygon, bbox))
+        selected_polygons.append(polygon)
+
+    polygon_offsets = np.cumsum([0] + [len(p) for p in selected_polygons], dtype=np.int64)
+    polygon_vertices = np.concatenate(selected_polygons) if selected_polygons else np.zeros((0, 2), dtype=np.int32)
+
+    os.makedirs(index_path, exist_ok=True)
+    np.save(os.path.join(index_path, "image_paths.npy"), np.array(image_paths, dtype=str))
+    np.save(os.path.join(index_path, "bboxes.npy"), np.array(bboxes, dtype=np.int32).reshape(-1, 4))
+    np.save(os.path.join(index_path, "height_diffs.npy"), np.array(height_diffs, dtype=np.int32))
+    np.save(os.path.join(index_path, "polygon_offsets.npy"), polygon_offsets)
+    np.save(os.path.join(index_path, "polygon_vertices.npy"), polygon_vertices.astype(np.int32))
+
+    print(f"Indexed {len(image_paths)} street images into {index_path}.")
+    return len(image_paths)
+
+# Main Running Area
+if __name__ == "__main__":
+    from ultralytics import YOLO
+
+    parser = argparse.ArgumentParser(description="Builds the street region index for /generate.")
+    parser.add_argument("--images", default=STREET_IMAGE_FOLDER, help="Folder with the street images.")
+    parser.add_argument("--model", required=True, help="Path to the YOLO street segmentation weights.")
+    parser.add_argument("--output", default=DEFAULT_INDEX_PATH, help="Folder to write the index to.")
+    args = parser.parse_args()
+
+    build_street_region_index(YOLO(args.model), image_folder=args.images, index_path=args.output)
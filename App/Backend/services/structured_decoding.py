@@ -0,0 +1,152 @@
+"""services/structured_decoding.py"""
+
+# Imports
+import numpy as np
+import torch
+from transformers import LogitsProcessor, LogitsProcessorList, StoppingCriteria, StoppingCriteriaList
+
+# States of the character automaton for a Python list of single-quoted strings, e.g. ['car', 'traffic cone']
+START, OPEN, IN_STRING, AFTER_STRING, AFTER_COMMA, DONE = range(6)
+NUM_STATES = 6
+DEAD = -1
+WHITESPACE = " \t\n"
+# Characters that can end or leave a string, tokens without them stay inside a string
+STRUCTURAL_CHARACTERS = set("[]',\\\n")
+
+def _next_state(state, character):
+    """One step of the list-of-strings automaton, DEAD if the character is not allowed."""
+    if state == IN_STRING:
+        if character == "'":
+            return AFTER_STRING
+        return DEAD if character in "\\\n" else IN_STRING
+    if state == START:
+        if character == "[":
+            return OPEN
+        return START if character in WHITESPACE else DEAD
+    if state == OPEN:
+        if character == "'":
+            return IN_STRING
+        if character == "]":
+            return DONE
+        return OPEN if character in WHITESPACE else DEAD
+    if state == AFTER_STRING:
+        if character == ",":
+            return AFTER_COMMA
+        if character == "]":
+            return DONE
+        return AFTER_STRING if character in WHITESPACE else DEAD
+    if state == AFTER_COMMA:
+        if character == "'":
+            return IN_STRING
+        return AFTER_COMMA if character in WHITESPACE else DEAD
+    return DEAD
+
+def _consume(state, text):
+    for character in text:
+        state = _next_state(state, character)
+        if state == DEAD:
+            return DEAD
+    return state
+
+def close_list(text):
+    """Closes a list cut off by max_new_tokens, an unfinished string or a trailing comma is dropped."""
+    state, closable = START, None
+    for index, character in enumerate(text):
+        state = _next_state(state, character)
+        if state == DEAD:
+            return text
+        if state in (OPEN, AFTER_STRING):
+            closable = index + 1
+    if state == DONE:
+        return text
+    return "[]" if closable is None else text[:closable] + "]"
+
+def build_transition_table(token_strings, special_token_ids=()):
+    """
+    Precomputes the automaton state after every token from every state as (NUM_STATES, vocab size) table.
+    Special tokens and empty tokens are never allowed by the grammar.
+    """
+    table = np.full((NUM_STATES, len(token_strings)), DEAD, dtype=np.int8)
+    special_token_ids = set(special_token_ids)
+    for token_id, text in enumerate(token_strings):
+        if not text or token_id in special_token_ids:
+            continue
+        if STRUCTURAL_CHARACTERS.isdisjoint(text):
+            # Most tokens are plain text, they only fit inside a string (or are whitespace)
+            table[IN_STRING, token_id] = IN_STRING
+            if text.isspace():
+                for state in (START, OPEN, AFTER_STRING, AFTER_COMMA):
+                    table[state, token_id] = state
+            continue
+        for state in range(NUM_STATES):
+            table[state, token_id] = _consume(state, text)
+    return table
+
+_TABLES = {}
+
+def get_transition_table(tokenizer):
+    """Transition table of a tokenizer, built once per tokenizer."""
+    key = (tokenizer.name_or_path, len(tokenizer))
+    if key not in _TABLES:
+        token_strings = tokenizer.batch_decode([[token_id] for token_id in range(len(tokenizer))], clean_up_tokenization_spaces=False)
+        _TABLES[key] = build_transition_table(token_strings, tokenizer.all_special_ids)
+    return _TABLES[key]
+
+class ListGrammarTracker:
+    """Follows the automaton state of every sequence of a generation batch."""
+
+    def __init__(self, table, prompt_length, eos_token_ids):
+        self.table = torch.as_tensor(table, dtype=torch.long)
+        self.prompt_length = prompt_length
+        self.eos_token_ids = list(eos_token_ids)
+        self.states = None
+        self._seen = prompt_length
+
+    def advance(self, input_ids):
+        """Consumes the tokens generated since the last call, returns the state per sequence."""
+        if self.table.device != input_ids.device:
+            self.table = self.table.to(input_ids.device)
+        if self.states is None:
+            self.states = torch.full((input_ids.shape[0],), START, dtype=torch.long, device=input_ids.device)
+        for position in range(self._seen, input_ids.shape[1]):
+            tokens = input_ids[:, position]
+            finished = self.states == DONE
+            next_states = self.table[self.states.clamp(min=0), tokens.clamp(max=self.table.shape[1] - 1)]
+            # Finished sequences are padded with EOS by generate and stay done
+            self.states = torch.where(finished, self.states, next_states)
+        self._seen = input_ids.shape[1]
+        return self.states
+
+class ListOfStringsLogitsProcessor(LogitsProcessor):
+    """Masks every token that would leave the list-of-strings grammar, only EOS is allowed once the list is closed."""
+
+    def __init__(self, tracker):
+        self.tracker = tracker
+
+    def __call__(self, input_ids, scores):
+        states = self.tracker.advance(input_ids)
+        table = self.tracker.table
+        allowed = torch.zeros_like(scores, dtype=torch.bool)
+        vocab_size = min(table.shape[1], scores.shape[1])
+        allowed[:, :vocab_size] = table[states.clamp(min=0), :vocab_size] != DEAD
+        for eos_token_id in self.tracker.eos_token_ids:
+            allowed[:, eos_token_id] = states == DONE
+        return scores.masked_fill(~allowed, float("-inf"))
+
+class ListClosedStoppingCriteria(StoppingCriteria):
+    """Stops a sequence as soon as its list is closed, without waiting for the EOS token."""
+
+    def __init__(self, tracker):
+        self.tracker = tracker
+
+    def __call__(self, input_ids, scores, **kwargs):
+        return self.tracker.advance(input_ids) == DONE
+
+def constrained_generation_kwargs(tokenizer, prompt_length):
+    """Extra generate() arguments that restrict the output to a list of strings."""
+    eos_token_ids = [token_id for token_id in {tokenizer.eos_token_id, tokenizer.pad_token_id} if token_id is not None]
+    tracker = ListGrammarTracker(get_transition_table(tokenizer), prompt_length, eos_token_ids)
+    return {
+        "logits_processor": LogitsProcessorList([ListOfStringsLogitsProcessor(tracker)]),
+        "stopping_criteria": StoppingCriteriaList([ListClosedStoppingCriteria(tracker)]),
+    }
@@ -0,0 +1,25 @@
+"""tests/conftest.py"""
+
+# Imports
+import sys
+import os
+import pytest
+
+# Add the parent directory (App/Backend) to sys.path to make `services` importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+#pylint: disable=wrong-import-position
+from services import states
+
+@pytest.fixture(name="pipeline")
+def fixture_pipeline(monkeypatch):
+    """Installs the dummy pipeline as generation model"""
+    # Imported here so that the tests without torch still collect
+    torch = pytest.importorskip("torch")
+    from tests.inpainting_stubs import DummyInpaintPipeline  #pylint: disable=import-outside-toplevel
+
+    torch.manual_seed(0)
+    pipeline = DummyInpaintPipeline()
+    monkeypatch.setattr(states, "GENERATION_MODEL", pipeline)
+    monkeypatch.setattr(states, "DEVICE", torch.device("cpu"))
+    return pipeline
@@ -0,0 +1,55 @@
+"""tests/inpainting_stubs.py"""
+# CPU stand-ins for the SDXL inpainting pipeline, shared by the inpainting and generation tests.
+
+# Imports
+import numpy as np
+import torch
+from PIL import Image
+
+def as_mask_array(mask):
+    """Utility Function for reading PIL masks and float mask arrays alike"""
+    return mask if isinstance(mask, np.ndarray) else np.asarray(mask, dtype=np.float32) / 255.0
+
+class DummyInpaintPipeline:
+    """CPU stand-in for the SDXL inpainting pipeline with a tiny convolution as UNet."""
+
+    def __init__(self):
+        self.unet = torch.nn.Conv2d(3, 3, kernel_size=1)
+        self.calls = []
+        self.encoded_prompts = []
+        self.mask_history = []
+
+    def encode_prompt(self, prompt, num_images_per_prompt=1, do_classifier_free_guidance=True, **_):
+        """Text encoders stand-in, the embeddings only depend on the prompt"""
+        self.encoded_prompts.append(prompt)
+        assert num_images_per_prompt == 1 and not do_classifier_free_guidance
+        generator = torch.Generator().manual_seed(sum(map(ord, prompt)))
+        return torch.randn(1, 77, 8, generator=generator), None, torch.randn(1, 8, generator=generator), None
+
+    def __call__(self, prompt_embeds, pooled_prompt_embeds, negative_prompt_embeds, negative_pooled_prompt_embeds,
+                 image, mask_image, strength, generator, num_inference_steps, callback_on_step_end=None,
+                 callback_on_step_end_tensor_inputs=(), **_):
+        self.mask_history = []
+        if callback_on_step_end is not None:
+            # Latent mask of the batch, doubled for classifier free guidance like in the pipeline
+            mask = torch.ones(2 * len(image), 1, 4, 8)
+            for step in range(min(int(num_inference_steps * strength), num_inference_steps)):
+                tensors = {"latents": torch.zeros(len(image), 4, 4, 8), "mask": mask}
+                outputs = callback_on_step_end(self, step, 0, {name: tensors[name] for name in callback_on_step_end_tensor_inputs})
+                mask = outputs.get("mask", mask)
+                assert torch.equal(mask[:len(image)], mask[len(image):])
+                self.mask_history.append(mask[:len(image), 0, 0, 0].tolist())
+        self.calls.append({"batch_size": len(image), "strength": strength, "prompt_embeds": prompt_embeds, "masks": mask_image})
+        assert len(prompt_embeds) == len(pooled_prompt_embeds) == len(image) == len(mask_image) == len(generator)
+        assert len(negative_prompt_embeds) == len(negative_pooled_prompt_embeds) == len(image)
+
+        images = []
+        with torch.no_grad():
+            for street_image, mask, variant_generator in zip(image, mask_image, generator):
+                pixels = torch.from_numpy(np.asarray(street_image, dtype=np.float32) / 255.0).permute(2, 0, 1)
+                noise = torch.rand(pixels.shape, generator=variant_generator)
+                weight = torch.from_numpy(as_mask_array(mask).astype(np.float32)) * strength
+                denoised = self.unet(pixels + weight * noise)
+                images.append(Image.fromarray((denoised.clamp(0, 1).permute(1, 2, 0).numpy() * 255).astype(np.uint8)))
+
+        return type("Output", (), {"images": images})
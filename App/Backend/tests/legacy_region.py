@@ -0,0 +1,157 @@
+"""tests/legacy_region.py"""
+# Loop based implementation of the inscribed rectangle search and the polygon string round trip
+# of the region selection, kept as a reference for the equivalence tests and the region benchmark.
+
+# Imports
+import numpy as np
+
+def _calculate_height_map(polygon_mask):
+    """Calculates the height of the continuous '1's above each pixel."""
+    height, width = polygon_mask.shape
+    height_map = np.zeros((height, width), dtype=np.int32)
+
+    for x in range(width):
+        # Treat first line directly
+        if polygon_mask[0, x] == 1:
+            height_map[0, x] = 1
+
+        # Remaining lines
+        for y in range(1, height):
+            if polygon_mask[y, x] == 1:
+                height_map[y, x] = height_map[y - 1, x] + 1
+            # else: height_map[y, x] # remains 0 (default value)
+
+    return height_map
+
+def _largest_rectangle_in_histogram(heights):
+    """Finds the largest rectangle in a histogram (O(N) algorithm with stack)."""
+    stack = [] # Stack stores indices of the bars
+    max_area = 0
+    # (height, left index in the original histogram, width)
+    max_rect_details = (0, 0, 0)
+
+    # Add virtual bars at the beginning/end to handle edge cases
+    extended_heights = np.concatenate(([0], heights, [0]))
+
+    for i, h in enumerate(extended_heights):
+        while stack and extended_heights[stack[-1]] > h:
+            height = extended_heights[stack.pop()]
+
+            width = i - stack[-1] - 1 if stack else i
+            if width <= 0: 
+                continue
+
+            area = height * width
+            if area > max_area:
+                max_area = area
+               
+                original_left_idx = stack[-1] if stack else 0
+                max_rect_details = (height, original_left_idx, width)
+
+        if not stack or h > extended_heights[stack[-1]]:
+            stack.append(i)
+        elif stack and h == extended_heights[stack[-1]]:
+            stack[-1] = i
+
+    return max_area, max_rect_details
+
+
+def _find_largest_inscribed_rectangle(height_map):
+    """Iterates through the rows of the height map and finds the largest rectangle."""
+    height, width = height_map.shape
+    max_area_global = 0
+    # Saves (x_min, y_min, x_max, y_max) of the best rectangle
+    best_bbox = (0, 0, 0, 0)
+
+
+    for y in range(height):
+        # Histogram for the current line y (represents possible rectangle heights that end at y)
+        histogram = height_map[y, :]
+        # area: Area of the largest rectangle in the histogram of this line
+        # rect_h: Height of this rectangle (corresponds to the value in the histogram)
+        # rect_left_idx: Left column (x-coordinate) of the rectangle in the histogram
+        # rect_w: Width of this rectangle
+        area, (rect_h, rect_left_idx, rect_w) = _largest_rectangle_in_histogram(histogram)
+
+        if area > max_area_global:
+            max_area_global = area
+            # Conversion of the histogram coordinates into image coordinates
+            x_min = rect_left_idx
+            x_max = rect_left_idx + rect_w - 1
+            y_max = y
+            y_min = y - rect_h + 1
+
+            # Validity check (within image boundaries and positive dimension)
+            if x_min >= 0 and y_min >= 0 and x_max < width and y_max < height and rect_w > 0 and rect_h > 0:
+                best_bbox = (x_min, y_min, x_max, y_max)
+            else:
+                max_area_global = 0
+                best_bbox = (0, 0, 0, 0)
+
+    return max_area_global, best_bbox
+
+
+def _parse_polygon_string(polygon_data_string, image_width, image_height):
+    '''
+    Parses the polygon coordinates from a string, converts them and returns them
+    them as a NumPy array.
+    '''
+    try:
+        if not polygon_data_string:
+            # print("Error: Empty polygon data string received")
+            return None
+
+        parts = polygon_data_string.strip().split()
+        if len(parts) < 7:
+            # print(f"Error: Invalid format in the string. Too few coordinates.")
+            return None
+
+        # Ignore the first number (class ID) and take the rest
+        coords_normalized = [float(p) for p in parts[:]]
+
+        if len(coords_normalized) % 2 != 0:
+            # print(f"Error: Odd number of coordinates in the string")
+            return None
+
+        vertices = []
+        for i in range(0, len(coords_normalized), 2):
+            nx = coords_normalized[i]
+            ny = coords_normalized[i+1]
+            # Convert normalized coordinates to pixel coordinates
+            x = int(nx * image_width)
+            y = int(ny * image_height)
+            # Ensure that points remain in the image
+            x = max(0, min(image_width - 1, x))
+            y = max(0, min(image_height - 1, y))
+            vertices.append([x, y])
+
+        return np.array(vertices, dtype=np.int32)
+
+    except ValueError:
+        # print(f"Error: The polygon string contains invalid numbers")
+        return None
+    except Exception as e:
+        print(f"An unexpected error occurred while parsing the string: {e}")
+        return None
+
+def extract_street_polygon(polygons_results, street_image):
+    """Turns the YOLO street segmentation output into a normalized polygon string (keeps the last polygon)."""
+    final_polygon = None
+    for result in polygons_results:
+        if result.masks is None:
+            continue
+        for polygon in result.masks.xy:
+            scaled_polygon = []
+            for point in polygon:
+                normalized_point = (point[0] / street_image.width, point[1] / street_image.height)
+                scaled_polygon.append(f"{normalized_point[0]} {normalized_point[1]}")
+            final_polygon = " ".join(scaled_polygon)
+    return final_polygon
+
+def get_height_diff(polygon, bbox, image_height):
+    """Height difference between the region and the top of the polygon string."""
+    coords = list(map(float, polygon.strip().split()))
+    y_coords = coords[1::2]
+    min_y_normalized = min(y_coords)
+    min_y = int(min_y_normalized * image_height)
+    return bbox[1] - min_y
@@ -0,0 +1,51 @@
+"""tests/test_annotation.py"""
+
+# Imports
+import sys
+import os
+import numpy as np
+
+# Add the parent directory (App/Backend) to sys.path to make `services` importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+#pylint: disable=wrong-import-position
+from services.annotation import draw_instances, create_text_labels, BOX_COLORS
+
+def test_labels_match_visualizer_format():
+    """Testing the score labels with the single unnamed class of the detector"""
+    assert create_text_labels([0, 0], [0.954, 0.8], [""]) == [" 95%", " 80%"]
+    assert create_text_labels(None, [0.5]) == [" 50%"]
+
+def test_boxes_are_drawn_in_place():
+    """Testing that only the box outline and its label change"""
+    image = np.full((640, 640, 3), 100, dtype=np.uint8)
+    result = draw_instances(image, [[100, 200, 400, 500]], [0.97], [0], [""])
+
+    assert result is image
+    # Box edge is blended half way towards the first colour
+    expected = (100 * 0.5 + np.array(BOX_COLORS[0]) * 255 * 0.5).astype(np.uint8)
+    np.testing.assert_array_equal(image[350, 100], expected)
+    # Inside and outside of the box stay untouched
+    np.testing.assert_array_equal(image[350, 250], [100, 100, 100])
+    np.testing.assert_array_equal(image[50, 50], [100, 100, 100])
+    # Label background darkens the top left corner inside the box
+    assert image[205, 110].max() < 100
+
+def test_small_box_label_goes_below():
+    """Testing the label position of small boxes"""
+    image = np.full((640, 640, 3), 100, dtype=np.uint8)
+    draw_instances(image, [[300, 300, 320, 310]], [0.9])
+    assert image[314, 305].max() < 100
+    assert (image[290:298, 300:320] == 100).all()
+
+def test_no_boxes_leave_image_unchanged():
+    """Testing the empty prediction"""
+    image = np.full((64, 64, 3), 7, dtype=np.uint8)
+    draw_instances(image, np.zeros((0, 4)), [])
+    assert (image == 7).all()
+
+def test_boxes_outside_the_image_are_clipped():
+    """Testing boxes touching the image border"""
+    image = np.zeros((64, 64, 3), dtype=np.uint8)
+    draw_instances(image, [[-10, -10, 100, 100]], [0.99])
+    assert image.shape == (64, 64, 3)
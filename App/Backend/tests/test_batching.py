@@ -0,0 +1,79 @@
+"""tests/test_batching.py"""
+
+# Imports
+import sys
+import os
+import asyncio
+import pytest
+
+# Add the parent directory (App/Backend) to sys.path to make `services` importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+#pylint: disable=wrong-import-position
+from services.batching import MicroBatcher
+from services.scheduler import ModelScheduler
+
+def test_concurrent_items_share_a_batch():
+    """Testing that items within the window are batched and mapped back"""
+    seen_batches = []
+
+    def double(items):
+        seen_batches.append(list(items))
+        return [item * 2 for item in items]
+
+    async def scenario():
+        batcher = MicroBatcher(double, max_batch_size=4, max_wait_seconds=0.05)
+        return await asyncio.gather(*(batcher.submit(i) for i in range(6)))
+
+    assert asyncio.run(scenario()) == [0, 2, 4, 6, 8, 10]
+    assert seen_batches == [[0, 1, 2, 3], [4, 5]]
+
+def test_lonely_item_flushes_after_window():
+    """Testing that a single request is not held back longer than the window"""
+    async def scenario():
+        batcher = MicroBatcher(lambda items: items, max_batch_size=8, max_wait_seconds=0.01)
+        return await asyncio.wait_for(batcher.submit("image"), timeout=1.0)
+
+    assert asyncio.run(scenario()) == "image"
+
+def test_batch_errors_reach_every_caller():
+    """Testing that a failing batch fails all of its requests"""
+    def failing(_):
+        raise RuntimeError("out of memory")
+
+    async def scenario():
+        batcher = MicroBatcher(failing, max_batch_size=2, max_wait_seconds=0.01)
+        return await asyncio.gather(batcher.submit(1), batcher.submit(2), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+def test_batches_run_on_model_worker():
+    """Testing the batcher in front of a scheduler worker"""
+    async def scenario():
+        scheduler = ModelScheduler()
+        batcher = MicroBatcher(
+            lambda items: [item + 1 for item in items],
+            run_batch=lambda function, items: scheduler.run("weird_detection", function, items),
+            max_batch_size=3,
+            max_wait_seconds=0.01
+        )
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(3)))
+        scheduler.shutdown()
+        return results, batcher.batch_count
+
+    results, batch_count = asyncio.run(scenario())
+    assert results == [1, 2, 3]
+    assert batch_count == 1
+
+@pytest.mark.parametrize("max_batch_size", [1, 5])
+def test_item_count(max_batch_size):
+    """Testing the batch metrics"""
+    async def scenario():
+        batcher = MicroBatcher(lambda items: items, max_batch_size=max_batch_size, max_wait_seconds=0.01)
+        await asyncio.gather(*(batcher.submit(i) for i in range(5)))
+        return batcher
+
+    batcher = asyncio.run(scenario())
+    assert batcher.item_count == 5
+    assert batcher.batch_count == 5 // max_batch_size
@@ -0,0 +1,88 @@
+"""tests/test_description_cache.py"""
+
+# Imports
+import sys
+import os
+import io
+import numpy as np
+from PIL import Image
+
+# Add the parent directory (App/Backend) to sys.path to make `services` importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+#pylint: disable=wrong-import-position
+from services.description_cache import DescriptionCache, perceptual_hash
+
+INSTRUCTION = "Please create a list of objects in this image."
+
+def _crop(seed=0, size=(120, 90)):
+    """Utility Function for creating a textured crop"""
+    rng = np.random.default_rng(seed)
+    blocks = rng.integers(0, 255, (6, 8, 3), dtype=np.uint8)
+    return np.array(Image.fromarray(blocks).resize(size, Image.BILINEAR))
+
+def _recompressed(image, quality=70):
+    """Utility Function for a JPEG round trip"""
+    buffered = io.BytesIO()
+    Image.fromarray(image).save(buffered, format="JPEG", quality=quality)
+    return np.array(Image.open(buffered))
+
+def _distance(first, second):
+    return bin((first ^ second) & (2 ** 64 - 1)).count("1")
+
+def test_hash_is_stable_for_near_duplicates():
+    """Testing that resubmitted crops hash (almost) the same and other crops do not"""
+    crop = _crop()
+    assert _distance(perceptual_hash(crop), perceptual_hash(_recompressed(crop))) <= 2
+    assert _distance(perceptual_hash(crop), perceptual_hash(crop[2:, 1:])) <= 10
+    assert _distance(perceptual_hash(crop), perceptual_hash(_crop(seed=1))) > 20
+    assert perceptual_hash(crop[:0]) is None
+
+def test_lookup_and_hit_rate():
+    """Testing hits, misses, the instruction in the key and the hit rate"""
+    cache = DescriptionCache(max_entries=8)
+    key = cache.key(_crop(), INSTRUCTION)
+    assert cache.get(key) is None
+    cache.put(key, "['panda']")
+
+    assert cache.get(cache.key(_crop(), INSTRUCTION)) == "['panda']"
+    assert cache.get(cache.key(_crop(), "Describe the scene.")) is None
+    assert cache.get(cache.key(_crop()[:0], INSTRUCTION)) is None
+
+    stats = cache.stats()
+    assert (stats["memory_hits"], stats["misses"], stats["uncacheable"]) == (1, 2, 1)
+    assert stats["hit_rate"] == 1 / 3
+
+def test_lru_eviction():
+    """Testing that the least recently used crop is evicted"""
+    cache = DescriptionCache(max_entries=2)
+    keys = [cache.key(_crop(seed), INSTRUCTION) for seed in range(3)]
+    cache.put(keys[0], "a")
+    cache.put(keys[1], "b")
+    cache.get(keys[0])
+    cache.put(keys[2], "c")
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) == "a"
+    assert cache.get(keys[2]) == "c"
+
+def test_near_duplicates_within_distance():
+    """Testing the Hamming distance tolerance"""
+    crop = _crop()
+    cache = DescriptionCache(max_distance=6)
+    cache.put(cache.key(crop, INSTRUCTION), "['cat']")
+    assert cache.get(cache.key(_recompressed(crop), INSTRUCTION)) == "['cat']"
+    assert cache.get(cache.key(_crop(seed=1), INSTRUCTION)) is None
+
+def test_disk_tier_survives_restarts(tmp_path):
+    """Testing the SQLite tier"""
+    db_path = str(tmp_path / "descriptions.sqlite3")
+    first = DescriptionCache(db_path=db_path)
+    first.put(first.key(_crop(), INSTRUCTION), "['book', 'teacup']")
+    first.close()
+
+    second = DescriptionCache(db_path=db_path)
+    assert second.get(second.key(_crop(), INSTRUCTION)) == "['book', 'teacup']"
+    assert second.stats()["disk_hits"] == 1
+    assert second.get(second.key(_crop(), INSTRUCTION)) == "['book', 'teacup']"
+    assert second.stats()["memory_hits"] == 1
+    second.close()
@@ -0,0 +1,33 @@
+"""tests/test_detect_binary.py"""
+
+# Imports
+import sys
+import os
+import pytest
+from fastapi.testclient import TestClient
+
+spacy = pytest.importorskip("spacy")
+if not spacy.util.is_package("en_core_web_sm"):
+    pytest.skip("en_core_web_sm is not installed", allow_module_level=True)
+
+# Add the parent directory (App/Backend) to sys.path to make `main` importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+#pylint: disable=wrong-import-position
+from main import app
+
+# Without the lifespan, the requests are rejected before any model is needed
+client = TestClient(app)
+# A file part makes the test client send multipart/form-data instead of a urlencoded form
+MULTIPART_FILES = {"unused": ("unused.txt", b"unused")}
+
+def test_text_image_field_is_rejected():
+    """Testing that a multipart image field without a file is a client error"""
+    response = client.post("/detect/binary", data={"image": "not a file", "prompt": "a cat"}, files=MULTIPART_FILES)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "The image field must be a file upload"
+
+def test_missing_image_is_rejected():
+    """Testing that a multipart request without an image is a client error"""
+    response = client.post("/detect/binary", data={"prompt": "a cat"}, files=MULTIPART_FILES)
+    assert response.status_code == 400
@@ -0,0 +1,78 @@
+"""tests/test_detector_export.py"""
+
+# Imports
+import sys
+import os
+import glob
+import importlib.util
+import pytest
+import numpy as np
+from PIL import Image
+
+torch = pytest.importorskip("torch")
+
+# Add the parent directory (App/Backend) to sys.path to make `models` importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+#pylint: disable=wrong-import-position
+from models import detector_export
+
+SAMPLE_IMAGES = os.path.join(os.path.dirname(__file__), "..", "..", "..", "Data", "yolo", "nuScenes", "images", "train", "*.png")
+PARITY_IMAGE_COUNT = 4
+
+def test_unknown_backend_is_rejected(tmp_path):
+    """Testing that only the known runtimes are accepted"""
+    with pytest.raises(ValueError):
+        detector_export.ExportedPredictor(str(tmp_path), backend="tensorrt")
+
+@pytest.fixture(name="eager_and_export", scope="module")
+def fixture_eager_and_export(tmp_path_factory):
+    """Eager DefaultPredictor and an export of the same checkpoint, skipped without Detectron2 or the weights."""
+    pytest.importorskip("detectron2")
+    from detectron2.engine import DefaultPredictor
+    from models.configurations import detectron_cfg
+
+    image_paths = sorted(glob.glob(SAMPLE_IMAGES))[:PARITY_IMAGE_COUNT]
+    if not os.path.exists(detectron_cfg.MODEL.WEIGHTS) or not image_paths:
+        pytest.skip("Needs detectron2_best.pth and the nuScenes images.")
+
+    cfg = detectron_cfg.clone()
+    cfg.MODEL.DEVICE = "cpu"
+    export_dir = str(tmp_path_factory.mktemp("detectron2_export"))
+    formats = ["torchscript", "onnx"] if importlib.util.find_spec("onnxruntime") else ["torchscript"]
+    detector_export.export_detector(cfg, export_dir=export_dir, formats=formats, image_path=image_paths[0])
+
+    images = [np.array(Image.open(path).convert("RGB").resize((640, 640), Image.BILINEAR))[:, :, ::-1] for path in image_paths]
+    return DefaultPredictor(cfg), export_dir, formats, images
+
+@pytest.mark.parametrize("backend", ["torchscript", "onnxruntime"])
+def test_exported_detector_matches_eager_model(eager_and_export, backend):
+    """Testing boxes and scores of the exported detector against the eager model"""
+    eager_predictor, export_dir, formats, images = eager_and_export
+    if detector_export.EXPORT_RUNNERS[backend][0] not in formats:
+        pytest.skip("onnxruntime is not installed.")
+    predictor = detector_export.ExportedPredictor(export_dir, backend=backend, num_threads=2)
+
+    for image in images:
+        expected = eager_predictor(image)["instances"].to("cpu")
+        actual = predictor(image)["instances"]
+
+        assert actual.image_size == expected.image_size
+        assert len(actual) == len(expected)
+        np.testing.assert_allclose(actual.pred_boxes.tensor.numpy(), expected.pred_boxes.tensor.numpy(), atol=1.0)
+        np.testing.assert_allclose(actual.scores.numpy(), expected.scores.numpy(), atol=1e-3)
+        assert (actual.pred_classes == expected.pred_classes).all()
+
+def test_batched_inputs_match_single_calls(eager_and_export):
+    """Testing the model attribute used by the micro-batching"""
+    _, export_dir, _, images = eager_and_export
+    predictor = detector_export.ExportedPredictor(export_dir, backend="torchscript")
+
+    inputs = []
+    for image in images:
+        resized = predictor.aug.get_transform(image).apply_image(image)
+        inputs.append({"image": torch.as_tensor(resized.astype("float32").transpose(2, 0, 1)), "height": 640, "width": 640})
+    batched = predictor.model(inputs)
+
+    for image, output in zip(images, batched):
+        assert torch.equal(output["instances"].scores, predictor(image)["instances"].scores)
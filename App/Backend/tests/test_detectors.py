@@ -0,0 +1,89 @@
+"""tests/test_detectors.py"""
+
+# Imports
+import sys
+import os
+from types import SimpleNamespace
+import pytest
+import numpy as np
+
+torch = pytest.importorskip("torch")
+
+# Add the parent directory (App/Backend) to sys.path to make `services` importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+#pylint: disable=wrong-import-position
+from services.detectors import Detectron2Detector, YoloDetector
+
+class FakeYolo:
+    """Ultralytics-like model that returns fixed boxes and records the call."""
+
+    def __init__(self, boxes, scores):
+        self.result = SimpleNamespace(boxes=SimpleNamespace(xyxy=torch.tensor(boxes), conf=torch.tensor(scores)))
+        self.calls = []
+
+    def predict(self, images, **kwargs):
+        self.calls.append((images, kwargs))
+        return [self.result for _ in images]
+
+class FakeInstances:
+    """Detectron2-like Instances with boxes and scores."""
+
+    def __init__(self, boxes, scores):
+        self.pred_boxes = SimpleNamespace(tensor=torch.tensor(boxes).reshape(-1, 4))
+        self.scores = torch.tensor(scores)
+
+    def to(self, device):
+        return self
+
+    def has(self, name):
+        return name in ("pred_boxes", "scores")
+
+    def __len__(self):
+        return len(self.scores)
+
+class FakePredictor:
+    """DefaultPredictor-like object, the aug keeps the image size and the model returns one result per input."""
+
+    def __init__(self, results):
+        self.input_format = "BGR"
+        self.aug = SimpleNamespace(get_transform=lambda image: SimpleNamespace(apply_image=lambda image: image))
+        self.results = results
+        self.inputs = None
+
+    def model(self, inputs):
+        self.inputs = inputs
+        return [{"instances": instances} for instances in self.results]
+
+def test_yolo_detector_returns_sorted_boxes_and_scores():
+    """Testing the YOLO backend on a batch"""
+    model = FakeYolo([[0.0, 0.0, 10.0, 10.0], [5.0, 5.0, 50.0, 60.0]], [0.5, 0.9])
+    detector = YoloDetector(model, confidence=0.3)
+    images = [np.zeros((64, 64, 3), dtype=np.uint8) for _ in range(3)]
+    images[0][..., 0] = 255
+
+    detections = detector.predict(images)
+
+    assert len(detections) == 3 and len(model.calls) == 1
+    boxes, scores = detections[0]
+    np.testing.assert_allclose(scores, [0.9, 0.5])
+    np.testing.assert_allclose(boxes[0], [5, 5, 50, 60])
+    assert boxes.dtype == np.float32
+    # The images are handed over in BGR order
+    sent_images, kwargs = model.calls[0]
+    assert sent_images[0][0, 0, 2] == 255 and sent_images[0][0, 0, 0] == 0
+    assert kwargs["conf"] == 0.3 and kwargs["imgsz"] == 640
+
+def test_detectron2_detector_batches_and_converts():
+    """Testing the Detectron2 backend with and without detections"""
+    predictor = FakePredictor([FakeInstances([[1.0, 2.0, 3.0, 4.0]], [0.95]), FakeInstances([], [])])
+    detector = Detectron2Detector(predictor)
+    images = [np.zeros((32, 48, 3), dtype=np.uint8), np.zeros((32, 48, 3), dtype=np.uint8)]
+
+    (boxes, scores), (empty_boxes, empty_scores) = detector.predict(images)
+
+    assert [(item["height"], item["width"]) for item in predictor.inputs] == [(32, 48), (32, 48)]
+    assert predictor.inputs[0]["image"].shape == (3, 32, 48)
+    np.testing.assert_allclose(boxes, [[1, 2, 3, 4]])
+    np.testing.assert_allclose(scores, [0.95], rtol=1e-6)
+    assert empty_boxes.shape == (0, 4) and empty_scores.shape == (0,)
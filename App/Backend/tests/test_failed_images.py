@@ -0,0 +1,76 @@
+"""tests/test_failed_images.py"""
+
+# Imports
+import sys
+import os
+import datetime
+import threading
+import numpy as np
+
+# Add the parent directory (App/Backend) to sys.path to make `services` importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+#pylint: disable=wrong-import-position
+from services import failed_images
+from services.failed_images import FailedImageSink
+
+IMAGE = np.full((64, 64, 3), 128, dtype=np.uint8)
+
+def _fixed_clock():
+    return datetime.datetime(2025, 6, 2, 17, 36, 24)
+
+def _written_files(directory):
+    return sorted(os.path.relpath(os.path.join(root, name), directory) for root, _, names in os.walk(directory) for name in names)
+
+def test_images_are_written_into_daily_directories(tmp_path):
+    """Testing the date sharding of the written images"""
+    sink = FailedImageSink(str(tmp_path), clock=_fixed_clock)
+    assert sink.submit(IMAGE)
+    assert sink.submit(IMAGE)
+    sink.close()
+
+    files = _written_files(tmp_path)
+    assert len(files) == 2
+    assert all(path.startswith("2025-06-02" + os.sep + "no_detection_20250602_173624_") for path in files)
+    assert sink.stats()["written"] == 2
+
+def test_full_queue_drops_without_blocking(tmp_path, monkeypatch):
+    """Testing that submit never waits for the disk"""
+    release = threading.Event()
+    writes = []
+
+    def slow_write(_self, timestamp, image):
+        release.wait()
+        writes.append(timestamp)
+
+    monkeypatch.setattr(FailedImageSink, "_write", slow_write)
+    sink = FailedImageSink(str(tmp_path), max_queue_size=2)
+
+    results = [sink.submit(IMAGE) for _ in range(6)]
+    release.set()
+    sink.close()
+
+    # One image is taken by the blocked writer, two wait in the queue
+    assert results.count(True) in (2, 3)
+    assert sink.stats()["dropped_queue_full"] == results.count(False)
+    assert len(writes) == results.count(True)
+
+def test_disk_budget_and_sampling(tmp_path):
+    """Testing the disk cap and the sampling rate"""
+    (tmp_path / "old.jpeg").write_bytes(b"x" * 900)
+    sink = FailedImageSink(str(tmp_path), max_bytes=1000)
+    sink.submit(IMAGE)
+    sink.close()
+    assert sink.stats()["dropped_disk_full"] == 1
+    assert _written_files(tmp_path) == ["old.jpeg"]
+
+    samples = iter([0.1, 0.9, 0.4])
+    sampled = FailedImageSink(str(tmp_path / "sampled"), sample_rate=0.5, sampler=lambda: next(samples))
+    assert [sampled.submit(IMAGE) for _ in range(3)] == [True, False, True]
+    sampled.close()
+    assert sampled.stats()["sampled_out"] == 1
+    assert sampled.stats()["written"] == 2
+
+def test_default_directory_is_the_backend_folder():
+    """Testing that the default directory no longer depends on the working directory"""
+    assert failed_images.FAILED_IMAGE_DIR.endswith(os.path.join("Backend", "failed_images")) or "FAILED_IMAGE_DIR" in os.environ
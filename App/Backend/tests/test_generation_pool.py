@@ -0,0 +1,107 @@
+"""tests/test_generation_pool.py"""
+
+# Imports
+import sys
+import os
+
+# Add the parent directory (App/Backend) to sys.path to make `services` importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+#pylint: disable=wrong-import-position
+from services.generation_pool import GenerationPool, pool_key
+
+class FakeClock:
+    """Manually advanced clock."""
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def _pool(tmp_path, clock, **kwargs):
+    return GenerationPool(str(tmp_path / "pool"), clock=clock, **kwargs)
+
+def _request(pool, nouns, times=1):
+    return [pool.take(nouns, " ".join(nouns)) for _ in range(times)][-1]
+
+def test_pool_key_ignores_order_and_case():
+    """Testing the normalized noun set"""
+    assert pool_key(["Dog", "car", "car"]) == pool_key(["car", "dog", "car"]) == "car,car,dog"
+    assert pool_key([]) is None
+
+def test_rounds_are_served_once(tmp_path):
+    """Testing hits, misses and that a served round leaves the pool"""
+    pool = _pool(tmp_path, FakeClock())
+    assert _request(pool, ["cow"]) is None
+
+    pool.put("cow", "a cow", [b"first", b"second"])
+    assert pool.take(["Cow"], "one cow") == [b"first", b"second"]
+    assert pool.take(["cow"], "a cow") is None
+
+    stats = pool.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 2 and stats["rounds"] == 0
+    assert os.listdir(tmp_path / "pool") == []
+
+def test_candidates_follow_decayed_popularity(tmp_path):
+    """Testing which noun sets the producer pre-generates"""
+    clock = FakeClock()
+    pool = _pool(tmp_path, clock, rounds_per_key=1, min_requests=3, half_life_seconds=100)
+    _request(pool, ["cow"], times=5)
+    _request(pool, ["giraffe"], times=2)
+    assert pool.next_candidate() == ("cow", "cow")
+
+    pool.put("cow", "cow", [b"image"])
+    assert pool.next_candidate() is None  # cow is stocked, giraffe was not requested often enough
+
+    # After two half lives cow counts as 1.25 requests and giraffe overtakes it
+    clock.now += 200
+    _request(pool, ["giraffe"], times=3)
+    assert pool.next_candidate() == ("giraffe", "giraffe")
+
+def test_expired_rounds_are_dropped(tmp_path):
+    """Testing the TTL eviction"""
+    clock = FakeClock()
+    pool = _pool(tmp_path, clock, ttl_seconds=60)
+    pool.put("cow", "cow", [b"image"])
+    clock.now += 61
+    assert pool.take(["cow"], "cow") is None
+    assert pool.stats()["evicted_ttl"] == 1
+
+def test_least_recently_requested_rounds_are_evicted(tmp_path):
+    """Testing the disk budget"""
+    clock = FakeClock()
+    pool = _pool(tmp_path, clock, max_bytes=25)
+    _request(pool, ["cow"])
+    clock.now += 1
+    _request(pool, ["giraffe"])
+
+    pool.put("giraffe", "giraffe", [b"x" * 10])
+    pool.put("cow", "cow", [b"x" * 10])
+    pool.put("giraffe", "giraffe", [b"x" * 10])
+
+    stats = pool.stats()
+    assert stats["evicted_lru"] == 1 and stats["bytes"] == 20
+    assert pool.take(["cow"], "cow") is None
+    assert pool.take(["giraffe"], "giraffe") is not None
+
+def test_pool_survives_restarts(tmp_path):
+    """Testing that complete rounds are picked up again and incomplete ones removed"""
+    clock = FakeClock()
+    pool = _pool(tmp_path, clock)
+    pool.put("cow", "cow", [b"a", b"b"])
+    os.makedirs(tmp_path / "pool" / "incomplete")
+
+    restarted = _pool(tmp_path, clock)
+    assert restarted.stats()["rounds"] == 1
+    assert not os.path.exists(tmp_path / "pool" / "incomplete")
+    assert restarted.take(["cow"], "cow") == [b"a", b"b"]
+
+def test_idle_after_quiet_period(tmp_path):
+    """Testing the idle detection of the producer"""
+    clock = FakeClock()
+    pool = _pool(tmp_path, clock, idle_seconds=30)
+    assert pool.is_idle()
+    _request(pool, ["cow"])
+    assert not pool.is_idle()
+    clock.now += 30
+    assert pool.is_idle()
@@ -0,0 +1,103 @@
+"""tests/test_image_codecs.py"""
+
+# Imports
+import sys
+import os
+import io
+import cv2
+import numpy as np
+import pytest
+from PIL import Image
+
+# Add the parent directory (App/Backend) to sys.path to make `services` importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+#pylint: disable=wrong-import-position
+from services.image_codecs import create_image_codec, simplejpeg, OpenCVCodec
+
+CODECS = ["pillow", "opencv"] + (["turbojpeg"] if simplejpeg is not None else [])
+
+def _street_like_image(width=1600, height=900):
+    """Utility Function for creating a smooth test image with a colour gradient"""
+    x = np.linspace(0, 255, width, dtype=np.float32)[None, :]
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    image = np.stack([np.broadcast_to(x, (height, width)), np.broadcast_to(y, (height, width)), np.full((height, width), 40.0)], axis=-1)
+    return image.astype(np.uint8)
+
+def _encode(image, image_format):
+    """Utility Function for encoding an RGB array with PIL"""
+    buffered = io.BytesIO()
+    Image.fromarray(image).save(buffered, format=image_format, quality=95)
+    return buffered.getvalue()
+
+@pytest.mark.parametrize("codec_name", CODECS)
+@pytest.mark.parametrize("image_format", ["JPEG", "PNG"])
+def test_decode_matches_pillow_reference(codec_name, image_format):
+    """Testing that every codec decodes to the same RGB image as the reference"""
+    image_data = _encode(_street_like_image(), image_format)
+    reference = create_image_codec("pillow").decode(image_data, (640, 640))
+
+    decoded = create_image_codec(codec_name).decode(image_data, (640, 640))
+
+    assert decoded.shape == (640, 640, 3) and decoded.dtype == np.uint8
+    assert decoded.flags["C_CONTIGUOUS"]
+    assert np.abs(decoded.astype(int) - reference.astype(int)).mean() < 2.0
+
+@pytest.mark.parametrize("codec_name", CODECS)
+@pytest.mark.parametrize("image_format", ["JPEG", "PNG"])
+def test_downscale_antialiases_like_pillow(codec_name, image_format):
+    """Testing that shrinking a one pixel checkerboard averages it like PIL instead of aliasing"""
+    y, x = np.mgrid[:900, :1600]
+    checkerboard = np.repeat((((x + y) % 2) * 255).astype(np.uint8)[:, :, None], 3, axis=2)
+    image_data = _encode(checkerboard, image_format)
+    reference = create_image_codec("pillow").decode(image_data, (640, 640)).astype(int)
+
+    decoded = create_image_codec(codec_name).decode(image_data, (640, 640)).astype(int)
+
+    # Bilinear sampling without averaging is off by up to 65 here
+    assert np.abs(decoded - reference).max() <= 16
+
+@pytest.mark.parametrize("size", [None, (640, 640)])
+def test_decode_ignores_exif_orientation(size):
+    """Testing that all codecs decode an EXIF rotated JPEG to the same stored orientation"""
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Rotate 90 degrees clockwise for display
+    buffered = io.BytesIO()
+    Image.fromarray(_street_like_image()).save(buffered, format="JPEG", quality=95, exif=exif)
+    image_data = buffered.getvalue()
+
+    decoded = {codec_name: create_image_codec(codec_name).decode(image_data, size) for codec_name in CODECS}
+
+    assert decoded["pillow"].shape == ((900, 1600, 3) if size is None else (640, 640, 3))
+    for codec_name, image in decoded.items():
+        assert image.shape == decoded["pillow"].shape, codec_name
+        assert np.abs(image.astype(np.int16) - decoded["pillow"]).mean() < 3, codec_name
+
+@pytest.mark.parametrize("codec_name", CODECS)
+def test_decoded_images_are_not_shared_buffers(codec_name):
+    """Testing that reused scratch buffers never leak into returned images"""
+    codec = create_image_codec(codec_name)
+    first = codec.decode(_encode(_street_like_image(), "JPEG"), (640, 640))
+    snapshot = first.copy()
+    codec.decode(_encode(255 - _street_like_image(), "JPEG"), (640, 640))
+    np.testing.assert_array_equal(first, snapshot)
+
+@pytest.mark.parametrize("codec_name", CODECS)
+def test_encode_keeps_channel_order(codec_name):
+    """Testing the RGB and BGR inputs of the JPEG encoder"""
+    codec = create_image_codec(codec_name)
+    image = np.zeros((64, 64, 3), dtype=np.uint8)
+    image[..., 0] = 200  # red in RGB
+
+    from_rgb = np.array(Image.open(io.BytesIO(codec.encode_jpeg(image))))
+    from_bgr = np.array(Image.open(io.BytesIO(codec.encode_jpeg(image[:, :, ::-1], bgr=True))))
+
+    assert from_rgb[..., 0].mean() > 190 and from_rgb[..., 2].mean() < 10
+    np.testing.assert_allclose(from_rgb, from_bgr, atol=2)
+
+def test_opencv_decodes_jpeg_at_reduced_scale():
+    """Testing that large JPEGs are decoded in the DCT domain"""
+    codec = OpenCVCodec()
+    assert codec._read_flag(_encode(_street_like_image(2600, 1400), "JPEG"), (640, 640)) == cv2.IMREAD_REDUCED_COLOR_2 | cv2.IMREAD_IGNORE_ORIENTATION
+    assert codec._read_flag(_encode(_street_like_image(), "JPEG"), (640, 640)) == cv2.IMREAD_COLOR | cv2.IMREAD_IGNORE_ORIENTATION
+    assert codec._read_flag(_encode(_street_like_image(2600, 1400), "PNG"), (640, 640)) == cv2.IMREAD_COLOR | cv2.IMREAD_IGNORE_ORIENTATION
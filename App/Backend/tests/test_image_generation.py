@@ -0,0 +1,117 @@
+"""tests/test_image_generation.py"""
+
+# Imports
+import sys
+import os
+import asyncio
+import base64
+import pytest
+from PIL import Image
+
+pytest.importorskip("torch")
+pytest.importorskip("diffusers")
+spacy = pytest.importorskip("spacy")
+# services.prompt_summary loads the model on import, the tests themselves stub the noun extraction
+if not spacy.util.is_package("en_core_web_sm"):
+    pytest.skip("en_core_web_sm is not installed", allow_module_level=True)
+
+# Add the parent directory (App/Backend) to sys.path to make `services` importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+#pylint: disable=wrong-import-position
+from schemas.images import ImageGenerationPrompt
+from services import states
+from services import image_generation
+from services.generation_pool import GenerationPool
+
+@pytest.fixture(name="nouns", autouse=True)
+def fixture_nouns(monkeypatch):
+    """Stubs the noun extraction with the last word of the prompt, independent of the installed spaCy model"""
+    monkeypatch.setattr(image_generation, "extract_nouns_with_counts", lambda prompt: prompt.lower().split()[-1:])
+
+def test_generate_stream_emits_variants_in_order(pipeline, monkeypatch):
+    """Testing the event order of the streamed generation"""
+    street_image = Image.new("RGB", (32, 32), (50, 50, 50))
+
+    async def prepare_round(_prompt):
+        return street_image, [(0, 0, 10, 10)] * 4, "token"
+
+    monkeypatch.setattr(image_generation, "_prepare_round", prepare_round)
+    monkeypatch.setattr(states, "MODEL_SCHEDULER", None)
+
+    async def scenario():
+        events = await image_generation.generate_stream(ImageGenerationPrompt(prompt="a cat"), previews=True)
+        collected = [event async for event in events]
+        states.MODEL_SCHEDULER.shutdown()
+        return collected
+
+    events = asyncio.run(scenario())
+
+    assert events[0].type == "session" and events[0].sessionToken == "token"
+    assert [event.index for event in events if event.type == "image"] == [0, 1, 2, 3]
+    # 20, 24, 28 and 32 steps at the strengths 0.5 to 0.8, a preview every 10 steps
+    assert sum(event.type == "preview" for event in events) == 9
+    assert events[-1].type == "done"
+    assert len(pipeline.calls) == 4
+
+def test_pooled_round_is_served_without_diffusion(pipeline, tmp_path, monkeypatch):
+    """Testing that a pre-generated round skips the live generation"""
+    pool = GenerationPool(str(tmp_path / "pool"))
+    pool.put("cat", "a cat", [b"png-0", b"png-1", b"png-2", b"png-3"])
+    monkeypatch.setattr(states, "GENERATION_POOL", pool)
+
+    async def prepare_round(_prompt):
+        raise AssertionError("the round should come from the pool")
+
+    monkeypatch.setattr(image_generation, "_prepare_round", prepare_round)
+
+    async def scenario():
+        events = await image_generation.generate_stream(ImageGenerationPrompt(prompt="A  cat"))
+        return [event async for event in events]
+
+    events = asyncio.run(scenario())
+
+    assert [event.type for event in events] == ["session", "image", "image", "image", "image", "done"]
+    assert events[1].imageBase64 == base64.b64encode(b"png-0").decode("utf-8")
+    assert pool.stats()["hits"] == 1
+    assert not pipeline.calls
+
+def test_pooled_round_is_skipped_for_other_profiles(tmp_path, monkeypatch):
+    """Testing that requests for another diffusion profile are not served from the pool"""
+    pool = GenerationPool(str(tmp_path / "pool"))
+    pool.put("cat", "a cat", [b"png-0", b"png-1", b"png-2", b"png-3"])
+    monkeypatch.setattr(states, "GENERATION_POOL", pool)
+    other_profile = "preview" if image_generation.DIFFUSION_PROFILE != "preview" else "high"
+
+    assert asyncio.run(image_generation._take_pooled_round("a cat", other_profile)) is None
+    assert asyncio.run(image_generation._take_pooled_round("a cat", image_generation.DIFFUSION_PROFILE)) is not None
+
+def test_pool_producer_does_not_load_the_street_model(tmp_path, monkeypatch):
+    """Testing that the pool producer waits for the street regions instead of loading the segmentation"""
+    pool = GenerationPool(str(tmp_path / "pool"))
+    produced = []
+
+    async def produce_round(prompt):
+        produced.append(prompt)
+
+    monkeypatch.setattr(pool, "next_candidate", lambda: ("cat", "a cat"))
+    monkeypatch.setattr(image_generation, "_produce_round", produce_round)
+    monkeypatch.setattr(states, "GENERATION_POOL", pool)
+    monkeypatch.setattr(states, "GENERATION_MODEL", object())
+    monkeypatch.setattr(states, "STREET_REGION_INDEX", None)
+    monkeypatch.setattr(states, "STREET_DETECTION_MODEL", None)
+    monkeypatch.setattr(states, "MODEL_SCHEDULER", None)
+
+    async def scenario():
+        try:
+            await asyncio.wait_for(image_generation.run_pool_producer(poll_seconds=0), timeout=0.05)
+        except asyncio.TimeoutError:
+            pass
+
+    asyncio.run(scenario())
+    assert not produced
+
+    monkeypatch.setattr(states, "STREET_DETECTION_MODEL", object())
+    asyncio.run(scenario())
+    states.MODEL_SCHEDULER.shutdown()
+    assert produced and produced[0] == "a cat"
@@ -0,0 +1,320 @@
+"""tests/test_image_inpainting.py"""
+
+# Imports
+import sys
+import os
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw, ImageFilter
+
+cv2 = pytest.importorskip("cv2")
+torch = pytest.importorskip("torch")
+pytest.importorskip("diffusers")
+
+# Add the parent directory (App/Backend) to sys.path to make `services` importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+#pylint: disable=wrong-import-position
+from services import states
+from services import image_inpainting
+from tests.inpainting_stubs import DummyInpaintPipeline, as_mask_array
+
+def test_group_variants_by_strength():
+    """Testing the strength grouping"""
+    assert image_inpainting.variant_start_steps([0.5, 0.6, 0.7, 0.8], 40) == [12, 8, 4, 0]
+    assert image_inpainting.group_variants_by_strength([0.5, 0.6, 0.7, 0.8], 40) == [[3, 2, 1, 0]]
+    assert image_inpainting.group_variants_by_strength([0.7, 0.5, 0.7, 0.5], 40) == [[0, 2, 1, 3]]
+    # With 8 steps the 0.7 variant (5 steps) would start one step after the 0.8 variant (6 steps)
+    assert image_inpainting.group_variants_by_strength([0.5, 0.6, 0.7, 0.8], 8) == [[3, 1, 0], [2]]
+
+def test_inpaint_images_batches_all_strengths(pipeline):
+    """Testing that the variants run as one batch with their own start steps and come back in order"""
+    street_image = Image.new("RGB", (64, 32), (120, 120, 120))
+    bboxes = [(0, 0, 10, 10), (10, 5, 30, 20), (20, 0, 60, 30), (5, 5, 15, 25)]
+
+    images = image_inpainting.inpaint_images(street_image, bboxes, "a panda", [0.5, 0.6, 0.7, 0.8])
+
+    assert [call["batch_size"] for call in pipeline.calls] == [4]
+    assert [call["strength"] for call in pipeline.calls] == pytest.approx([0.8])
+    assert len(images) == 4
+    assert all(image.size == street_image.size for image in images)
+
+    # Batch order 0.8, 0.7, 0.6, 0.5 starting at the steps 0, 4, 8 and 12, the mask is held at zero before
+    assert pipeline.mask_history[2] == [1, 0, 0, 0]
+    assert pipeline.mask_history[6] == [1, 1, 0, 0]
+    assert pipeline.mask_history[10] == [1, 1, 1, 0]
+    assert pipeline.mask_history[11] == [1, 1, 1, 1]
+
+    with pytest.raises(ValueError):
+        image_inpainting.realvisxl_inpaint_batch([street_image] * 2, [None] * 2, "a panda", [0.8, 0.78], seeds=[1, 2])
+
+def test_inpaint_images_keeps_seeds(pipeline):
+    """Testing that each variant uses its own seed within a batch"""
+    street_image = Image.new("RGB", (32, 32), (50, 50, 50))
+    bboxes = [(0, 0, 31, 31)] * 2
+
+    same_seed = image_inpainting.inpaint_images(street_image, bboxes, "a cat", [0.6, 0.6], seeds=[1, 1])
+    other_seed = image_inpainting.inpaint_images(street_image, bboxes, "a cat", [0.6, 0.6], seeds=[1, 2])
+
+    assert len(pipeline.calls) == 2
+    np.testing.assert_array_equal(np.asarray(same_seed[0]), np.asarray(same_seed[1]))
+    assert not np.array_equal(np.asarray(other_seed[0]), np.asarray(other_seed[1]))
+
+def test_inpaint_images_reports_groups_and_previews(pipeline):
+    """Testing the callbacks used for streaming"""
+    street_image = Image.new("RGB", (32, 32), (50, 50, 50))
+    done, previews = [], []
+
+    images = image_inpainting.inpaint_images(
+        street_image, [(0, 0, 10, 10)] * 3, "a cat", [0.7, 0.5, 0.6], batched=False,
+        on_group_done=lambda indices, group_images: done.append((indices, group_images)),
+        on_preview=lambda indices, step, group_previews: previews.append((indices, step, [p.size for p in group_previews]))
+    )
+
+    assert [indices for indices, _ in done] == [[0], [1], [2]]
+    assert all(group_images[0] is images[indices[0]] for indices, group_images in done)
+    assert previews[:2] == [([0], 10, [(8, 4)]), ([0], 20, [(8, 4)])]
+    assert [call["strength"] for call in pipeline.calls] == pytest.approx([0.7, 0.5, 0.6])
+
+class ProfiledInpaintPipeline(DummyInpaintPipeline):
+    """Dummy pipeline that renders at the requested resolution and has a scheduler and LoRA adapters."""
+
+    def __init__(self):
+        super().__init__()
+        from diffusers import DPMSolverMultistepScheduler
+        self.scheduler = DPMSolverMultistepScheduler()
+        self.lora_calls = []
+        self.sizes = []
+        self.calls_kwargs = None
+
+    def __call__(self, image, mask_image, strength, generator, callback_on_step_end=None, **kwargs):
+        self.sizes.append((kwargs["width"], kwargs["height"]))
+        self.calls_kwargs = kwargs
+        image = [street_image.resize((kwargs["width"], kwargs["height"])) for street_image in image]
+        mask_image = [cv2.resize(as_mask_array(mask), (kwargs["width"], kwargs["height"])) for mask in mask_image]
+        return super().__call__(image=image, mask_image=mask_image, strength=strength, generator=generator, callback_on_step_end=callback_on_step_end, **kwargs)
+
+    def load_lora_weights(self, lora_id, adapter_name):
+        self.lora_calls.append(("load", lora_id, adapter_name))
+
+    def set_adapters(self, adapter_names):
+        self.lora_calls.append(("set", tuple(adapter_names)))
+
+    def enable_lora(self):
+        self.lora_calls.append(("enable",))
+
+    def disable_lora(self):
+        self.lora_calls.append(("disable",))
+
+def test_diffusion_profiles_switch_scheduler_and_lora(monkeypatch):
+    """Testing that the profiles swap the scheduler and the LoRA adapter without reloading them"""
+    pipeline = ProfiledInpaintPipeline()
+    monkeypatch.setattr(states, "GENERATION_MODEL", pipeline)
+    monkeypatch.setattr(states, "DEVICE", torch.device("cpu"))
+    original_scheduler = pipeline.scheduler
+    street_image = Image.new("RGB", (64, 32), (120, 120, 120))
+    bboxes = [(0, 0, 10, 10)]
+
+    images = image_inpainting.inpaint_images(street_image, bboxes, "a panda", [0.6], profile="preview")
+    preview = image_inpainting.DIFFUSION_PROFILES["preview"]
+    assert type(pipeline.scheduler).__name__ == "LCMScheduler"
+    assert pipeline.calls_kwargs["num_inference_steps"] == preview.num_inference_steps
+    assert pipeline.calls_kwargs["guidance_scale"] == preview.guidance_scale
+    assert pipeline.sizes[-1] == (preview.width, preview.height)
+    # The profile renders at its own resolution, the variant comes back in the street image size
+    assert images[0].size == street_image.size
+
+    image_inpainting.inpaint_images(street_image, bboxes, "a panda", [0.6], profile="high")
+    assert pipeline.scheduler is original_scheduler
+    lcm_scheduler = image_inpainting._get_profile_switcher().schedulers["lcm"]
+    image_inpainting.inpaint_images(street_image, bboxes, "a panda", [0.6], profile="preview")
+    assert pipeline.scheduler is lcm_scheduler
+
+    assert pipeline.lora_calls == [
+        ("load", image_inpainting.LCM_LORA_ID, "lcm-lora-sdxl"), ("enable",), ("set", ("lcm-lora-sdxl",)),
+        ("disable",),
+        ("enable",), ("set", ("lcm-lora-sdxl",)),
+    ]
+
+def test_default_profile_keeps_pipeline(pipeline):
+    """Testing that the default profile leaves a pipeline without scheduler or LoRA support untouched"""
+    street_image = Image.new("RGB", (32, 32), (50, 50, 50))
+    image_inpainting.inpaint_images(street_image, [(0, 0, 31, 31)], "a panda", [0.6])
+    image_inpainting.inpaint_images(street_image, [(0, 0, 31, 31)], "a panda", [0.6], profile="standard")
+    assert len(pipeline.calls) == 2
+
+    with pytest.raises(ValueError):
+        image_inpainting.inpaint_images(street_image, [(0, 0, 31, 31)], "a panda", [0.6], profile="ultra")
+
+def test_schema_lists_diffusion_profiles():
+    """Testing that the request schema accepts exactly the configured profiles"""
+    from typing import get_args
+    from schemas.images import ImageGenerationPrompt
+
+    literal = get_args(ImageGenerationPrompt.model_fields["profile"].annotation)[0]
+    assert set(get_args(literal)) == set(image_inpainting.DIFFUSION_PROFILES)
+    assert image_inpainting.DIFFUSION_PROFILE in image_inpainting.DIFFUSION_PROFILES
+
+def test_region_window():
+    """Testing that the region window covers the padded bbox and stays inside the image"""
+    assert image_inpainting.region_window_size([(700, 500, 800, 600), (0, 800, 100, 890)], (1600, 900), padding=128) == (356, 356)
+    assert image_inpainting.region_window((700, 500, 800, 600), (1600, 900), (356, 356)) == (572, 372, 928, 728)
+    # Shifted inside the image at the border
+    assert image_inpainting.region_window((0, 800, 100, 890), (1600, 900), (356, 356)) == (0, 544, 356, 900)
+    # Clamped where the padded bbox is larger than the image
+    assert image_inpainting.region_window_size([(0, 0, 300, 100)], (400, 200), padding=128) == (400, 200)
+    assert image_inpainting.region_size(image_inpainting.DIFFUSION_PROFILES["high"]) == image_inpainting.REGION_SIZE
+    assert image_inpainting.region_size(image_inpainting.DIFFUSION_PROFILES["preview"]) == 768
+
+def test_region_window_keeps_aspect_ratio():
+    """Testing a bbox of the size generate() picks (40-70% of the image) on a nuScenes sized street image"""
+    bbox = (320, 300, 1280, 840)
+    window_size = image_inpainting.region_window_size([bbox], (1600, 900))
+    left, top, right, bottom = image_inpainting.region_window(bbox, (1600, 900), window_size)
+    assert (right - left, bottom - top) == window_size == (1216, 796)
+    assert left <= bbox[0] and top <= bbox[1] and right >= bbox[2] and bottom >= bbox[3]
+
+    for name in ("high", "preview"):
+        width, height = image_inpainting.region_diffusion_size(window_size, image_inpainting.DIFFUSION_PROFILES[name])
+        assert width == image_inpainting.region_size(image_inpainting.DIFFUSION_PROFILES[name])
+        assert width % 8 == 0 and height % 8 == 0
+        assert width / height == pytest.approx(window_size[0] / window_size[1], rel=0.01)
+
+def test_region_mode_only_changes_the_window(monkeypatch):
+    """Testing that the region mode diffuses the window at SDXL scale and keeps the rest of the image"""
+    pipeline = ProfiledInpaintPipeline()
+    monkeypatch.setattr(states, "GENERATION_MODEL", pipeline)
+    monkeypatch.setattr(states, "DEVICE", torch.device("cpu"))
+    street_image = Image.fromarray(np.random.RandomState(0).randint(0, 255, (450, 800, 3), dtype=np.uint8))
+    bboxes = [(300, 250, 400, 350), (600, 300, 700, 420)]
+
+    images = image_inpainting.inpaint_images(street_image, bboxes, "a panda", [0.6, 0.6], mode="region")
+
+    # Both windows share the size of the largest padded bbox (356x376) and keep its aspect ratio
+    window_size = image_inpainting.region_window_size(bboxes, street_image.size)
+    assert window_size == (356, 376)
+    assert [call["batch_size"] for call in pipeline.calls] == [2]
+    assert pipeline.sizes == [(968, image_inpainting.REGION_SIZE)]
+    for image, bbox in zip(images, bboxes):
+        assert image.size == street_image.size
+        left, top, right, bottom = image_inpainting.region_window(bbox, street_image.size, window_size)
+        outside = np.ones((450, 800), dtype=bool)
+        outside[top:bottom, left:right] = False
+        np.testing.assert_array_equal(np.asarray(image)[outside], np.asarray(street_image)[outside])
+        # The bbox itself is inpainted
+        assert not np.array_equal(np.asarray(image.crop(bbox)), np.asarray(street_image.crop(bbox)))
+
+    with pytest.raises(ValueError):
+        image_inpainting.inpaint_images(street_image, bboxes, "a panda", [0.6, 0.6], mode="tiles")
+
+def test_mask_factory_matches_blurred_rectangle():
+    """Testing the composed masks against the Gaussian blur of a drawn rectangle"""
+    factory = image_inpainting.MaskFactory((400, 240), radius=20)
+    for bbox in [(150, 100, 250, 160), (0, 180, 60, 239), (60, 60, 340, 180), (200, 120, 203, 121)]:
+        drawn = Image.new("L", (400, 240), 0)
+        ImageDraw.Draw(drawn).rectangle(bbox, fill=255)
+        expected = np.asarray(drawn.filter(ImageFilter.GaussianBlur(20)), dtype=np.float32) / 255.0
+
+        mask = factory.mask(bbox)
+        assert mask.shape == (240, 400) and mask.dtype == np.float32
+        # PIL approximates the Gaussian with box blurs (and differs next to the border unless the rectangle touches it)
+        assert np.abs(mask - expected).max() < 8 / 255
+        assert np.mean((mask >= 0.5) != (expected >= 0.5)) < 0.01
+
+    assert not factory.mask((500, 300, 600, 400)).any()
+    assert image_inpainting.get_mask_factory((400, 240)) is image_inpainting.get_mask_factory((400, 240))
+    np.testing.assert_array_equal(
+        np.asarray(image_inpainting.create_mask_image(400, 240, 150, 100, 250, 160)),
+        np.round(image_inpainting.create_mask(400, 240, 150, 100, 250, 160) * 255).astype(np.uint8)
+    )
+
+def test_prompt_embeddings_are_cached(pipeline, monkeypatch):
+    """Testing that the text encoders run once per prompt and once for the negative prompt"""
+    monkeypatch.setattr(states, "PROMPT_EMBEDDING_CACHE", None)
+    street_image = Image.new("RGB", (64, 32), (120, 120, 120))
+    bboxes = [(0, 0, 10, 10), (10, 5, 30, 20), (20, 0, 60, 30), (5, 5, 15, 25)]
+
+    image_inpainting.inpaint_images(street_image, bboxes, "a panda", [0.5, 0.6, 0.7, 0.8], batched=False)
+    assert len(pipeline.calls) == 4
+    assert len(pipeline.encoded_prompts) == 2
+    assert all(call["prompt_embeds"].shape == (1, 77, 8) for call in pipeline.calls)
+
+    image_inpainting.inpaint_images(street_image, bboxes[:2], "a panda", [0.6, 0.6])
+    image_inpainting.inpaint_images(street_image, bboxes[:1], "a duck", [0.6])
+    assert len(pipeline.encoded_prompts) == 3
+    assert pipeline.calls[-2]["prompt_embeds"].shape == (2, 77, 8)
+    assert states.PROMPT_EMBEDDING_CACHE.stats()["pinned"] == 1
+
+def _tiny_sdxl_inpaint_pipeline(tokenizer_directory):
+    """Utility Function for building a tiny random StableDiffusionXLInpaintPipeline on CPU"""
+    import json
+    import string
+    from diffusers import StableDiffusionXLInpaintPipeline, UNet2DConditionModel, AutoencoderKL, DDIMScheduler
+    from transformers import CLIPTextConfig, CLIPTextModel, CLIPTextModelWithProjection, CLIPTokenizer
+
+    # Character level CLIP tokenizer without merges
+    characters = [character for character in string.printable if not character.isspace()]
+    tokens = characters + [character + "</w>" for character in characters] + ["<|startoftext|>", "<|endoftext|>"]
+    with open(tokenizer_directory / "vocab.json", "w", encoding="utf-8") as vocab_file:
+        json.dump({token: i for i, token in enumerate(tokens)}, vocab_file)
+    (tokenizer_directory / "merges.txt").write_text("#version: 0.2\n", encoding="utf-8")
+    tokenizer = CLIPTokenizer.from_pretrained(str(tokenizer_directory), model_max_length=77)
+
+    torch.manual_seed(0)
+    text_config = CLIPTextConfig(
+        vocab_size=len(tokens), bos_token_id=len(tokens) - 2, eos_token_id=len(tokens) - 1, pad_token_id=len(tokens) - 1,
+        hidden_size=32, intermediate_size=37, num_attention_heads=4, num_hidden_layers=2, projection_dim=32, max_position_embeddings=77
+    )
+    unet = UNet2DConditionModel(
+        block_out_channels=(32, 64), layers_per_block=1, sample_size=16, in_channels=4, out_channels=4,
+        down_block_types=("DownBlock2D", "CrossAttnDownBlock2D"), up_block_types=("CrossAttnUpBlock2D", "UpBlock2D"),
+        attention_head_dim=(2, 4), use_linear_projection=True, addition_embed_type="text_time", addition_time_embed_dim=8,
+        transformer_layers_per_block=(1, 1), projection_class_embeddings_input_dim=6 * 8 + 32, cross_attention_dim=64, norm_num_groups=8
+    )
+    vae = AutoencoderKL(
+        block_out_channels=(16, 32), in_channels=3, out_channels=3, latent_channels=4, norm_num_groups=8,
+        down_block_types=("DownEncoderBlock2D",) * 2, up_block_types=("UpDecoderBlock2D",) * 2
+    )
+    pipeline = StableDiffusionXLInpaintPipeline(
+        vae=vae, text_encoder=CLIPTextModel(text_config), text_encoder_2=CLIPTextModelWithProjection(text_config),
+        tokenizer=tokenizer, tokenizer_2=tokenizer, unet=unet, scheduler=DDIMScheduler(),
+        requires_aesthetics_score=False, force_zeros_for_empty_prompt=False
+    )
+    pipeline.set_progress_bar_config(disable=True)
+    return pipeline
+
+def test_batched_strengths_match_single_runs_on_real_pipeline(monkeypatch, tmp_path):
+    """Testing the batched variants against single runs at their own strength on a tiny real SDXL pipeline"""
+    pytest.importorskip("transformers")
+    pipeline = _tiny_sdxl_inpaint_pipeline(tmp_path)
+    monkeypatch.setattr(states, "GENERATION_MODEL", pipeline)
+    monkeypatch.setattr(states, "DEVICE", torch.device("cpu"))
+    monkeypatch.setattr(states, "PROMPT_EMBEDDING_CACHE", None)
+    # A deterministic first order scheduler, so the held back variants match their single runs exactly
+    monkeypatch.setitem(image_inpainting.DIFFUSION_PROFILES, "tiny", image_inpainting.DiffusionProfile(10, 5.0, 64, 64))
+    # Large bboxes, the binarized mask of the 50 px feather only covers the inner part
+    street_image = Image.fromarray(np.random.RandomState(0).randint(0, 255, (256, 256, 3), dtype=np.uint8))
+    bboxes = [(20, 20, 220, 220), (40, 30, 255, 240), (0, 50, 200, 255), (30, 10, 236, 200)]
+    strengths = [0.5, 0.7, 0.8, 0.5]
+
+    # 10 steps: the 0.7 variant starts one step after the 0.8 variant and runs on its own
+    assert image_inpainting.group_variants_by_strength(strengths, 10) == [[2, 0, 3], [1]]
+    calls = []
+    original_call = type(pipeline).__call__
+    monkeypatch.setattr(type(pipeline), "__call__", lambda self, **kwargs: calls.append(kwargs) or original_call(self, **kwargs))
+
+    batched = image_inpainting.inpaint_images(street_image, bboxes, "a panda", strengths, profile="tiny")
+
+    assert [len(call["image"]) for call in calls] == [3, 1]
+    assert [call["strength"] for call in calls] == pytest.approx([0.8, 0.7])
+    assert all(len(call["generator"]) == len(call["mask_image"]) == len(call["prompt_embeds"]) for call in calls)
+    singles = []
+    for i, (bbox, strength) in enumerate(zip(bboxes, strengths)):
+        singles.append(image_inpainting.inpaint_images(street_image, [bbox], "a panda", [strength], seeds=[42 + i], profile="tiny")[0])
+        assert batched[i].size == street_image.size
+        np.testing.assert_allclose(np.asarray(batched[i], dtype=np.float32), np.asarray(singles[i], dtype=np.float32), atol=2)
+    # The strength does change the result, a 0.5 variant run at 0.8 would not match
+    stronger = image_inpainting.inpaint_images(street_image, bboxes[:1], "a panda", [0.8], seeds=[42], profile="tiny")[0]
+    assert np.abs(np.asarray(stronger, dtype=np.float32) - np.asarray(singles[0], dtype=np.float32)).max() > 20
+    # The prompts went through the text encoders once
+    assert states.PROMPT_EMBEDDING_CACHE.stats()["misses"] == 2
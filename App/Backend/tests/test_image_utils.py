@@ -0,0 +1,42 @@
+"""tests/test_image_utils.py"""
+
+# Imports
+import sys
+import os
+import base64
+import io
+from email.parser import BytesParser
+import numpy as np
+from PIL import Image
+
+# Add the parent directory (App/Backend) to sys.path to make `services` importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+#pylint: disable=wrong-import-position
+from services.image_utils import base64_to_image, bytes_to_image, image_to_png_bytes, multipart_body
+
+def _jpeg_bytes():
+    """Utility Function for creating a small JPEG"""
+    rng = np.random.default_rng(0)
+    buffered = io.BytesIO()
+    Image.fromarray(rng.integers(0, 255, (120, 200, 3), dtype=np.uint8)).save(buffered, format="JPEG")
+    return buffered.getvalue()
+
+def test_binary_and_base64_decoding_match():
+    """Testing that both transports decode to the same image"""
+    jpeg = _jpeg_bytes()
+    from_base64 = base64_to_image("data:image/jpeg;base64," + base64.b64encode(jpeg).decode("utf-8"))
+    from_bytes = bytes_to_image(jpeg)
+    assert from_bytes.shape == (640, 640, 3)
+    np.testing.assert_array_equal(from_base64, from_bytes)
+
+def test_multipart_body_is_parseable():
+    """Testing the multipart/mixed response of /generate/binary"""
+    images = [image_to_png_bytes(Image.new("RGB", (8, 8), (i, 0, 0))) for i in range(4)]
+    body = multipart_body([("image/png", {"Content-Disposition": f'inline; filename="variant_{i}.png"'}, png) for i, png in enumerate(images)], "xyz")
+
+    message = BytesParser().parsebytes(b"Content-Type: multipart/mixed; boundary=xyz\r\n\r\n" + body)
+    parts = message.get_payload()
+    assert [part.get_content_type() for part in parts] == ["image/png"] * 4
+    assert [part.get_payload(decode=True) for part in parts] == images
+    assert parts[2].get_filename() == "variant_2.png"
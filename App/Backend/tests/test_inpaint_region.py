@@ -0,0 +1,197 @@
+"""tests/test_inpaint_region.py"""
+
+# Imports
+import sys
+import os
+from types import SimpleNamespace
+import numpy as np
+import pytest
+
+# Add the parent directory (App/Backend) to sys.path to make `services` importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+#pylint: disable=wrong-import-position
+from services import inpaint_region
+from tests import legacy_region
+
+def _random_polygon_string(rng, vertex_count):
+    """Utility Function for creating a random star shaped polygon with normalized coordinates"""
+    angles = np.sort(rng.uniform(0, 2 * np.pi, vertex_count))
+    radii = rng.uniform(0.1, 0.5, vertex_count)
+    center = rng.uniform(0.3, 0.7, 2)
+    xs = np.clip(center[0] + radii * np.cos(angles), 0, 1)
+    ys = np.clip(center[1] + radii * np.sin(angles), 0, 1)
+    return " ".join(f"{x} {y}" for x, y in zip(xs, ys))
+
+def _road_polygon_string(rng):
+    """Utility Function for creating a road like trapezoid reaching the bottom of the image"""
+    horizon = rng.uniform(0.3, 0.6)
+    top_left, top_right = sorted(rng.uniform(0.3, 0.7, 2))
+    return f"0.0 1.0 {top_left} {horizon} {top_right} {horizon} 1.0 1.0 0.5 1.0"
+
+def _legacy_inpaint_area(polygon_string, width, height):
+    """Runs the loop based implementation on a polygon string"""
+    vertices = legacy_region._parse_polygon_string(polygon_string, width, height)
+    mask = inpaint_region._rasterize_polygon(width, height, vertices)
+    height_map = legacy_region._calculate_height_map(mask)
+    return legacy_region._find_largest_inscribed_rectangle(height_map)
+
+@pytest.mark.parametrize("seed", range(20))
+def test_height_map_matches_legacy(seed):
+    """Testing vectorized height map against the loop implementation"""
+    rng = np.random.default_rng(seed)
+    mask = (rng.random((37, 53)) < 0.7).astype(np.uint8)
+    expected = legacy_region._calculate_height_map(mask)
+    np.testing.assert_array_equal(inpaint_region._calculate_height_map(mask), expected)
+
+@pytest.mark.parametrize("seed", range(50))
+def test_rectangle_matches_legacy_on_random_masks(seed):
+    """Testing rectangle search and tie breaking on noisy masks"""
+    rng = np.random.default_rng(seed)
+    mask = (rng.random((15, 21)) < rng.uniform(0.3, 0.95)).astype(np.uint8)
+    height_map = legacy_region._calculate_height_map(mask)
+    expected_area, expected_bbox = legacy_region._find_largest_inscribed_rectangle(height_map)
+    area, bbox = inpaint_region._find_largest_inscribed_rectangle(height_map)
+    assert area == expected_area
+    assert bbox == tuple(int(v) for v in expected_bbox)
+
+@pytest.mark.parametrize("seed", range(10))
+def test_inpaint_area_matches_legacy_on_polygons(seed):
+    """Testing the full bbox search on synthetic polygons"""
+    rng = np.random.default_rng(seed)
+    width, height = 160, 90
+    for polygon_string in (_random_polygon_string(rng, 8), _road_polygon_string(rng)):
+        _, expected_bbox = _legacy_inpaint_area(polygon_string, width, height)
+        vertices = legacy_region._parse_polygon_string(polygon_string, width, height)
+        bbox = inpaint_region.get_suitable_inpaint_area(vertices, width, height, tolerance=0)
+        assert bbox == tuple(int(v) for v in expected_bbox)
+
+def _adversarial_polygons(width, height):
+    """Utility Function for thin, concave, small and random star polygons in pixel coordinates"""
+    angles = np.linspace(0, 2 * np.pi, 10, endpoint=False)
+    radii = np.where(np.arange(10) % 2 == 0, 0.45, 0.08)
+    star = np.stack([0.5 + radii * np.cos(angles) * height / width, 0.5 + radii * np.sin(angles)], axis=1)
+    shapes = [
+        np.array([[0.05, 0.5], [0.95, 0.46], [0.95, 0.54]]),  # Thin wedge
+        star,  # Concave star
+        np.array([[0.5, 0.5], [0.53, 0.5], [0.5, 0.56]]),  # Small triangle
+    ]
+    polygons = [np.round(shape * (width - 1, height - 1)).astype(np.int32) for shape in shapes]
+    rng = np.random.default_rng(0)
+    for _ in range(5):
+        polygons.append(legacy_region._parse_polygon_string(_random_polygon_string(rng, 12), width, height))
+    return polygons
+
+@pytest.mark.parametrize("index", range(8))
+def test_rectangle_matches_legacy_on_adversarial_polygons(index):
+    """Testing the exact search against the loop implementation on thin, concave and small polygons"""
+    width, height = 160, 90
+    vertices = _adversarial_polygons(width, height)[index]
+    mask = inpaint_region._rasterize_polygon(width, height, vertices)
+    expected_area, expected_bbox = legacy_region._find_largest_inscribed_rectangle(legacy_region._calculate_height_map(mask))
+    assert expected_area > 0
+    assert inpaint_region.get_suitable_inpaint_area(vertices, width, height, tolerance=0) == tuple(int(v) for v in expected_bbox)
+
+def test_default_search_is_exact():
+    """Testing that the default search returns the exact rectangle edge for edge"""
+    width, height = 1600, 900
+    assert inpaint_region.REGION_SEARCH_TOLERANCE == 0
+    for vertices in _adversarial_polygons(width, height):
+        mask = inpaint_region._rasterize_polygon(width, height, vertices)
+        _, exact = inpaint_region._find_largest_inscribed_rectangle(inpaint_region._calculate_height_map(mask))
+        assert inpaint_region.get_suitable_inpaint_area(vertices, width, height) == exact
+
+@pytest.mark.parametrize("tolerance", [2, 4])
+def test_coarse_to_fine_contains_the_coarse_rectangle(tolerance):
+    """Testing that the approximate search stays inside the polygon and never shrinks the upscaled coarse rectangle"""
+    width, height = 1600, 900
+    factor = 2 * tolerance
+    for vertices in _adversarial_polygons(width, height):
+        mask = inpaint_region._rasterize_polygon(width, height, vertices)
+        coarse_area, _ = inpaint_region._find_largest_inscribed_rectangle(
+            inpaint_region._calculate_height_map(inpaint_region._downscale_mask(mask, factor))
+        )
+        x_min, y_min, x_max, y_max = inpaint_region.get_suitable_inpaint_area(vertices, width, height, tolerance=tolerance)
+
+        assert mask[y_min:y_max + 1, x_min:x_max + 1].all()
+        assert inpaint_region._rectangle_area((x_min, y_min, x_max, y_max)) >= coarse_area * factor ** 2
+
+def test_coarse_to_fine_falls_back_on_small_polygons():
+    """Testing that polygons smaller than a coarse cell still get their exact rectangle"""
+    vertices = np.array([[10, 10], [14, 10], [14, 13], [10, 13]], dtype=np.int32)
+    assert inpaint_region.get_suitable_inpaint_area(vertices, 40, 30, tolerance=8) == (10, 10, 14, 13)
+
+def test_empty_mask_has_no_rectangle():
+    """Testing that an empty mask does not produce a rectangle"""
+    height_map = inpaint_region._calculate_height_map(np.zeros((10, 12), dtype=np.uint8))
+    assert inpaint_region._find_largest_inscribed_rectangle(height_map) == (0, (0, 0, 0, 0))
+
+def _yolo_results(*polygons):
+    """Utility Function for wrapping pixel polygons like the YOLO segmentation results"""
+    return [SimpleNamespace(masks=None), SimpleNamespace(masks=SimpleNamespace(xy=[np.asarray(p, dtype=np.float32) for p in polygons]))]
+
+def _legacy_polygon_string(polygon, width, height):
+    """Utility Function for the string serialization the region pipeline used before"""
+    return legacy_region.extract_street_polygon(_yolo_results(polygon), SimpleNamespace(width=width, height=height))
+
+@pytest.mark.parametrize("seed", range(10))
+def test_polygon_arrays_match_string_round_trip(seed):
+    """Testing the polygon arrays against the parsed string serialization"""
+    rng = np.random.default_rng(seed)
+    width, height = 160, 90
+    polygon = np.stack([rng.uniform(-5, width + 5, 12), rng.uniform(-5, height + 5, 12)], axis=1).astype(np.float32)
+
+    (vertices,) = inpaint_region.extract_street_polygons(_yolo_results(polygon), width, height)
+    expected = legacy_region._parse_polygon_string(_legacy_polygon_string(polygon, width, height), width, height)
+
+    assert vertices.dtype == np.int32
+    assert np.abs(vertices - expected).max() <= 1
+    assert vertices[:, 0].min() >= 0 and vertices[:, 0].max() <= width - 1
+
+def test_region_matches_string_pipeline():
+    """Testing bbox and height difference against the string pipeline"""
+    width, height = 160, 90
+    road = [[0.5, 89.5], [64.2, 45.7], [96.9, 45.1], [159.5, 89.5]]
+    street_image = SimpleNamespace(width=width, height=height)
+
+    _, bbox, height_diff = inpaint_region.get_suitable_region(_yolo_results(road), street_image, selection="last", tolerance=0)
+
+    polygon_string = _legacy_polygon_string(road, width, height)
+    _, expected_bbox = _legacy_inpaint_area(polygon_string, width, height)
+    assert bbox == tuple(int(v) for v in expected_bbox)
+    assert height_diff == legacy_region.get_height_diff(polygon_string, bbox, height)
+
+def test_integral_vertices_survive_without_string_round_trip():
+    """Testing that integral vertices are no longer truncated by the float32 string round trip"""
+    width, height = 160, 90
+    road = [[0, 89], [64, 45], [96, 45], [159, 89]]
+
+    (vertices,) = inpaint_region.extract_street_polygons(_yolo_results(road), width, height)
+    round_trip = legacy_region._parse_polygon_string(_legacy_polygon_string(road, width, height), width, height)
+
+    np.testing.assert_array_equal(vertices, road)
+    assert round_trip[0, 1] == 88
+
+def test_polygon_selection_strategies():
+    """Testing the largest, most suitable and last polygon selection"""
+    width, height = 200, 100
+    # Long thin diagonal band with the largest area, compact square with the largest rectangle, small square last
+    band = [[0, 0], [20, 0], [199, 90], [199, 99], [179, 99], [0, 10]]
+    square = [[120, 10], [160, 10], [160, 50], [120, 50]]
+    small = [[10, 60], [20, 60], [20, 70], [10, 70]]
+    polygons = inpaint_region.extract_street_polygons(_yolo_results(band, square, small), width, height)
+
+    largest, _ = inpaint_region.select_street_polygon(polygons, width, height, "largest")
+    suitable, suitable_bbox = inpaint_region.select_street_polygon(polygons, width, height, "suitable")
+    last, _ = inpaint_region.select_street_polygon(polygons, width, height, "last")
+
+    assert largest is polygons[0]
+    assert suitable is polygons[1] and suitable_bbox == (120, 10, 160, 50)
+    assert last is polygons[2]
+    with pytest.raises(ValueError):
+        inpaint_region.select_street_polygon(polygons, width, height, "first")
+
+def test_region_without_street_polygon():
+    """Testing that images without a street mask have no region"""
+    street_image = SimpleNamespace(width=160, height=90)
+    assert inpaint_region.get_suitable_region(_yolo_results(), street_image) == (street_image, None, None)
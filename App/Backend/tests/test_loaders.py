@@ -0,0 +1,40 @@
+"""tests/test_loaders.py"""
+
+# Imports
+import sys
+import os
+import pytest
+
+torch = pytest.importorskip("torch")
+
+# Add the parent directory (App/Backend) to sys.path to make `models` importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+#pylint: disable=wrong-import-position
+from models import loaders
+
+def test_auto_backend_depends_on_the_device():
+    """Testing the backend choice per deployment"""
+    assert loaders.resolve_description_backend("auto", torch.device("cuda")) == "fp16"
+    assert loaders.resolve_description_backend("auto", torch.device("cpu")) == "int8-dynamic"
+    assert loaders.resolve_description_backend("bnb-int4", torch.device("cuda")) == "bnb-int4"
+    with pytest.raises(ValueError):
+        loaders.resolve_description_backend("onnx", torch.device("cpu"))
+
+def test_int8_dynamic_backend_is_cpu_only():
+    """Testing that the dynamic quantization refuses GPUs"""
+    with pytest.raises(ValueError):
+        loaders._load_description_int8_dynamic("Qwen/Qwen2-VL-2B-Instruct", torch.device("cuda"))
+
+@pytest.mark.filterwarnings("ignore::UserWarning")
+def test_quantized_linear_layers_stay_close():
+    """Testing the int8 dynamic quantization on a small MLP"""
+    torch.manual_seed(0)
+    model = torch.nn.Sequential(torch.nn.Linear(64, 128), torch.nn.GELU(), torch.nn.Linear(128, 32)).eval()
+    inputs = torch.randn(16, 64)
+    expected = model(inputs)
+
+    quantized = loaders.quantize_linear_layers(model)
+
+    assert "quantized" in type(quantized[0]).__module__
+    assert torch.nn.functional.cosine_similarity(quantized(inputs), expected, dim=-1).min() > 0.99
@@ -0,0 +1,77 @@
+"""tests/test_model_registry.py"""
+
+# Imports
+import sys
+import os
+import asyncio
+import threading
+import time
+import pytest
+
+# Add the parent directory (App/Backend) to sys.path to make `services` importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+#pylint: disable=wrong-import-position
+from services.model_registry import ModelRegistry, ModelUnavailableError
+
+def _slow_loaders(seconds, calls):
+    """Loaders that sleep and count their calls"""
+    def loader(name):
+        def load():
+            calls.append(name)
+            time.sleep(seconds)
+        return load
+    return {name: loader(name) for name in ("generation", "street_detection", "weird_detection", "detection_description")}
+
+def test_profile_models_load_in_parallel():
+    """Testing the concurrent loading of a profile"""
+    calls = []
+    registry = ModelRegistry(_slow_loaders(0.2, calls), profile="full", lazy=False)
+
+    start = time.perf_counter()
+    registry.load_all(max_workers=4)
+    elapsed = time.perf_counter() - start
+
+    assert sorted(calls) == sorted(registry.model_names)
+    assert elapsed < 0.6
+    assert registry.is_ready()
+    assert all(status["load_seconds"] >= 0.2 for status in registry.report()["models"].values())
+
+def test_detect_profile_skips_generation_models():
+    """Testing that a detect replica only loads the detection models"""
+    calls = []
+    registry = ModelRegistry(_slow_loaders(0, calls), profile="detect", lazy=False)
+    registry.load_all()
+
+    assert sorted(calls) == ["detection_description", "weird_detection"]
+    with pytest.raises(ModelUnavailableError):
+        asyncio.run(registry.ensure_loaded("generation"))
+
+def test_lazy_models_load_once_on_first_use():
+    """Testing the lazy loading with concurrent first requests"""
+    calls = []
+    registry = ModelRegistry(_slow_loaders(0.1, calls), profile="detect", lazy=True)
+    assert registry.is_ready()
+    assert registry.report()["models"]["weird_detection"]["state"] == "pending"
+
+    async def scenario():
+        await asyncio.gather(*(registry.ensure_loaded("weird_detection") for _ in range(5)))
+
+    asyncio.run(scenario())
+    assert calls == ["weird_detection"]
+    assert registry.report()["models"]["weird_detection"]["state"] == "ready"
+    assert registry.report()["models"]["detection_description"]["state"] == "pending"
+
+def test_failed_model_is_reported():
+    """Testing that a failing loader marks the replica as not ready"""
+    def broken():
+        raise OSError("weights not found")
+
+    loaded = threading.Event()
+    registry = ModelRegistry({"weird_detection": broken, "detection_description": loaded.set}, profile="detect", lazy=False)
+    registry.load_all()
+
+    report = registry.report()
+    assert not report["ready"]
+    assert report["models"]["weird_detection"] == {"state": "failed", "load_seconds": pytest.approx(0, abs=0.1), "error": "weights not found"}
+    assert loaded.is_set()
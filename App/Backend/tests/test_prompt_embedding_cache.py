@@ -0,0 +1,68 @@
+"""tests/test_prompt_embedding_cache.py"""
+
+# Imports
+import sys
+import os
+import pytest
+
+torch = pytest.importorskip("torch")
+
+# Add the parent directory (App/Backend) to sys.path to make `services` importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+#pylint: disable=wrong-import-position
+from services.prompt_embedding_cache import PromptEmbeddingCache
+
+class CountingEncoder:
+    """Pipeline stand-in that counts the text encoder runs."""
+
+    def __init__(self):
+        self.encoded = []
+
+    def encode_prompt(self, prompt, num_images_per_prompt=1, do_classifier_free_guidance=True):
+        """Returns embeddings holding the number of the encoder run"""
+        assert num_images_per_prompt == 1 and not do_classifier_free_guidance
+        self.encoded.append(prompt)
+        run = float(len(self.encoded))
+        return torch.full((1, 77, 4), run), None, torch.full((1, 4), run), None
+
+def test_cache_encodes_once_per_prompt():
+    """Testing that repeated prompts reuse the embeddings"""
+    encoder = CountingEncoder()
+    cache = PromptEmbeddingCache(max_entries=4)
+
+    first = cache.get(encoder, "a panda")
+    assert cache.get(encoder, "a panda") is first
+    assert cache.get(encoder, "a duck")[0][0, 0, 0] == 2
+    assert encoder.encoded == ["a panda", "a duck"]
+    assert cache.stats() == {"hits": 1, "misses": 2, "entries": 2, "pinned": 0, "hit_rate": pytest.approx(1 / 3)}
+
+def test_cache_evicts_least_recently_used_but_keeps_pinned():
+    """Testing the LRU eviction and the pinned negative prompt"""
+    encoder = CountingEncoder()
+    cache = PromptEmbeddingCache(max_entries=2)
+
+    cache.get(encoder, "blurry", pinned=True)
+    cache.get(encoder, "a")
+    cache.get(encoder, "b")
+    cache.get(encoder, "a")
+    cache.get(encoder, "c")  # Evicts "b"
+    cache.get(encoder, "blurry", pinned=True)
+    cache.get(encoder, "a")
+    cache.get(encoder, "b")
+    assert encoder.encoded == ["blurry", "a", "b", "c", "b"]
+
+def test_cache_is_bound_to_pipeline_and_adapter():
+    """Testing that another adapter or a reloaded pipeline encodes again"""
+    encoder = CountingEncoder()
+    cache = PromptEmbeddingCache()
+
+    cache.get(encoder, "a panda")
+    cache.get(encoder, "a panda", adapter="lcm-lora-sdxl")
+    cache.get(encoder, "a panda", adapter="lcm-lora-sdxl")
+    assert len(encoder.encoded) == 2
+
+    reloaded = CountingEncoder()
+    cache.get(reloaded, "a panda")
+    assert reloaded.encoded == ["a panda"]
+    assert cache.stats()["entries"] == 1
@@ -0,0 +1,45 @@
+"""tests/test_prompt_summary.py"""
+
+# Imports
+import sys
+import os
+import pytest
+
+spacy = pytest.importorskip("spacy")
+if not spacy.util.is_package("en_core_web_sm"):
+    pytest.skip("en_core_web_sm is not installed", allow_module_level=True)
+
+# Add the parent directory (App/Backend) to sys.path to make `services` importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+#pylint: disable=wrong-import-position
+from services import prompt_summary
+
+def test_nouns_with_counts():
+    """Testing the noun extraction on one of Hamza's prompts"""
+    assert prompt_summary.extract_nouns_with_counts("Two pandas juggle on the middle lane.") == ["panda", "panda", "lane"]
+
+def test_repeated_prompts_hit_the_cache():
+    """Testing that whitespace variations of a prompt share a cache entry"""
+    before = prompt_summary.prompt_cache_stats()
+    first = prompt_summary.extract_nouns_with_counts("A book  melts in a teacup. ")
+    second = prompt_summary.extract_nouns_with_counts(" A book melts in a teacup.")
+    after = prompt_summary.prompt_cache_stats()
+
+    assert first == second == ["book", "teacup"]
+    assert after["misses"] - before["misses"] == 1
+    assert after["hits"] - before["hits"] == 1
+
+def test_cached_results_are_not_shared():
+    """Testing that callers cannot modify the cached result"""
+    prompt_summary.extract_nouns_with_counts("A clown giggles on a trampoline.").append("panda")
+    assert prompt_summary.extract_nouns_with_counts("A clown giggles on a trampoline.") == ["clown", "trampoline"]
+
+def test_batch_matches_single_prompts():
+    """Testing the nlp.pipe batch API against the single prompt API"""
+    prompts_path = os.path.join(os.path.dirname(__file__), "hamzas_prompts.txt")
+    with open(prompts_path, encoding="utf-8") as prompts_file:
+        prompts = [line.strip() for line in prompts_file if line.strip()][:50]
+
+    batch = prompt_summary.extract_nouns_with_counts_batch(prompts + prompts[:5])
+    assert batch == [prompt_summary.extract_nouns_with_counts(prompt) for prompt in prompts + prompts[:5]]
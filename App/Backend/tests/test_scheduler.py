@@ -0,0 +1,83 @@
+"""tests/test_scheduler.py"""
+
+# Imports
+import sys
+import os
+import asyncio
+import threading
+import time
+import pytest
+
+# Add the parent directory (App/Backend) to sys.path to make `services` importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+#pylint: disable=wrong-import-position
+from services.scheduler import ModelScheduler, SchedulerBusyError, DETECT_PRIORITY, GENERATE_PRIORITY
+
+def test_jobs_run_off_the_event_loop():
+    """Testing that model calls run on the worker thread"""
+    async def scenario():
+        scheduler = ModelScheduler()
+        loop_thread = threading.current_thread().name
+        worker_thread = await scheduler.run("weird_detection", lambda: threading.current_thread().name)
+        scheduler.shutdown()
+        return loop_thread, worker_thread
+
+    loop_thread, worker_thread = asyncio.run(scenario())
+    assert loop_thread != worker_thread
+    assert worker_thread.startswith("weird_detection-worker")
+
+def test_detect_jobs_run_before_waiting_generate_jobs():
+    """Testing the queue priorities"""
+    order = []
+    release = threading.Event()
+
+    async def scenario():
+        scheduler = ModelScheduler()
+        blocker = asyncio.create_task(scheduler.run("generation", release.wait))
+        await asyncio.sleep(0.05)
+        jobs = [
+            asyncio.create_task(scheduler.run("generation", order.append, "generate", priority=GENERATE_PRIORITY)),
+            asyncio.create_task(scheduler.run("generation", order.append, "detect", priority=DETECT_PRIORITY)),
+        ]
+        await asyncio.sleep(0.05)
+        release.set()
+        await asyncio.gather(blocker, *jobs)
+        scheduler.shutdown()
+
+    asyncio.run(scenario())
+    assert order == ["detect", "generate"]
+
+def test_full_queue_is_rejected():
+    """Testing the backpressure of a full queue"""
+    release = threading.Event()
+
+    async def scenario():
+        scheduler = ModelScheduler(queue_sizes={"generation": 1})
+        running = asyncio.create_task(scheduler.run("generation", release.wait))
+        await asyncio.sleep(0.05)
+        waiting = asyncio.create_task(scheduler.run("generation", time.sleep, 0))
+        await asyncio.sleep(0.05)
+        with pytest.raises(SchedulerBusyError):
+            await scheduler.run("generation", time.sleep, 0)
+        # Other models are not affected by the full queue
+        assert await scheduler.run("weird_detection", lambda: "ok") == "ok"
+        release.set()
+        await asyncio.gather(running, waiting)
+        scheduler.shutdown()
+
+    asyncio.run(scenario())
+
+def test_exceptions_reach_the_caller():
+    """Testing that model errors are raised in the request"""
+    def failing_model():
+        raise ValueError("model failed")
+
+    async def scenario():
+        scheduler = ModelScheduler()
+        with pytest.raises(ValueError, match="model failed"):
+            await scheduler.run("weird_detection", failing_model)
+        assert await scheduler.run("weird_detection", lambda: 1) == 1
+        scheduler.shutdown()
+
+    asyncio.run(scenario())
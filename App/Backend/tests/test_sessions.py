@@ -0,0 +1,70 @@
+"""tests/test_sessions.py"""
+
+# Imports
+import sys
+import os
+import pytest
+
+# Add the parent directory (App/Backend) to sys.path to make `services` importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+#pylint: disable=wrong-import-position
+from services.sessions import SessionStore, SQLiteSessionStore
+
+class FakeClock:
+    """Manually advanced clock"""
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture(name="clock")
+def fixture_clock():
+    """Fake clock for TTL tests"""
+    return FakeClock()
+
+@pytest.fixture(name="store", params=["memory", "sqlite"])
+def fixture_store(request, clock, tmp_path):
+    """Both session store backends with a small capacity"""
+    if request.param == "memory":
+        return SessionStore(max_sessions=2, ttl_seconds=60, clock=clock)
+    return SQLiteSessionStore(str(tmp_path / "sessions.sqlite3"), max_sessions=2, ttl_seconds=60, clock=clock)
+
+def test_sessions_are_separate(store):
+    """Testing that concurrent rounds keep their own prompt summary"""
+    panda = store.create(["panda", "lane"])
+    book = store.create(["book", "teacup"])
+    assert panda != book
+    assert store.get(panda) == ["panda", "lane"]
+    assert store.get(book) == ["book", "teacup"]
+    assert store.get("unknown") is None
+
+def test_least_recently_used_session_is_evicted(store, clock):
+    """Testing the LRU eviction"""
+    first = store.create(["first"])
+    clock.now += 1
+    second = store.create(["second"])
+    clock.now += 1
+    assert store.get(first) == ["first"]
+    clock.now += 1
+    third = store.create(["third"])
+
+    assert len(store) == 2
+    assert store.get(second) is None
+    assert store.get(first) == ["first"]
+    assert store.get(third) == ["third"]
+
+def test_sessions_expire(store, clock):
+    """Testing the TTL"""
+    token = store.create(["panda"])
+    clock.now += 59
+    assert store.get(token) == ["panda"]
+    clock.now += 2
+    assert store.get(token) is None
+
+def test_sqlite_sessions_survive_restart(tmp_path, clock):
+    """Testing that the SQLite backend persists sessions"""
+    path = str(tmp_path / "sessions.sqlite3")
+    token = SQLiteSessionStore(path, clock=clock).create(["llama", "bus"])
+    assert SQLiteSessionStore(path, clock=clock).get(token) == ["llama", "bus"]
@@ -0,0 +1,49 @@
+"""tests/test_street_index.py"""
+
+# Imports
+import sys
+import os
+from types import SimpleNamespace
+import numpy as np
+from PIL import Image
+
+# Add the parent directory (App/Backend) to sys.path to make `services` importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+#pylint: disable=wrong-import-position
+from services.street_index import build_street_region_index, load_street_region_index
+from services.inpaint_region import get_suitable_region
+
+class FakeStreetModel:
+    """Returns the same road polygon for every image."""
+    def predict(self, source, **_):
+        width, height = source.size
+        polygon = np.array([[0, height - 1], [width * 0.4, height * 0.5], [width * 0.6, height * 0.5], [width - 1, height - 1]], dtype=np.float32)
+        return [SimpleNamespace(masks=SimpleNamespace(xy=[polygon]))]
+
+def test_index_matches_live_region(tmp_path):
+    """Testing that the index stores the same region as the live computation"""
+    image_folder = tmp_path / "images"
+    image_folder.mkdir()
+    for i in range(3):
+        Image.new("RGB", (160, 90), (i, i, i)).save(image_folder / f"street_{i}.png")
+    (image_folder / "notes.txt").write_text("not an image")
+
+    index_path = str(tmp_path / "index")
+    assert build_street_region_index(FakeStreetModel(), str(image_folder), index_path) == 3
+
+    index = load_street_region_index(index_path)
+    assert len(index) == 3
+
+    region = index[1]
+    street_image = Image.open(region.image_path).convert("RGB")
+    results = FakeStreetModel().predict(street_image)
+    _, bbox, height_diff = get_suitable_region(results, street_image)
+    assert region.bbox == bbox
+    assert region.height_diff == height_diff
+    assert region.polygon.shape == (4, 2)
+    assert index.sample().image_path.endswith(".png")
+
+def test_missing_index_returns_none(tmp_path):
+    """Testing that a missing index falls back to live computation"""
+    assert load_street_region_index(str(tmp_path / "missing")) is None
@@ -0,0 +1,159 @@
+"""tests/test_structured_decoding.py"""
+
+# Imports
+import sys
+import os
+import ast
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+
+# Add the parent directory (App/Backend) to sys.path to make `services` importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+#pylint: disable=wrong-import-position
+from services import structured_decoding as sd
+from services import image_summary
+from services.image_summary import score_nouns
+
+# Fake vocabulary, the last token is EOS
+VOCAB = ["[", "['", "car", "'", ", '", "']", "]", " traffic", " cone", "\n", "```", "python", "panda", ",", " ", "'s", "]\n", "<eos>"]
+EOS = len(VOCAB) - 1
+
+@pytest.mark.parametrize("text", ["[]", "['car']", "['car', 'traffic cone']", "  [ 'a' ,\n 'b' ]", "['it s']"])
+def test_automaton_accepts_lists_of_strings(text):
+    """Testing valid lists"""
+    assert sd._consume(sd.START, text) == sd.DONE
+    assert isinstance(ast.literal_eval(text), list)
+
+@pytest.mark.parametrize("text", ["```python\n['car']", "['car'] ", "['car',]", "'car'", "['ca\\'r']", "['car'", "[car]"])
+def test_automaton_rejects_everything_else(text):
+    """Testing invalid or unfinished lists"""
+    assert sd._consume(sd.START, text) != sd.DONE
+
+def test_transition_table():
+    """Testing the token level table of the fake vocabulary"""
+    table = sd.build_transition_table(VOCAB, special_token_ids=[EOS])
+    assert table[sd.START, VOCAB.index("['")] == sd.IN_STRING
+    assert table[sd.IN_STRING, VOCAB.index(" traffic")] == sd.IN_STRING
+    assert table[sd.IN_STRING, VOCAB.index("']")] == sd.DONE
+    assert table[sd.IN_STRING, VOCAB.index("'s")] == sd.DEAD
+    assert table[sd.START, VOCAB.index("```")] == sd.DEAD
+    assert table[sd.AFTER_STRING, VOCAB.index("]\n")] == sd.DEAD
+    assert table[sd.OPEN, VOCAB.index(" ")] == sd.OPEN
+    assert (table[:, EOS] == sd.DEAD).all()
+
+def test_constrained_generation_with_random_model():
+    """Testing that a random language model can only produce parseable lists and stops once closed"""
+    torch.manual_seed(0)
+    config = transformers.GPT2Config(vocab_size=len(VOCAB), n_positions=128, n_embd=16, n_layer=1, n_head=2,
+                                     bos_token_id=EOS, eos_token_id=EOS, pad_token_id=EOS)
+    model = transformers.GPT2LMHeadModel(config).eval()
+    table = sd.build_transition_table(VOCAB, special_token_ids=[EOS])
+
+    prompt = torch.tensor([[VOCAB.index("panda"), VOCAB.index(" "), VOCAB.index("car")]] * 4)
+    tracker = sd.ListGrammarTracker(table, prompt.shape[1], [EOS])
+    generated = model.generate(
+        prompt, attention_mask=torch.ones_like(prompt), do_sample=True, max_new_tokens=60, pad_token_id=EOS,
+        logits_processor=transformers.LogitsProcessorList([sd.ListOfStringsLogitsProcessor(tracker)]),
+        stopping_criteria=transformers.StoppingCriteriaList([sd.ListClosedStoppingCriteria(tracker)])
+    )
+
+    for row in generated[:, prompt.shape[1]:].tolist():
+        text = "".join(VOCAB[token] for token in row if token != EOS)
+        # Either a closed list or cut by max_new_tokens
+        if sd._consume(sd.START, text) == sd.DONE:
+            assert isinstance(ast.literal_eval(text), list)
+            assert text.rstrip().endswith("]")
+        else:
+            assert sd._consume(sd.START, text) != sd.DEAD
+
+@pytest.mark.parametrize("text, closed", [
+    ("['car', 'traffic co", "['car']"),
+    ("['car', 'cone',", "['car', 'cone']"),
+    ("['car' ", "['car' ]"),
+    ("[", "[]"),
+    ("", "[]"),
+    ("['car']", "['car']"),
+])
+def test_close_list(text, closed):
+    """Testing that cut off lists are closed after their last complete string"""
+    assert sd.close_list(text) == closed
+
+class FakeListTokenizer:
+    """Tokenizer stub over the fake vocabulary"""
+    name_or_path = "fake-list-tokenizer"
+    all_special_ids = [EOS]
+    eos_token_id = pad_token_id = EOS
+
+    def __len__(self):
+        return len(VOCAB)
+
+    def batch_decode(self, sequences, **kwargs):
+        return ["".join(VOCAB[token] for token in sequence if token != EOS) for sequence in sequences]
+
+class FakeListVLM:
+    """Model stub that lists objects until max_new_tokens cuts it off"""
+    TOKENS = ["['", "car", "'", ", '", "panda", "'", ", '", " traffic", " cone", "'", "]"]
+
+    def __init__(self):
+        self.kwargs = None
+
+    def eval(self):
+        return self
+
+    def generate(self, input_ids=None, max_new_tokens=None, **kwargs):
+        self.kwargs = dict(kwargs, max_new_tokens=max_new_tokens)
+        answer = torch.tensor([VOCAB.index(token) for token in self.TOKENS[:max_new_tokens]])
+        return torch.cat([input_ids, answer.expand(input_ids.shape[0], -1)], dim=1)
+
+def test_structured_generation_cut_off_at_the_limit_still_parses(monkeypatch):
+    """Testing that a list cut off by the token limit is closed instead of dropped"""
+    monkeypatch.setattr(image_summary, "STRUCTURED_MAX_NEW_TOKENS", 8)
+    tokenizer = FakeListTokenizer()
+    processor = type("Processor", (), {"tokenizer": tokenizer, "batch_decode": tokenizer.batch_decode})
+    model = FakeListVLM()
+    inputs = transformers.BatchEncoding({"input_ids": torch.zeros((2, 3), dtype=torch.long)})
+
+    texts = image_summary.generate_responses(inputs, model, processor, device="cpu", structured=True)
+
+    assert model.kwargs["max_new_tokens"] == 8 and "logits_processor" in model.kwargs
+    assert [ast.literal_eval(text) for text in texts] == [["car", "panda"]] * 2
+
+class FakeTokenizer:
+    """Tokenizer stub with one token per answer spelling"""
+    VOCAB = {"Yes": 0, "yes": 1, " Yes": 2, " yes": 3, "No": 4, "no": 5, " No": 6, " no": 7}
+
+    def encode(self, text, add_special_tokens=False):
+        return [self.VOCAB[text]]
+
+class FakeVLM:
+    """Model stub returning fixed last-position logits"""
+    def __init__(self, last_logits):
+        self.last_logits = last_logits
+        self.kwargs = None
+
+    def eval(self):
+        return self
+
+    def forward(self, input_ids=None, logits_to_keep=None):
+        return type("Output", (), {"logits": self.last_logits[:, None, :]})
+
+    def __call__(self, **kwargs):
+        self.kwargs = kwargs
+        return self.forward(**kwargs)
+
+def test_score_nouns_uses_yes_no_logits():
+    """Testing the yes/no probabilities of the noun mode"""
+    logits = torch.full((2, 8), -10.0)
+    logits[0, 1] = 5.0  # "yes"
+    logits[1, 5] = 5.0  # "no"
+    model = FakeVLM(logits)
+    processor = type("Processor", (), {"tokenizer": FakeTokenizer()})
+    inputs = transformers.BatchEncoding({"input_ids": torch.zeros((2, 3), dtype=torch.long)})
+
+    probabilities = score_nouns(inputs, model, processor, device="cpu")
+
+    assert probabilities[0] > 0.99 and probabilities[1] < 0.01
+    assert model.kwargs["logits_to_keep"] == 1
@@ -13,7 +13,7 @@ export async function POST(request: Request) {
 
   try {
     // Get the prompt and imageBase64 from the incoming request
-    const { prompt, imageBase64 } = await request.json();
+    const { prompt, imageBase64, sessionToken } = await request.json();
 
     // Basic validation
     if (!prompt || !imageBase64) {
@@ -30,7 +30,7 @@ export async function POST(request: Request) {
         "Content-Type": "application/json",
         // Forward any other necessary headers if needed
       },
-      body: JSON.stringify({ prompt, imageBase64 }), // Send both prompt and image
+      body: JSON.stringify({ prompt, imageBase64, sessionToken }), // Send both prompt and image
     });
 
     console.log("Backend Response", backendResponse)
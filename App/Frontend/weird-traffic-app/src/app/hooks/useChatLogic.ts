@@ -150,6 +150,7 @@ export function useChatLogic() {
         body: JSON.stringify({
           prompt: associatedPrompt,
           imageBase64: selectedImageBase64,
+          sessionToken: messages[imageGridMsgIndex]?.sessionToken ?? null,
         }),
       });
 
@@ -301,7 +302,12 @@ export function useChatLogic() {
       setMessages((prevMessages) =>
         prevMessages.map((msg) =>
           msg.id === loadingImageGridMessage.id
-            ? { ...msg, content: imageUrls, isLoading: false }
+            ? {
+                ...msg,
+                content: imageUrls,
+                isLoading: false,
+                sessionToken: result.sessionToken ?? null,
+              }
             : msg
         )
       );
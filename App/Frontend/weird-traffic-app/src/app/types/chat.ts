@@ -13,6 +13,7 @@ export interface Message {
   detectedImageUrl?: string | null; //Base64 of the image returned by detection API
   lastDetectionAccuracy?: number | null;
   lastDetectionPoints?: number | null;
+  sessionToken?: string | null; // Token of the generation round, used for scoring the detection
 }
 
 // Add any other types specific to the chat feature here in the future
@@ -25,4 +26,5 @@ export interface GeneratedImage {
 // Response containing multiple generated images
 export interface GeneratedImages {
   images: GeneratedImage[];
+  sessionToken?: string | null;
 }